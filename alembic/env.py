@@ -16,7 +16,11 @@ if config.config_file_name is not None:
 # add your model's MetaData object here
 # for 'autogenerate' support
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from src.app.database import Base  # noqa
+from src.app.database import Base, DATABASE_URL  # noqa
+import src.app.models  # noqa: F401  (registers every table on Base.metadata)
+
+if not config.get_main_option("sqlalchemy.url"):
+    config.set_main_option("sqlalchemy.url", DATABASE_URL.replace("%", "%%"))
 
 target_metadata = Base.metadata
 
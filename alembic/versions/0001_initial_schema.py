@@ -0,0 +1,92 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-07-11 00:00:00.000000
+
+Databases created before migrations existed were built by
+``Base.metadata.create_all``; tables that already exist are left alone so
+those databases can simply be stamped forward by ``alembic upgrade head``.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("username", sa.String(), nullable=True),
+            sa.Column("hashed_password", sa.String(), nullable=True),
+            sa.Column("is_active", sa.Boolean(), nullable=True),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+    if "vendors" not in existing:
+        op.create_table(
+            "vendors",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(), nullable=True, unique=True),
+            sa.Column("species", sa.String(), nullable=True),
+            sa.Column("home_dimension", sa.String(), nullable=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True, unique=True),
+        )
+        op.create_index("ix_vendors_id", "vendors", ["id"])
+
+    if "fruits" not in existing:
+        op.create_table(
+            "fruits",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(), nullable=True),
+            sa.Column("flavor_profile", sa.String(), nullable=True),
+            sa.Column("dimension_origin", sa.String(), nullable=True),
+            sa.Column("rarity_level", sa.Integer(), nullable=True),
+            sa.Column("base_value", sa.Float(), nullable=True),
+            sa.Column("photo_url", sa.String(), nullable=True),
+        )
+        op.create_index("ix_fruits_name", "fruits", ["name"], unique=True)
+
+    if "vendor_inventory" not in existing:
+        op.create_table(
+            "vendor_inventory",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("vendor_id", sa.Integer(), sa.ForeignKey("vendors.id"), nullable=True),
+            sa.Column("fruit_id", sa.Integer(), sa.ForeignKey("fruits.id"), nullable=True),
+            sa.Column("quantity", sa.Integer(), nullable=True),
+        )
+
+    if "fruit_prices" not in existing:
+        op.create_table(
+            "fruit_prices",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("fruit_id", sa.Integer(), sa.ForeignKey("fruits.id"), nullable=False),
+            sa.Column("date", sa.String(), nullable=False),
+            sa.Column("price", sa.Float(), nullable=False),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("fruit_prices")
+    op.drop_table("vendor_inventory")
+    op.drop_index("ix_fruits_name", table_name="fruits")
+    op.drop_table("fruits")
+    op.drop_index("ix_vendors_id", table_name="vendors")
+    op.drop_table("vendors")
+    op.drop_index("ix_users_username", table_name="users")
+    op.drop_index("ix_users_id", table_name="users")
+    op.drop_table("users")
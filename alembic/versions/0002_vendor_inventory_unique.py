@@ -0,0 +1,59 @@
+"""unique (vendor_id, fruit_id) on vendor_inventory
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:00.000000
+
+Duplicate rows for the same vendor and fruit are merged into the oldest row
+(quantities summed) before the unique index is created.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(sa.text(
+        """
+        UPDATE vendor_inventory
+        SET quantity = (
+            SELECT SUM(d.quantity) FROM vendor_inventory d
+            WHERE d.vendor_id = vendor_inventory.vendor_id
+              AND d.fruit_id = vendor_inventory.fruit_id
+        )
+        WHERE id IN (
+            SELECT MIN(id) FROM vendor_inventory
+            GROUP BY vendor_id, fruit_id
+            HAVING COUNT(*) > 1
+        )
+        """
+    ))
+    op.execute(sa.text(
+        """
+        DELETE FROM vendor_inventory
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM vendor_inventory
+            GROUP BY vendor_id, fruit_id
+        )
+        """
+    ))
+    op.create_index(
+        "uq_vendor_inventory_vendor_fruit",
+        "vendor_inventory",
+        ["vendor_id", "fruit_id"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("uq_vendor_inventory_vendor_fruit", table_name="vendor_inventory")
@@ -0,0 +1,68 @@
+"""typed, indexed fruit_prices.date
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:00.000000
+
+Converts fruit_prices.date from an ISO string to DATE, keeps only the most
+recently inserted price per fruit and day, and adds a unique
+(fruit_id, date) index plus a date index for cross-fruit range scans.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(sa.text(
+        """
+        DELETE FROM fruit_prices
+        WHERE id NOT IN (
+            SELECT MAX(id) FROM fruit_prices
+            GROUP BY fruit_id, date
+        )
+        """
+    ))
+    # SQLite already stores SQLAlchemy dates as ISO text, and a batch copy
+    # would CAST the strings to NUMERIC, so only retype on real databases.
+    if op.get_bind().dialect.name != "sqlite":
+        op.alter_column(
+            "fruit_prices",
+            "date",
+            existing_type=sa.String(),
+            type_=sa.Date(),
+            existing_nullable=False,
+            postgresql_using="date::date",
+        )
+    op.create_index(
+        "uq_fruit_prices_fruit_date",
+        "fruit_prices",
+        ["fruit_id", "date"],
+        unique=True,
+        postgresql_include=["id", "price"],
+    )
+    op.create_index("ix_fruit_prices_date", "fruit_prices", ["date"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_fruit_prices_date", table_name="fruit_prices")
+    op.drop_index("uq_fruit_prices_fruit_date", table_name="fruit_prices")
+    if op.get_bind().dialect.name != "sqlite":
+        op.alter_column(
+            "fruit_prices",
+            "date",
+            existing_type=sa.Date(),
+            type_=sa.String(),
+            existing_nullable=False,
+            postgresql_using="to_char(date, 'YYYY-MM-DD')",
+        )
@@ -0,0 +1,87 @@
+"""weekly and monthly fruit price rollups
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:00.000000
+
+Creates fruit_price_rollups and backfills it from the existing daily
+prices in one ordered pass. Afterwards the daily price job keeps it up to
+date incrementally.
+"""
+from datetime import date, timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BUCKETS = {
+    "week": lambda day: day - timedelta(days=day.weekday()),
+    "month": lambda day: day.replace(day=1),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    rollups = op.create_table(
+        "fruit_price_rollups",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("fruit_id", sa.Integer(), sa.ForeignKey("fruits.id"), nullable=False),
+        sa.Column("bucket", sa.String(), nullable=False),
+        sa.Column("period_start", sa.Date(), nullable=False),
+        sa.Column("open_date", sa.Date(), nullable=False),
+        sa.Column("open", sa.Float(), nullable=False),
+        sa.Column("close_date", sa.Date(), nullable=False),
+        sa.Column("close", sa.Float(), nullable=False),
+        sa.Column("high", sa.Float(), nullable=False),
+        sa.Column("low", sa.Float(), nullable=False),
+        sa.Column("price_sum", sa.Float(), nullable=False),
+        sa.Column("price_count", sa.Integer(), nullable=False),
+    )
+    op.create_index(
+        "uq_fruit_price_rollups_bucket_fruit_period",
+        "fruit_price_rollups",
+        ["bucket", "fruit_id", "period_start"],
+        unique=True,
+    )
+    op.create_index("ix_fruit_price_rollups_bucket_period", "fruit_price_rollups", ["bucket", "period_start"])
+
+    # Rows arrive ordered by date within each fruit, so the first price seen
+    # for a candle is its open and the last one its close.
+    candles = {}
+    result = op.get_bind().execute(sa.text(
+        "SELECT fruit_id, date, price FROM fruit_prices ORDER BY fruit_id, date"
+    ))
+    for fruit_id, day, price in result:
+        if isinstance(day, str):
+            day = date.fromisoformat(day)
+        for bucket, period_of in BUCKETS.items():
+            key = (bucket, fruit_id, period_of(day))
+            candle = candles.get(key)
+            if candle is None:
+                candles[key] = {
+                    "bucket": bucket, "fruit_id": fruit_id, "period_start": key[2],
+                    "open_date": day, "open": price, "close_date": day, "close": price,
+                    "high": price, "low": price, "price_sum": price, "price_count": 1,
+                }
+            else:
+                candle["close_date"], candle["close"] = day, price
+                candle["high"] = max(candle["high"], price)
+                candle["low"] = min(candle["low"], price)
+                candle["price_sum"] += price
+                candle["price_count"] += 1
+    if candles:
+        op.bulk_insert(rollups, list(candles.values()))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_fruit_price_rollups_bucket_period", table_name="fruit_price_rollups")
+    op.drop_index("uq_fruit_price_rollups_bucket_fruit_period", table_name="fruit_price_rollups")
+    op.drop_table("fruit_price_rollups")
@@ -0,0 +1,35 @@
+"""indexes for keyset pagination
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:00.000000
+
+Filtered list endpoints page by (filter, id), and /prices pages by
+(date, id), so each page is a short index range scan whatever its depth.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_fruits_rarity_level_id", "fruits", ["rarity_level", "id"])
+    op.create_index("ix_vendors_species_id", "vendors", ["species", "id"])
+    op.create_index("ix_fruit_prices_date_id", "fruit_prices", ["date", "id"])
+    op.drop_index("ix_fruit_prices_date", table_name="fruit_prices")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index("ix_fruit_prices_date", "fruit_prices", ["date"])
+    op.drop_index("ix_fruit_prices_date_id", table_name="fruit_prices")
+    op.drop_index("ix_vendors_species_id", table_name="vendors")
+    op.drop_index("ix_fruits_rarity_level_id", table_name="fruits")
@@ -0,0 +1,43 @@
+"""vendor popularity leaderboard
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 00:00:00.000000
+
+Creates vendor_scores and fills it from vendor_inventory. Afterwards
+trades, inventory additions and rarity changes keep it current by delta,
+and an hourly job rebuilds it to repair drift.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "vendor_scores",
+        sa.Column("vendor_id", sa.Integer(), sa.ForeignKey("vendors.id"), primary_key=True),
+        sa.Column("score", sa.BigInteger(), nullable=False),
+    )
+    op.create_index("ix_vendor_scores_score_vendor", "vendor_scores", ["score", "vendor_id"])
+    op.execute(
+        "INSERT INTO vendor_scores (vendor_id, score) "
+        "SELECT vi.vendor_id, SUM(vi.quantity * COALESCE(f.rarity_level, 0)) "
+        "FROM vendor_inventory vi JOIN fruits f ON f.id = vi.fruit_id "
+        "GROUP BY vi.vendor_id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_vendor_scores_score_vendor", table_name="vendor_scores")
+    op.drop_table("vendor_scores")
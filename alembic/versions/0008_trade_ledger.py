@@ -0,0 +1,51 @@
+"""append-only trade ledger
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 00:00:00.000000
+
+Creates trades, one row per completed trade, with a covering
+(vendor, id) index for each side of the trade so per-vendor history
+pages stay index-only as the ledger grows.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, Sequence[str], None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PAYLOAD = ["created_at", "trade_type", "from_vendor_id", "to_vendor_id", "fruit_id", "quantity", "base_value", "tax", "total_cost", "alien_currency"]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "trades",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("entry_id", sa.String(length=32), nullable=False, unique=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("trade_type", sa.String(), nullable=False),
+        sa.Column("from_vendor_id", sa.Integer(), sa.ForeignKey("vendors.id"), nullable=False),
+        sa.Column("to_vendor_id", sa.Integer(), sa.ForeignKey("vendors.id"), nullable=False),
+        sa.Column("fruit_id", sa.Integer(), sa.ForeignKey("fruits.id"), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("base_value", sa.Float(), nullable=False),
+        sa.Column("tax", sa.Float(), nullable=False),
+        sa.Column("total_cost", sa.Float(), nullable=False),
+        sa.Column("alien_currency", sa.Boolean(), nullable=False),
+    )
+    op.create_index("ix_trades_from_vendor_id", "trades", ["from_vendor_id", "id"], postgresql_include=PAYLOAD)
+    op.create_index("ix_trades_to_vendor_id", "trades", ["to_vendor_id", "id"], postgresql_include=PAYLOAD)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_trades_to_vendor_id", table_name="trades")
+    op.drop_index("ix_trades_from_vendor_id", table_name="trades")
+    op.drop_table("trades")
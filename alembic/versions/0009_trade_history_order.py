@@ -0,0 +1,38 @@
+"""order trade history by trade time
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 00:00:00.000000
+
+Replaces the (vendor, id) trade indexes with (vendor, created_at, id).
+Entries replayed from the ledger spool get later ids than trades made
+after them, so history pages are now keyed on when the trade happened.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, Sequence[str], None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PAYLOAD = ["created_at", "trade_type", "from_vendor_id", "to_vendor_id", "fruit_id", "quantity", "base_value", "tax", "total_cost", "alien_currency"]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_trades_from_vendor_created_at", "trades", ["from_vendor_id", "created_at", "id"], postgresql_include=PAYLOAD)
+    op.create_index("ix_trades_to_vendor_created_at", "trades", ["to_vendor_id", "created_at", "id"], postgresql_include=PAYLOAD)
+    op.drop_index("ix_trades_to_vendor_id", table_name="trades")
+    op.drop_index("ix_trades_from_vendor_id", table_name="trades")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index("ix_trades_from_vendor_id", "trades", ["from_vendor_id", "id"], postgresql_include=PAYLOAD)
+    op.create_index("ix_trades_to_vendor_id", "trades", ["to_vendor_id", "id"], postgresql_include=PAYLOAD)
+    op.drop_index("ix_trades_to_vendor_created_at", table_name="trades")
+    op.drop_index("ix_trades_from_vendor_created_at", table_name="trades")
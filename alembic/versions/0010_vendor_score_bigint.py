@@ -0,0 +1,33 @@
+"""widen vendor_scores.score to bigint
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 00:00:00.000000
+
+A score is quantity * rarity_level summed over a vendor's inventory, which
+outgrows a 32-bit integer for large inventories. 0006 now creates the
+column as bigint; this widens it where 0006 already ran.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, Sequence[str], None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table("vendor_scores") as batch:
+        batch.alter_column("score", type_=sa.BigInteger(), existing_type=sa.Integer(), existing_nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("vendor_scores") as batch:
+        batch.alter_column("score", type_=sa.Integer(), existing_type=sa.BigInteger(), existing_nullable=False)
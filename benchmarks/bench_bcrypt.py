@@ -0,0 +1,75 @@
+"""Login throughput versus bcrypt cost.
+
+Verifies a password concurrently through the same bounded executor
+/auth/token uses and reports verifications per second for each cost,
+so BCRYPT_ROUNDS can be chosen against a login-rate target.
+
+    SECRET_KEY=x python -m benchmarks.bench_bcrypt --rounds 8 10 12 --concurrency 16
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from passlib.context import CryptContext
+
+from src.app.utils.executor import BoundedExecutor, ExecutorOverloaded
+
+PASSWORD = "Benchmark1!"
+
+async def _login_storm(executor: BoundedExecutor, context: CryptContext, hashed: str, requests: int, concurrency: int):
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(None)
+    latencies, rejected = [], 0
+
+    async def client():
+        nonlocal rejected
+        while not queue.empty():
+            queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                await executor.run(context.verify_and_update, PASSWORD, hashed)
+            except ExecutorOverloaded:
+                rejected += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies, rejected
+
+def bench(rounds: int, requests: int, concurrency: int, workers: int, max_pending: int) -> dict:
+    context = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=rounds)
+    hashed = context.hash(PASSWORD)
+    executor = BoundedExecutor(workers, max_pending, thread_name_prefix="bench-bcrypt")
+    try:
+        started = time.perf_counter()
+        latencies, rejected = asyncio.run(_login_storm(executor, context, hashed, requests, concurrency))
+        elapsed = time.perf_counter() - started
+    finally:
+        executor.shutdown()
+    latencies.sort()
+    return {
+        "rounds": rounds,
+        "ok": len(latencies),
+        "rejected": rejected,
+        "logins_per_s": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure login (bcrypt verify) throughput per cost factor.")
+    parser.add_argument("--rounds", type=int, nargs="+", default=[4, 6, 8, 10, 12])
+    parser.add_argument("--requests", type=int, default=200, help="Logins per cost factor")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent simulated clients")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Hashing threads (BCRYPT_WORKERS)")
+    parser.add_argument("--max-pending", type=int, default=32, help="Queued hashes before 503 (BCRYPT_MAX_PENDING)")
+    args = parser.parse_args(argv)
+    print(f"{'rounds':>6} {'ok':>6} {'503':>6} {'logins/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for rounds in args.rounds:
+        r = bench(rounds, args.requests, args.concurrency, args.workers, args.max_pending)
+        print(f"{r['rounds']:>6} {r['ok']:>6} {r['rejected']:>6} {r['logins_per_s']:>10.1f} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Worker cold start: time from a fresh interpreter to the first response.
+
+Each run is a new process that imports ``src.app.main``, builds the app with
+``create_app()``, runs its lifespan startup and serves ``GET /``. The medians
+of each stage are reported, with and without the scheduler. Startup opens
+no database connection, so no database needs to exist.
+
+    SECRET_KEY=x DATABASE_URL=sqlite:// python -m benchmarks.bench_cold_start --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import src.app.main as main
+imported = time.perf_counter()
+app = main.create_app(scheduler={scheduler})
+created = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app) as client:
+    assert client.get("/").status_code == 200
+    served = time.perf_counter()
+print(json.dumps({{"import_ms": (imported - started) * 1000, "create_app_ms": (created - imported) * 1000,
+                  "first_request_ms": (served - started) * 1000, "modules": len(sys.modules)}}))
+"""
+
+def bench(runs: int, scheduler: bool) -> dict:
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-W", "ignore", "-c", PROBE.format(scheduler=scheduler)],
+            check=True, capture_output=True, text=True, env=os.environ,
+        ).stdout
+        samples.append(json.loads(out.strip().splitlines()[-1]))
+    return {key: statistics.median(s[key] for s in samples) for key in samples[0]}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure time from process start to the first response.")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+    print(f"{'scheduler':>9} {'import ms':>10} {'create ms':>10} {'first req ms':>13} {'modules':>8}")
+    for scheduler in (False, True):
+        r = bench(args.runs, scheduler)
+        print(f"{'on' if scheduler else 'off':>9} {r['import_ms']:>10.0f} {r['create_app_ms']:>10.0f} {r['first_request_ms']:>13.0f} {r['modules']:>8.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""/prices serialization: ORM entities + response_model versus column tuples + FastJSONResponse.
+
+Loads N price rows into an in-memory SQLite database and times both paths
+end to end: the query, then turning the rows into the JSON body. The ORM
+path mirrors what FastAPI does for a ``response_model`` (validate from
+attributes, ``jsonable_encoder``, stdlib ``json.dumps``). The fast path is
+what the list routes now do. Install the ``fast-json`` extra to measure
+with orjson.
+
+    python -m benchmarks.bench_serialization --rows 10000 100000
+"""
+import argparse
+import json
+import statistics
+import time
+from datetime import date, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from src.app.crud.fruit import historical_prices_stmt
+from src.app.database import Base
+from src.app.models.fruit import Fruit, FruitPrice
+from src.app.schemas.fruit import FruitPriceListSchema
+from src.app.utils import serialization
+from src.app.utils.serialization import rows_as_dicts
+
+def _load(rows: int) -> Session:
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = Session(engine)
+    fruits = (rows + 999) // 1000
+    db.execute(insert(Fruit), [
+        {"id": i + 1, "name": f"Fruit {i}", "flavor_profile": "Sweet", "dimension_origin": "Earth", "rarity_level": 1, "base_value": 1.0}
+        for i in range(fruits)
+    ])
+    start = date(2020, 1, 1)
+    db.execute(insert(FruitPrice), [
+        {"fruit_id": i // 1000 + 1, "date": start + timedelta(days=i % 1000), "price": 1.0 + (i % 997) / 7}
+        for i in range(rows)
+    ])
+    db.commit()
+    return db
+
+def _orm(db: Session, rows: int) -> bytes:
+    prices = list(db.scalars(select(FruitPrice).order_by(FruitPrice.date.desc(), FruitPrice.id.desc()).limit(rows)))
+    model = FruitPriceListSchema.model_validate({"prices": prices, "next_cursor": None}, from_attributes=True)
+    content = jsonable_encoder(model)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+def _fast(db: Session, rows: int) -> bytes:
+    prices = db.execute(historical_prices_stmt(limit=rows)).all()
+    return serialization.dumps({"prices": rows_as_dicts(prices), "next_cursor": None})
+
+def bench(rows: int, repeat: int) -> dict:
+    db = _load(rows)
+    try:
+        results = {}
+        for name, path in (("orm", _orm), ("fast", _fast)):
+            timings = []
+            for _ in range(repeat):
+                db.expunge_all()
+                started = time.perf_counter()
+                body = path(db, rows)
+                timings.append(time.perf_counter() - started)
+            results[name] = {"ms": statistics.median(timings) * 1000, "bytes": len(body)}
+        if json.loads(_orm(db, rows)) != json.loads(_fast(db, rows)):
+            raise AssertionError("ORM and fast paths produced different payloads")
+    finally:
+        db.close()
+    return {"rows": rows, **results, "speedup": results["orm"]["ms"] / results["fast"]["ms"]}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare ORM/response_model and column-tuple serialization of /prices.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per path; the median is reported")
+    args = parser.parse_args(argv)
+    print(f"encoder: {'orjson' if serialization.orjson is not None else 'json (stdlib)'}")
+    print(f"{'rows':>8} {'orm ms':>10} {'fast ms':>10} {'speedup':>8} {'bytes':>10}")
+    for rows in args.rows:
+        r = bench(rows, args.repeat)
+        print(f"{r['rows']:>8} {r['orm']['ms']:>10.1f} {r['fast']['ms']:>10.1f} {r['speedup']:>7.1f}x {r['fast']['bytes']:>10}")
+
+if __name__ == "__main__":
+    main()
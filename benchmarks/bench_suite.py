@@ -0,0 +1,211 @@
+"""Throughput, latency and query counts of the hot CRUD paths at several data sizes.
+
+Each size gets its own database, filled by ``utils.market`` unless it
+already holds fruits. Every operation runs in a fresh session, like a
+request, and the suite records ops/s, p50/p99 latency and the SQL
+statements issued per call. Operations:
+
+- ``get_all_fruits`` / ``get_all_vendors``: a 100-row page after a random id
+- ``get_popular_vendors``: the top 20
+- ``get_historical_prices``: the last 100 prices of a random fruit
+- ``perform_trade``: one unit sent back and forth between two vendors; its
+  ledger entries go to the same database, written inline whenever
+  ``LEDGER_BATCH_SIZE`` of them are waiting
+- ``login``: user lookup, bcrypt verify and token issue (``BCRYPT_ROUNDS``)
+- ``jwt_decode``: token decode and identity lookup (the cold path of ``get_current_user``)
+
+Results are written as JSON. Compare them with an earlier run using
+``--baseline``, which exits with status 1 when an operation's p50 grew by
+more than ``--tolerance`` or it issues more queries.
+
+    SECRET_KEY=x DATABASE_URL=sqlite:// python -m benchmarks.bench_suite --sizes small medium --output after.json --baseline before.json
+    # Postgres, one database per size:
+    ... --database-url postgresql://localhost/bench_{size}
+"""
+import argparse
+import itertools
+import json
+import platform
+import tempfile
+import time
+from datetime import datetime, UTC
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+import sqlalchemy
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from src.app.auth import create_access_token, create_refresh_token, decode_token, get_password_hash, verify_and_update_password
+from src.app.crud.fruit import get_all_fruits, get_historical_prices
+from src.app.crud.trade import perform_trade
+from src.app.crud.user import create_user, get_user_by_username, get_user_identity
+from src.app.crud.vendor import get_all_vendors, get_popular_vendors
+from src.app.database import Base
+from src.app.models import Fruit, Vendor, VendorInventory
+from src.app.utils import serialization
+from src.app.utils.ledger import ledger
+from src.app.utils.market import MarketSpec, generate_market
+
+SIZES = {
+    "small": MarketSpec(fruits=200, vendors=100, inventory=5_000, days=30),
+    "medium": MarketSpec(fruits=2_000, vendors=1_000, inventory=100_000, days=90),
+    "large": MarketSpec(fruits=20_000, vendors=10_000, inventory=2_000_000, days=365),
+}
+BENCH_USER = "bench-user"
+BENCH_PASSWORD = "Benchmark1!"
+
+class _Counter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+def _percentile(timings: List[float], q: float) -> float:
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+def _prepare(engine: Engine, spec: MarketSpec, seed: int) -> Dict[str, int]:
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        if not db.scalar(select(func.count()).select_from(Fruit)):
+            generate_market(db, spec, np.random.default_rng(seed))
+        if get_user_by_username(db, BENCH_USER) is None:
+            create_user(db, BENCH_USER, BENCH_PASSWORD, get_password_hash(BENCH_PASSWORD))
+        return {
+            "fruits": db.scalar(select(func.count()).select_from(Fruit)),
+            "vendors": db.scalar(select(func.count()).select_from(Vendor)),
+            "inventory": db.scalar(select(func.count()).select_from(VendorInventory)),
+        }
+
+def _operations(engine: Engine, rng: np.random.Generator) -> Dict[str, Callable[[Session], object]]:
+    with Session(engine) as db:
+        fruit_ids = db.scalars(select(Fruit.id)).all()
+        vendor_ids = db.scalars(select(Vendor.id)).all()
+        # The best-stocked vendor of the best-stocked fruit, and any other vendor
+        source, fruit_id = db.execute(
+            select(VendorInventory.vendor_id, VendorInventory.fruit_id).order_by(VendorInventory.quantity.desc()).limit(1)
+        ).one()
+    dest = next(v for v in vendor_ids if v != source)
+    token = create_access_token({"sub": BENCH_USER})
+    trades = itertools.count()
+
+    def login(db: Session):
+        user = get_user_by_username(db, BENCH_USER)
+        valid, _ = verify_and_update_password(BENCH_PASSWORD, user.hashed_password)
+        if not valid:
+            raise AssertionError("bench user password did not verify")
+        return create_access_token({"sub": user.username}), create_refresh_token({"sub": user.username})
+
+    def trade(db: Session):
+        # Alternate direction so stock never runs out
+        a, b = (source, dest) if next(trades) % 2 == 0 else (dest, source)
+        return perform_trade(db, from_id=a, to_id=b, fruit_id=fruit_id, quantity=1, trade_type="send")
+
+    return {
+        "get_all_fruits": lambda db: get_all_fruits(db, limit=100, after=int(rng.choice(fruit_ids))),
+        "get_all_vendors": lambda db: get_all_vendors(db, limit=100, after=int(rng.choice(vendor_ids))),
+        "get_popular_vendors": lambda db: get_popular_vendors(db, limit=20),
+        "get_historical_prices": lambda db: get_historical_prices(db, fruit_id=int(rng.choice(fruit_ids)), limit=100),
+        "perform_trade": trade,
+        "login": login,
+        "jwt_decode": lambda db: get_user_identity(db, decode_token(token).username),
+    }
+
+def _measure(engine: Engine, op: Callable[[Session], object], iterations: int, warmup: int) -> dict:
+    for _ in range(warmup):
+        with Session(engine) as db:
+            op(db)
+    counter = _Counter()
+    timings = []
+    event.listen(engine, "before_cursor_execute", counter)
+    try:
+        for _ in range(iterations):
+            started = time.perf_counter()
+            with Session(engine) as db:
+                op(db)
+            timings.append(time.perf_counter() - started)
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)
+    return {
+        "iterations": iterations,
+        "ops_per_s": iterations / sum(timings),
+        "p50_ms": _percentile(timings, 0.50) * 1000,
+        "p99_ms": _percentile(timings, 0.99) * 1000,
+        "queries_per_op": counter.count / iterations,
+    }
+
+def run(size: str, url: str, iterations: int, login_iterations: int, warmup: int, seed: int) -> dict:
+    engine = create_engine(url)
+    try:
+        rows = _prepare(engine, SIZES[size], seed)
+        results = {}
+        with tempfile.TemporaryDirectory() as spool, ledger.redirect(sessionmaker(engine), Path(spool)):
+            for name, op in _operations(engine, np.random.default_rng(seed)).items():
+                count = login_iterations if name == "login" else iterations
+                results[name] = _measure(engine, op, count, min(warmup, count))
+    finally:
+        engine.dispose()
+    return {"size": size, "dialect": engine.dialect.name, "rows": rows, "operations": results}
+
+def compare(current: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Return one line per operation that is slower (p50) or chattier than in ``baseline``."""
+    previous = {(r["size"], name): m for r in baseline["runs"] for name, m in r["operations"].items()}
+    regressions = []
+    for r in current["runs"]:
+        for name, m in r["operations"].items():
+            before = previous.get((r["size"], name))
+            if before is None:
+                continue
+            if m["p50_ms"] > before["p50_ms"] * (1 + tolerance):
+                regressions.append(f"{r['size']}/{name}: p50 {before['p50_ms']:.2f}ms -> {m['p50_ms']:.2f}ms")
+            if m["queries_per_op"] > before["queries_per_op"]:
+                regressions.append(f"{r['size']}/{name}: queries/op {before['queries_per_op']:g} -> {m['queries_per_op']:g}")
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the hot CRUD paths and write the results as JSON.")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=["small", "medium"])
+    parser.add_argument("--database-url", help="Database per size, with {size} as a placeholder. Defaults to a fresh SQLite file per size.")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--login-iterations", type=int, default=20, help="bcrypt is slow on purpose; fewer runs are enough")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, default=Path("bench_results.json"))
+    parser.add_argument("--baseline", type=Path, help="Earlier --output to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p50 growth before flagging, as a fraction")
+    args = parser.parse_args(argv)
+
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            url = args.database_url.format(size=size) if args.database_url else f"sqlite:///{tmp}/{size}.db"
+            print(f"== {size} ({url.split('://')[0]})", flush=True)
+            run_result = run(size, url, args.iterations, args.login_iterations, args.warmup, args.seed)
+            print(f"   rows: {run_result['rows']}")
+            print(f"   {'operation':<24} {'ops/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'queries':>8}")
+            for name, m in run_result["operations"].items():
+                print(f"   {name:<24} {m['ops_per_s']:>10.1f} {m['p50_ms']:>8.2f} {m['p99_ms']:>8.2f} {m['queries_per_op']:>8.2f}")
+            runs.append(run_result)
+
+    current = {
+        "created": datetime.now(UTC).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "json_encoder": "orjson" if serialization.orjson is not None else "json",
+        "runs": runs,
+    }
+    args.output.write_text(json.dumps(current, indent=2))
+    print(f"wrote {args.output}")
+    if args.baseline is None:
+        return 0
+    regressions = compare(current, json.loads(args.baseline.read_text()), args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
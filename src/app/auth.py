@@ -1,13 +1,15 @@
 import os
 import re
 from datetime import datetime, timedelta, UTC
-from typing import Optional
+from typing import Optional, Tuple
 
 from dotenv import load_dotenv
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
 from src.app.schemas.auth import TokenData
+from src.app.utils.cache import TTLCache
+from src.app.utils.executor import BoundedExecutor
 
 load_dotenv()
 
@@ -22,7 +24,24 @@ try:
 except ValueError:
     ACCESS_TOKEN_EXPIRE_MINUTES = 30.0
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# Hashes at any other cost are rehashed at BCRYPT_ROUNDS on the next successful login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+# bcrypt runs here rather than in the request threadpool, so a login storm
+# gets fast 503s instead of starving every other endpoint
+password_executor = BoundedExecutor(
+    max_workers=int(os.getenv("BCRYPT_WORKERS", str(os.cpu_count() or 1))),
+    max_pending=int(os.getenv("BCRYPT_MAX_PENDING", "32")),
+    thread_name_prefix="bcrypt",
+)
 
 # Password Hashing
 def get_password_hash(password: str) -> str:
@@ -31,6 +50,18 @@ def get_password_hash(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Return (valid, new_hash); new_hash is set when the stored hash should be replaced."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+async def hash_password_async(password: str) -> str:
+    """Hash on ``password_executor``. Raises ``ExecutorOverloaded`` when it is saturated."""
+    return await password_executor.run(get_password_hash, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """``verify_and_update_password`` on ``password_executor``. Raises ``ExecutorOverloaded`` when it is saturated."""
+    return await password_executor.run(verify_and_update_password, plain_password, hashed_password)
+
 # Password Validation
 PASSWORD_REGEX = re.compile(
     r"^(?=.*[a-z])(?=.*[A-Z])(?=.*\d)(?=.*[!@#$%^&*()_+\-=[\]{};':\"\\|,.<>/?]).{8,}$"
@@ -57,7 +88,9 @@ def decode_token(token: str) -> Optional[TokenData]:
         username = payload.get("sub")
         if not isinstance(username, str):
             return None
-        return TokenData(username=username)
+        exp = payload.get("exp")
+        expires_at = datetime.fromtimestamp(exp, UTC) if isinstance(exp, (int, float)) else None
+        return TokenData(username=username, expires_at=expires_at)
     except JWTError:
         return None
 
@@ -80,4 +113,15 @@ def decode_refresh_token(token: str) -> Optional[TokenData]:
             return None
         return TokenData(username=username)
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+
+# Authenticated-user cache: access token -> AuthenticatedUser, so steady-state
+# requests skip both the JWT decode and the user/vendor lookup
+user_cache = TTLCache(
+    maxsize=int(os.getenv("AUTH_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("AUTH_CACHE_TTL", "60")),
+)
+
+def invalidate_cached_user(user_id: int) -> int:
+    """Forget every cached token of ``user_id``. Returns the number of tokens dropped."""
+    return user_cache.evict(lambda user: user.id == user_id)
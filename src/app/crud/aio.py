@@ -0,0 +1,67 @@
+"""Async twins of the hot read paths and fruit creation, for ``DATABASE_ASYNC`` mode.
+
+Each function runs the same statement as its sync counterpart in
+crud/fruit.py or crud/vendor.py on an ``AsyncSession``, so both modes
+return identical results.
+"""
+from datetime import date
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Row, Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.app.crud.fruit import (
+    cache_trend,
+    fruits_stmt,
+    get_cached_trend,
+    historical_prices_stmt,
+    price_aggregates_stmt,
+    trend_cache_key,
+    trend_stmt,
+)
+from src.app.crud.vendor import inventory_stmt, popular_vendors_stmt, vendor_by_user_id_stmt, vendor_payloads, vendors_stmt
+from src.app.models.fruit import Fruit, FruitPriceRollup
+from src.app.models.vendor import Vendor
+from src.app.utils import response_cache
+
+async def get_all_fruits(db: AsyncSession, rarity_level: Optional[int] = None, offset: int = 0, limit: int = 10, after: Optional[int] = None) -> List[Row]:
+    return (await db.execute(fruits_stmt(rarity_level, offset, limit, after))).all()
+
+async def create_fruit(db: AsyncSession, **fields) -> Fruit:
+    fruit = Fruit(**fields)
+    db.add(fruit)
+    await db.commit()
+    response_cache.bump("fruits")
+    return fruit
+
+async def get_price_trend(db: AsyncSession, fruit_name: str, days: int = 7) -> Optional[dict]:
+    key = trend_cache_key(fruit_name, days)
+    cached = get_cached_trend(key)
+    if cached is not None:
+        return cached
+    fruit = (await db.scalars(select(Fruit).filter_by(name=fruit_name))).first()
+    if not fruit:
+        return None
+    rows = (await db.execute(trend_stmt(fruit.id, key))).all()
+    return cache_trend(key, fruit, rows)
+
+async def get_historical_prices(db: AsyncSession, fruit_id: Optional[int] = None, start_date: Optional[date] = None, end_date: Optional[date] = None, limit: Optional[int] = None, after: Optional[Tuple[date, int]] = None) -> List[Row]:
+    return (await db.execute(historical_prices_stmt(fruit_id, start_date, end_date, limit, after))).all()
+
+async def get_price_aggregates(db: AsyncSession, bucket: str, fruit_id: Optional[int] = None, start_date: Optional[date] = None, end_date: Optional[date] = None, limit: Optional[int] = None) -> List[FruitPriceRollup]:
+    return list(await db.scalars(price_aggregates_stmt(bucket, fruit_id, start_date, end_date, limit)))
+
+async def get_vendor_by_user_id(db: AsyncSession, user_id: int) -> Optional[Vendor]:
+    return (await db.scalars(vendor_by_user_id_stmt(user_id))).first()
+
+async def _vendor_payloads(db: AsyncSession, stmt: Select) -> List[dict]:
+    vendors = (await db.execute(stmt)).all()
+    if not vendors:
+        return []
+    return vendor_payloads(vendors, await db.execute(inventory_stmt([v.id for v in vendors])))
+
+async def get_all_vendors(db: AsyncSession, species: Optional[str] = None, offset: int = 0, limit: int = 10, after: Optional[int] = None) -> List[dict]:
+    return await _vendor_payloads(db, vendors_stmt(species, offset, limit, after))
+
+async def get_popular_vendors(db: AsyncSession, limit: int = 5) -> List[dict]:
+    return await _vendor_payloads(db, popular_vendors_stmt(limit))
@@ -1,44 +1,236 @@
-import random
-from datetime import datetime, timedelta
-from typing import List, Optional
+import os
+from datetime import date, timedelta
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
 
-from sqlalchemy import and_
+from sqlalchemy import Row, Select, and_, case, delete, or_, select
 from sqlalchemy.orm import Session
 
-from src.app.models.fruit import Fruit, FruitPrice
+from src.app.crud.vendor import rescore_fruit
+from src.app.database import dialect_insert
+from src.app.models.fruit import Fruit, FruitPrice, FruitPriceRollup
+from src.app.schemas.fruit import FruitPriceSchema, FruitSchema
+from src.app.utils import response_cache
+from src.app.utils.cache import TTLCache
+from src.app.utils.serialization import columns_for
 
-def get_all_fruits(db: Session, rarity_level: Optional[int] = None, offset: int = 0, limit: int = 10) -> List[Fruit]:
-    query = db.query(Fruit)
+# Price trends keyed by (fruit name, window, day); cleared by the daily price job
+_trend_cache = TTLCache(
+    maxsize=int(os.getenv("PRICE_TREND_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("PRICE_TREND_CACHE_TTL", "300")),
+)
+
+# Maps a day to the first day of the candle it belongs to
+ROLLUP_BUCKETS = {
+    "week": lambda day: day - timedelta(days=day.weekday()),
+    "month": lambda day: day.replace(day=1),
+}
+
+# List reads select these plain columns rather than entities; see utils/serialization.py
+FRUIT_COLUMNS = columns_for(Fruit, FruitSchema)
+PRICE_COLUMNS = columns_for(FruitPrice, FruitPriceSchema)
+
+# Statement builders below are shared by these sync functions and their async twins in crud/aio.py
+
+def fruits_stmt(rarity_level: Optional[int] = None, offset: int = 0, limit: int = 10, after: Optional[int] = None) -> Select:
+    stmt = select(*FRUIT_COLUMNS)
     if rarity_level is not None:
-        query = query.filter(Fruit.rarity_level == rarity_level)
-    return query.offset(offset).limit(limit).all()
+        stmt = stmt.where(Fruit.rarity_level == rarity_level)
+    if after is not None:
+        # Keyset pagination: seek past the last id instead of counting an offset
+        stmt = stmt.where(Fruit.id > after)
+    return stmt.order_by(Fruit.id).offset(offset).limit(limit)
+
+def get_all_fruits(db: Session, rarity_level: Optional[int] = None, offset: int = 0, limit: int = 10, after: Optional[int] = None) -> List[Row]:
+    return db.execute(fruits_stmt(rarity_level, offset, limit, after)).all()
+
+def create_fruit(db: Session, **fields) -> Fruit:
+    fruit = Fruit(**fields)
+    db.add(fruit)
+    db.commit()
+    response_cache.bump("fruits")
+    return fruit
+
+def set_fruit_rarity(db: Session, fruit_id: int, rarity_level: int) -> Optional[Fruit]:
+    """Change a fruit's rarity and shift the leaderboard score of every vendor holding it."""
+    fruit = db.query(Fruit).filter(Fruit.id == fruit_id).with_for_update().first()
+    if fruit is None:
+        return None
+    rescore_fruit(db, fruit_id, rarity_level - (fruit.rarity_level or 0))
+    fruit.rarity_level = rarity_level
+    db.commit()
+    response_cache.bump("fruits")
+    db.refresh(fruit)
+    return fruit
+
+def get_price_trend(db: Session, fruit_name: str, days: int = 7):
+    """Return the stored daily prices of a fruit over the last ``days`` days.
 
-def get_price_trend(db: Session, fruit_name: str):
-    fruit = db.query(Fruit).filter_by(name=fruit_name).first()
+    Results are cached per (fruit, window, day) until the TTL lapses or the
+    daily price job calls ``invalidate_price_trends``.
+    """
+    key = trend_cache_key(fruit_name, days)
+    cached = get_cached_trend(key)
+    if cached is not None:
+        return cached
+
+    fruit = db.scalars(select(Fruit).filter_by(name=fruit_name)).first()
     if not fruit:
         return None
+    rows = db.execute(trend_stmt(fruit.id, key)).all()
+    return cache_trend(key, fruit, rows)
+
+def trend_cache_key(fruit_name: str, days: int) -> tuple:
+    return (fruit_name, days, date.today())
 
-    base = fruit.base_value
-    today = datetime.today()
-    days = [today - timedelta(days=i) for i in range(6, -1, -1)]
+def trend_stmt(fruit_id: int, key: tuple) -> Select:
+    _, days, today = key
+    return (
+        select(FruitPrice.date, FruitPrice.price)
+        .where(FruitPrice.fruit_id == fruit_id, FruitPrice.date > today - timedelta(days=days))
+        .order_by(FruitPrice.date)
+    )
 
-    prices = []
-    for day in days:
-        fluctuation = random.uniform(-0.2, 0.2)  # ±20%
-        price = round(base + base * fluctuation, 2)
-        prices.append({"date": day.strftime("%Y-%m-%d"), "price": price})
+def cache_trend(key: tuple, fruit: Fruit, rows: Sequence[Row]) -> dict:
+    prices = [{"date": day.strftime("%Y-%m-%d"), "price": price} for day, price in rows]
+    trend = {"fruit": key[0], "base_value": fruit.base_value, "trend": prices}
+    _trend_cache.set(key, trend)
+    return trend
 
-    return {"fruit": fruit_name, "base_value": base, "trend": prices}
+def get_cached_trend(key: tuple) -> Optional[dict]:
+    return _trend_cache.get(key)
 
-def get_historical_prices(db: Session, fruit_id: Optional[int] = None, start_date: Optional[str] = None, end_date: Optional[str] = None, limit: Optional[int] = None):
-    query = db.query(FruitPrice)
+def invalidate_price_trends() -> None:
+    _trend_cache.clear()
+
+def _filter_prices(query, fruit_id: Optional[int], start_date: Optional[date], end_date: Optional[date], after: Optional[Tuple[date, int]] = None):
     if fruit_id is not None:
         query = query.filter(FruitPrice.fruit_id == fruit_id)
     if start_date is not None:
         query = query.filter(FruitPrice.date >= start_date)
     if end_date is not None:
         query = query.filter(FruitPrice.date <= end_date)
-    query = query.order_by(FruitPrice.date.desc())
+    if after is not None:
+        # Rows strictly after (date, id) in (date desc, id desc) order, written so the date bound uses the index
+        after_date, after_id = after
+        query = query.filter(
+            FruitPrice.date <= after_date,
+            or_(FruitPrice.date < after_date, FruitPrice.id < after_id),
+        )
+    return query.order_by(FruitPrice.date.desc(), FruitPrice.id.desc())
+
+def historical_prices_stmt(fruit_id: Optional[int] = None, start_date: Optional[date] = None, end_date: Optional[date] = None, limit: Optional[int] = None, after: Optional[Tuple[date, int]] = None) -> Select:
+    stmt = _filter_prices(select(*PRICE_COLUMNS), fruit_id, start_date, end_date, after)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+def get_historical_prices(db: Session, fruit_id: Optional[int] = None, start_date: Optional[date] = None, end_date: Optional[date] = None, limit: Optional[int] = None, after: Optional[Tuple[date, int]] = None) -> List[Row]:
+    return db.execute(historical_prices_stmt(fruit_id, start_date, end_date, limit, after)).all()
+
+def iter_historical_prices(db: Session, fruit_id: Optional[int] = None, start_date: Optional[date] = None, end_date: Optional[date] = None, batch_size: int = 1000) -> Iterator[Sequence[Row]]:
+    """Yield (id, fruit_id, date, price) rows in batches from a server-side cursor.
+
+    Only one batch is held in memory at a time, however many rows match.
+    """
+    stmt = _filter_prices(select(*PRICE_COLUMNS), fruit_id, start_date, end_date)
+    result = db.execute(stmt.execution_options(yield_per=batch_size))
+    yield from result.partitions()
+
+def store_daily_prices(db: Session, rows: Sequence[dict]) -> List[Tuple[int, date, float]]:
+    """Insert daily prices and fold them into the OHLC rollups.
+
+    Fruit/day pairs that already have a price are skipped, so re-running a
+    day never double-counts it in the rollups. Returns the inserted
+    (fruit_id, date, price) rows. The caller commits.
+    """
+    if not rows:
+        return []
+    table = FruitPrice.__table__
+    stmt = (
+        dialect_insert(db, table)
+        .on_conflict_do_nothing(index_elements=["fruit_id", "date"])
+        .returning(table.c.fruit_id, table.c.date, table.c.price)
+    )
+    inserted = [tuple(row) for row in db.execute(stmt, list(rows))]
+    merge_price_rollups(db, inserted)
+    return inserted
+
+def merge_price_rollups(db: Session, prices: Iterable[Tuple[int, date, float]]) -> None:
+    """Merge (fruit_id, date, price) rows into the weekly and monthly candles.
+
+    Rows are first reduced to one partial candle per bucket in memory, then
+    combined with any stored candle in a single upsert, so the cost is
+    proportional to the number of candles touched, not to the history.
+    """
+    partials = {}
+    for fruit_id, day, price in prices:
+        for bucket, period_of in ROLLUP_BUCKETS.items():
+            key = (bucket, fruit_id, period_of(day))
+            candle = partials.get(key)
+            if candle is None:
+                partials[key] = {
+                    "bucket": bucket, "fruit_id": fruit_id, "period_start": key[2],
+                    "open_date": day, "open": price, "close_date": day, "close": price,
+                    "high": price, "low": price, "price_sum": price, "price_count": 1,
+                }
+                continue
+            if day < candle["open_date"]:
+                candle["open_date"], candle["open"] = day, price
+            if day > candle["close_date"]:
+                candle["close_date"], candle["close"] = day, price
+            candle["high"] = max(candle["high"], price)
+            candle["low"] = min(candle["low"], price)
+            candle["price_sum"] += price
+            candle["price_count"] += 1
+    upsert_price_candles(db, list(partials.values()))
+
+def upsert_price_candles(db: Session, candles: List[dict]) -> None:
+    """Combine partial candles with the stored ones (or insert them) in one upsert."""
+    if not candles:
+        return
+    table = FruitPriceRollup.__table__
+    stmt = dialect_insert(db, table)
+    new, old = stmt.excluded, table.c
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["bucket", "fruit_id", "period_start"],
+        set_={
+            "open": case((new.open_date < old.open_date, new.open), else_=old.open),
+            "open_date": case((new.open_date < old.open_date, new.open_date), else_=old.open_date),
+            "close": case((new.close_date > old.close_date, new.close), else_=old.close),
+            "close_date": case((new.close_date > old.close_date, new.close_date), else_=old.close_date),
+            "high": case((new.high > old.high, new.high), else_=old.high),
+            "low": case((new.low < old.low, new.low), else_=old.low),
+            "price_sum": old.price_sum + new.price_sum,
+            "price_count": old.price_count + new.price_count,
+        },
+    )
+    db.execute(stmt, candles)
+
+def rebuild_price_rollups(db: Session, batch_size: int = 10000) -> None:
+    """Recompute every candle from fruit_prices, streaming the raw rows."""
+    db.execute(delete(FruitPriceRollup))
+    rows = db.execute(
+        select(FruitPrice.fruit_id, FruitPrice.date, FruitPrice.price)
+        .order_by(FruitPrice.fruit_id, FruitPrice.date)
+        .execution_options(yield_per=batch_size)
+    )
+    for chunk in rows.partitions():
+        merge_price_rollups(db, chunk)
+    db.commit()
+
+def price_aggregates_stmt(bucket: str, fruit_id: Optional[int] = None, start_date: Optional[date] = None, end_date: Optional[date] = None, limit: Optional[int] = None) -> Select:
+    stmt = select(FruitPriceRollup).where(FruitPriceRollup.bucket == bucket)
+    if fruit_id is not None:
+        stmt = stmt.where(FruitPriceRollup.fruit_id == fruit_id)
+    if start_date is not None:
+        # Include the candle that contains start_date
+        stmt = stmt.where(FruitPriceRollup.period_start >= ROLLUP_BUCKETS[bucket](start_date))
+    if end_date is not None:
+        stmt = stmt.where(FruitPriceRollup.period_start <= end_date)
+    stmt = stmt.order_by(FruitPriceRollup.period_start.desc(), FruitPriceRollup.fruit_id)
     if limit is not None:
-        query = query.limit(limit)
-    return query.all() 
\ No newline at end of file
+        stmt = stmt.limit(limit)
+    return stmt
+
+def get_price_aggregates(db: Session, bucket: str, fruit_id: Optional[int] = None, start_date: Optional[date] = None, end_date: Optional[date] = None, limit: Optional[int] = None) -> List[FruitPriceRollup]:
+    return list(db.scalars(price_aggregates_stmt(bucket, fruit_id, start_date, end_date, limit)))
@@ -1,15 +1,35 @@
+from datetime import UTC, datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+from sqlalchemy import Row, Select, or_, select, tuple_, union_all, update
 from sqlalchemy.orm import Session
 
+from src.app.crud.vendor import adjust_vendor_scores, credit_inventory, upsert_inventory
 from src.app.models.fruit import VendorInventory, Fruit
+from src.app.models.trade import Trade
+from src.app.schemas.trade import TradeLedgerEntrySchema, TradeRequest
+from src.app.utils import response_cache
+from src.app.utils.ledger import ledger
+from src.app.utils.serialization import columns_for
 
-def perform_trade(db: Session, *, from_id: int, to_id: int, fruit_id: int, quantity: int, trade_type: str, currency_amount: float = None, alien_currency: bool = True):
-    fruit = db.query(Fruit).filter_by(id=fruit_id).first()
-    if fruit is None:
-        raise ValueError("Fruit not found")
+ALIEN_EXCHANGE_RATE = 3.14
+
+# Which side gives up the fruit for each trade type, and the error raised when it can't
+TRADE_FLOWS = {
+    "send": ("from", "Insufficient stock to send"),
+    # B sends fruit to A (A requests, B must have stock)
+    "request": ("to", "Requested vendor has insufficient stock"),
+    # A buys fruit from B for currency
+    "buy": ("to", "Seller has insufficient stock"),
+    # A sells fruit to B for currency
+    "sell": ("from", "Seller has insufficient stock"),
+}
+
+def _trade_details(fruit: Fruit, quantity: int, trade_type: str, alien_currency: bool) -> dict:
     # Calculate base value in alien currency if needed
     base_value = fruit.base_value
     if alien_currency:
-        ALIEN_EXCHANGE_RATE = 3.14
         base_value = base_value * ALIEN_EXCHANGE_RATE
     tax = (base_value * quantity) * (fruit.rarity_level / 10.0)
     total_cost = (base_value * quantity) + tax
@@ -19,64 +39,188 @@ def perform_trade(db: Session, *, from_id: int, to_id: int, fruit_id: int, quant
         "base_value": base_value,
         "tax": tax,
         "total_cost": total_cost,
-        "alien_currency": alien_currency
+        "alien_currency": alien_currency,
+        "trade_type": trade_type,
     }
-    if trade_type == "send":
-        from_inv = db.query(VendorInventory).filter_by(vendor_id=from_id, fruit_id=fruit_id).first()
-        if from_inv is None or from_inv.quantity < quantity:
-            raise ValueError("Insufficient stock to send")
-        to_inv = db.query(VendorInventory).filter_by(vendor_id=to_id, fruit_id=fruit_id).first()
-        from_inv.quantity -= quantity
-        if to_inv:
-            to_inv.quantity += quantity
-        else:
-            to_inv = VendorInventory(vendor_id=to_id, fruit_id=fruit_id, quantity=quantity)
-            db.add(to_inv)
-        db.commit()
-        return {**details, "trade_type": "send"}
-    elif trade_type == "request":
-        # B sends fruit to A (A requests, B must have stock)
-        from_inv = db.query(VendorInventory).filter_by(vendor_id=to_id, fruit_id=fruit_id).first()
-        if from_inv is None or from_inv.quantity < quantity:
-            raise ValueError("Requested vendor has insufficient stock")
-        to_inv = db.query(VendorInventory).filter_by(vendor_id=from_id, fruit_id=fruit_id).first()
-        from_inv.quantity -= quantity
-        if to_inv:
-            to_inv.quantity += quantity
-        else:
-            to_inv = VendorInventory(vendor_id=from_id, fruit_id=fruit_id, quantity=quantity)
-            db.add(to_inv)
-        db.commit()
-        return {**details, "trade_type": "request"}
-    elif trade_type == "buy":
-        # A buys fruit from B for currency
-        from_inv = db.query(VendorInventory).filter_by(vendor_id=to_id, fruit_id=fruit_id).first()
-        if from_inv is None or from_inv.quantity < quantity:
-            raise ValueError("Seller has insufficient stock")
-        to_inv = db.query(VendorInventory).filter_by(vendor_id=from_id, fruit_id=fruit_id).first()
-        from_inv.quantity -= quantity
-        if to_inv:
-            to_inv.quantity += quantity
-        else:
-            to_inv = VendorInventory(vendor_id=from_id, fruit_id=fruit_id, quantity=quantity)
-            db.add(to_inv)
+    if trade_type in ("buy", "sell"):
         # Currency transfer would be handled here (not modeled)
-        db.commit()
-        return {**details, "trade_type": "buy", "currency_amount": total_cost}
-    elif trade_type == "sell":
-        # A sells fruit to B for currency
-        from_inv = db.query(VendorInventory).filter_by(vendor_id=from_id, fruit_id=fruit_id).first()
-        if from_inv is None or from_inv.quantity < quantity:
-            raise ValueError("Seller has insufficient stock")
-        to_inv = db.query(VendorInventory).filter_by(vendor_id=to_id, fruit_id=fruit_id).first()
-        from_inv.quantity -= quantity
-        if to_inv:
-            to_inv.quantity += quantity
+        details["currency_amount"] = total_cost
+    return details
+
+def _ledger_entry(from_id: int, to_id: int, fruit_id: int, details: dict, created_at: datetime) -> dict:
+    return {
+        "entry_id": uuid4().hex,
+        "created_at": created_at,
+        "trade_type": details["trade_type"],
+        "from_vendor_id": from_id,
+        "to_vendor_id": to_id,
+        "fruit_id": fruit_id,
+        "quantity": details["quantity"],
+        "base_value": details["base_value"],
+        "tax": details["tax"],
+        "total_cost": details["total_cost"],
+        "alien_currency": details["alien_currency"],
+    }
+
+def _utcnow() -> datetime:
+    return datetime.now(UTC).replace(tzinfo=None)
+
+def _trade_parties(trade_type: str, from_id: int, to_id: int) -> Tuple[int, int]:
+    """Return (source_vendor_id, destination_vendor_id) for a trade."""
+    if TRADE_FLOWS[trade_type][0] == "from":
+        return from_id, to_id
+    return to_id, from_id
+
+def _debit_inventory(db: Session, vendor_id: int, fruit_id: int, quantity: int) -> bool:
+    """Atomically take ``quantity`` from a vendor's stock if it has enough.
+
+    The stock check lives in the WHERE clause, so two concurrent trades can
+    never both pass it and oversell the same row.
+    """
+    stmt = (
+        update(VendorInventory)
+        .where(
+            VendorInventory.vendor_id == vendor_id,
+            VendorInventory.fruit_id == fruit_id,
+            VendorInventory.quantity >= quantity,
+        )
+        .values(quantity=VendorInventory.quantity - quantity)
+        .returning(VendorInventory.quantity)
+        .execution_options(synchronize_session=False)
+    )
+    return db.execute(stmt).first() is not None
+
+def perform_trade(db: Session, *, from_id: int, to_id: int, fruit_id: int, quantity: int, trade_type: str, currency_amount: float = None, alien_currency: bool = True):
+    fruit = db.get(Fruit, fruit_id)
+    if fruit is None:
+        raise ValueError("Fruit not found")
+    if trade_type not in TRADE_FLOWS:
+        raise ValueError("Invalid trade_type")
+    details = _trade_details(fruit, quantity, trade_type, alien_currency)
+    source_id, dest_id = _trade_parties(trade_type, from_id, to_id)
+    if not _debit_inventory(db, source_id, fruit_id, quantity):
+        db.rollback()
+        raise ValueError(TRADE_FLOWS[trade_type][1])
+    upsert_inventory(db, dest_id, fruit_id, quantity)
+    points = quantity * (fruit.rarity_level or 0)
+    adjust_vendor_scores(db, {source_id: -points, dest_id: points})
+    db.commit()
+    response_cache.bump("vendors")
+    ledger.record([_ledger_entry(from_id, to_id, fruit_id, details, _utcnow())])
+    return details
+
+def perform_trades(db: Session, trades: Sequence[TradeRequest], *, atomic: bool = True) -> List[Tuple[Optional[dict], Optional[str]]]:
+    """Apply many trades in a single transaction.
+
+    Fruits are loaded with one query and every inventory row the batch touches
+    is locked up front, ordered by (vendor_id, fruit_id) so concurrent batches
+    always acquire locks in the same order. Trades are then replayed in memory
+    in request order and the resulting balances written back in bulk.
+
+    Returns one (details, error) pair per trade. With ``atomic=True`` the first
+    failing trade rolls back the whole batch and raises ``ValueError``;
+    otherwise failing trades are skipped and reported in their pair.
+    """
+    fruit_ids = {t.fruit_id for t in trades}
+    fruits: Dict[int, Fruit] = {
+        f.id: f for f in db.query(Fruit).filter(Fruit.id.in_(fruit_ids))
+    } if fruit_ids else {}
+
+    keys = set()
+    for t in trades:
+        if t.fruit_id in fruits and t.trade_type in TRADE_FLOWS:
+            for vendor_id in _trade_parties(t.trade_type, t.from_vendor_id, t.to_vendor_id):
+                keys.add((vendor_id, t.fruit_id))
+
+    rows: Dict[Tuple[int, int], VendorInventory] = {}
+    if keys:
+        locked = (
+            db.query(VendorInventory)
+            .filter(tuple_(VendorInventory.vendor_id, VendorInventory.fruit_id).in_(sorted(keys)))
+            .order_by(VendorInventory.vendor_id, VendorInventory.fruit_id, VendorInventory.id)
+            .with_for_update()
+            .all()
+        )
+        for row in locked:
+            rows.setdefault((row.vendor_id, row.fruit_id), row)
+    balances = {key: row.quantity for key, row in rows.items()}
+    score_deltas: Dict[int, int] = {}
+
+    results: List[Tuple[Optional[dict], Optional[str]]] = []
+    for index, t in enumerate(trades):
+        fruit = fruits.get(t.fruit_id)
+        if fruit is None:
+            error = "Fruit not found"
+        elif t.trade_type not in TRADE_FLOWS:
+            error = "Invalid trade_type"
         else:
-            to_inv = VendorInventory(vendor_id=to_id, fruit_id=fruit_id, quantity=quantity)
-            db.add(to_inv)
-        # Currency transfer would be handled here (not modeled)
-        db.commit()
-        return {**details, "trade_type": "sell", "currency_amount": total_cost}
-    else:
-        raise ValueError("Invalid trade_type") 
\ No newline at end of file
+            source_id, dest_id = _trade_parties(t.trade_type, t.from_vendor_id, t.to_vendor_id)
+            source_key, dest_key = (source_id, t.fruit_id), (dest_id, t.fruit_id)
+            available = balances.get(source_key)
+            if available is None or available < t.quantity:
+                error = TRADE_FLOWS[t.trade_type][1]
+            else:
+                error = None
+                balances[source_key] = available - t.quantity
+                balances[dest_key] = balances.get(dest_key, 0) + t.quantity
+                points = t.quantity * (fruit.rarity_level or 0)
+                score_deltas[source_id] = score_deltas.get(source_id, 0) - points
+                score_deltas[dest_id] = score_deltas.get(dest_id, 0) + points
+        if error is not None:
+            if atomic:
+                db.rollback()
+                raise ValueError(f"Trade {index}: {error}")
+            results.append((None, error))
+        else:
+            results.append((_trade_details(fruit, t.quantity, t.trade_type, t.alien_currency), None))
+
+    changed = [
+        {"id": rows[key].id, "quantity": quantity}
+        for key, quantity in balances.items()
+        if key in rows and rows[key].quantity != quantity
+    ]
+    created = [
+        {"vendor_id": vendor_id, "fruit_id": fruit_id, "quantity": quantity}
+        for (vendor_id, fruit_id), quantity in balances.items()
+        if (vendor_id, fruit_id) not in rows
+    ]
+    if changed:
+        db.execute(update(VendorInventory), changed)
+    if created:
+        # Rows created by a concurrent writer since we locked are credited, not clobbered
+        credit_inventory(db, created)
+    adjust_vendor_scores(db, score_deltas)
+    db.commit()
+    response_cache.bump("vendors")
+    now = _utcnow()
+    ledger.record(
+        _ledger_entry(t.from_vendor_id, t.to_vendor_id, t.fruit_id, details, now)
+        for t, (details, error) in zip(trades, results)
+        if error is None
+    )
+    return results
+
+LEDGER_COLUMNS = columns_for(Trade, TradeLedgerEntrySchema)
+
+def trade_history_stmt(vendor_id: int, limit: int = 50, after: Optional[Tuple[datetime, int]] = None) -> Select:
+    """Trades ``vendor_id`` sent or received, newest first by (created_at, id).
+
+    Each side is read from its own (vendor, created_at, id) index and the
+    two pages are merged, so a page costs two short index range scans
+    whatever the ledger's size. Self-trades come from the sending side only.
+    """
+    def side(*where):
+        stmt = select(*LEDGER_COLUMNS).where(*where)
+        if after is not None:
+            # Rows strictly after (created_at, id) in descending order, written so the time bound uses the index
+            after_at, after_id = after
+            stmt = stmt.where(Trade.created_at <= after_at, or_(Trade.created_at < after_at, Trade.id < after_id))
+        return select(stmt.order_by(Trade.created_at.desc(), Trade.id.desc()).limit(limit).subquery())
+
+    sent = side(Trade.from_vendor_id == vendor_id)
+    received = side(Trade.to_vendor_id == vendor_id, Trade.from_vendor_id != vendor_id)
+    merged = union_all(sent, received).subquery()
+    return select(merged).order_by(merged.c.created_at.desc(), merged.c.id.desc()).limit(limit)
+
+def get_trade_history(db: Session, vendor_id: int, limit: int = 50, after: Optional[Tuple[datetime, int]] = None) -> List[Row]:
+    return db.execute(trade_history_stmt(vendor_id, limit, after)).all()
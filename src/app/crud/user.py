@@ -1,16 +1,51 @@
+from typing import Optional
+
+from sqlalchemy import Row, select, update
 from sqlalchemy.orm import Session
 
-from src.app.auth import get_password_hash, validate_password
+from src.app.auth import get_password_hash, invalidate_cached_user, validate_password
 from src.app.models.user import User
+from src.app.models.vendor import Vendor
 
 def get_user_by_username(db: Session, username: str):
     return db.query(User).filter(User.username == username).first()
 
-def create_user(db: Session, username: str, password: str):
+def get_user_identity(db: Session, username: str) -> Optional[Row]:
+    """Return (id, username, is_active, vendor_id) for a user in one query, or None."""
+    return db.execute(
+        select(User.id, User.username, User.is_active, Vendor.id.label("vendor_id"))
+        .outerjoin(Vendor, Vendor.user_id == User.id)
+        .where(User.username == username)
+    ).first()
+
+def create_user(db: Session, username: str, password: str, hashed_password: Optional[str] = None):
+    """Create a user. Pass ``hashed_password`` when ``password`` was already hashed elsewhere."""
     validate_password(password)
-    hashed_pw = get_password_hash(password)
+    hashed_pw = hashed_password or get_password_hash(password)
     user = User(username=username, hashed_password=hashed_pw)
     db.add(user)
     db.commit()
     db.refresh(user)
     return user
+
+def create_user_with_vendor(db: Session, username: str, password: str, hashed_password: Optional[str] = None):
+    """Create a user and their vendor profile in one transaction."""
+    validate_password(password)
+    user = User(username=username, hashed_password=hashed_password or get_password_hash(password))
+    db.add(user)
+    db.flush()
+    db.add(Vendor(name=f"Vendor {username}", species="Human", home_dimension="Earth-1", user_id=user.id))
+    db.commit()
+    db.refresh(user)
+    return user
+
+def update_password_hash(db: Session, user_id: int, hashed_password: str) -> None:
+    db.execute(update(User).where(User.id == user_id).values(hashed_password=hashed_password))
+    db.commit()
+
+def deactivate_user(db: Session, user_id: int) -> bool:
+    """Mark a user inactive and drop their cached tokens. Returns False if no such user."""
+    result = db.execute(update(User).where(User.id == user_id).values(is_active=False))
+    db.commit()
+    invalidate_cached_user(user_id)
+    return result.rowcount > 0
@@ -1,36 +1,132 @@
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Sequence
 
-from sqlalchemy.orm import Session
+from sqlalchemy import Row, Select, delete, insert, select, update
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy.sql import func
 
+from src.app.database import dialect_insert
 from src.app.models.fruit import VendorInventory, Fruit
-from src.app.models.vendor import Vendor
+from src.app.models.vendor import Vendor, VendorScore
+from src.app.schemas.fruit import FruitSchema
+from src.app.schemas.vendor import VendorSchema
+from src.app.utils import response_cache
+from src.app.utils.serialization import columns_for
 
-def get_all_vendors(db: Session, species: Optional[str] = None, offset: int = 0, limit: int = 10) -> List[Vendor]:
-    query = db.query(Vendor)
+def _with_inventory(stmt):
+    # Two extra queries per page: all vendors' inventory rows, then each distinct fruit once
+    return stmt.options(selectinload(Vendor.inventory_items).selectinload(VendorInventory.fruit))
+
+# List reads select plain columns: one query for the page of vendors, one for their inventory joined to fruits
+VENDOR_COLUMNS = tuple(getattr(Vendor, name) for name in VendorSchema.model_fields if name != "inventory_items")
+INVENTORY_COLUMNS = (VendorInventory.vendor_id, VendorInventory.fruit_id, VendorInventory.quantity) + columns_for(Fruit, FruitSchema)
+
+# Statement builders below are shared by these sync functions and their async twins in crud/aio.py
+
+def vendor_by_user_id_stmt(user_id: int) -> Select:
+    return _with_inventory(select(Vendor)).where(Vendor.user_id == user_id)
+
+def vendors_stmt(species: Optional[str] = None, offset: int = 0, limit: int = 10, after: Optional[int] = None) -> Select:
+    stmt = select(*VENDOR_COLUMNS)
     if species is not None:
-        query = query.filter(Vendor.species == species)
-    return query.offset(offset).limit(limit).all()
-
-def get_popular_vendors(db: Session, limit: int = 5):
-    # Join Vendor, VendorInventory, and Fruit to calculate popularity
-    subq = (
-        db.query(
-            Vendor.id.label('vendor_id'),
-            func.sum(VendorInventory.quantity * Fruit.rarity_level).label('popularity_score')
-        )
-        .join(VendorInventory, Vendor.id == VendorInventory.vendor_id)
-        .join(Fruit, VendorInventory.fruit_id == Fruit.id)
-        .group_by(Vendor.id)
-        .order_by(func.sum(VendorInventory.quantity * Fruit.rarity_level).desc())
+        stmt = stmt.where(Vendor.species == species)
+    if after is not None:
+        # Keyset pagination: seek past the last id instead of counting an offset
+        stmt = stmt.where(Vendor.id > after)
+    return stmt.order_by(Vendor.id).offset(offset).limit(limit)
+
+def popular_vendors_stmt(limit: int = 5) -> Select:
+    # Top-k straight off the score index; see adjust_vendor_scores / rebuild_vendor_scores
+    return (
+        select(*VENDOR_COLUMNS)
+        .join(VendorScore, VendorScore.vendor_id == Vendor.id)
+        .order_by(VendorScore.score.desc(), Vendor.id)
         .limit(limit)
-        .subquery()
     )
-    # Get the actual Vendor objects, ordered by popularity
-    vendors = (
-        db.query(Vendor)
-        .join(subq, Vendor.id == subq.c.vendor_id)
-        .order_by(subq.c.popularity_score.desc())
-        .all()
+
+def inventory_stmt(vendor_ids: Sequence[int]) -> Select:
+    return (
+        select(*INVENTORY_COLUMNS)
+        .join(Fruit, VendorInventory.fruit_id == Fruit.id)
+        .where(VendorInventory.vendor_id.in_(vendor_ids))
+        .order_by(VendorInventory.vendor_id, VendorInventory.id)
+    )
+
+def vendor_payloads(vendors: Sequence[Row], inventory: Iterable[Row]) -> List[dict]:
+    """Assemble ``VendorSchema``-shaped dicts from vendor rows and their ``inventory_stmt`` rows."""
+    payloads = [{**vendor._asdict(), "inventory_items": []} for vendor in vendors]
+    by_id = {payload["id"]: payload["inventory_items"] for payload in payloads}
+    for vendor_id, fruit_id, quantity, *fruit in inventory:
+        by_id[vendor_id].append({
+            "fruit_id": fruit_id,
+            "quantity": quantity,
+            "fruit": dict(zip(FruitSchema.model_fields, fruit)),
+        })
+    return payloads
+
+def _vendor_payloads(db: Session, stmt: Select) -> List[dict]:
+    vendors = db.execute(stmt).all()
+    if not vendors:
+        return []
+    return vendor_payloads(vendors, db.execute(inventory_stmt([v.id for v in vendors])))
+
+def get_vendor_by_user_id(db: Session, user_id: int) -> Optional[Vendor]:
+    return db.scalars(vendor_by_user_id_stmt(user_id)).first()
+
+def get_all_vendors(db: Session, species: Optional[str] = None, offset: int = 0, limit: int = 10, after: Optional[int] = None) -> List[dict]:
+    return _vendor_payloads(db, vendors_stmt(species, offset, limit, after))
+
+def get_popular_vendors(db: Session, limit: int = 5) -> List[dict]:
+    return _vendor_payloads(db, popular_vendors_stmt(limit))
+
+def adjust_vendor_scores(db: Session, deltas: Dict[int, int]) -> None:
+    """Add each vendor's score delta in one INSERT ... ON CONFLICT DO UPDATE. Does not commit."""
+    rows = [{"vendor_id": vendor_id, "score": delta} for vendor_id, delta in sorted(deltas.items()) if delta]
+    if not rows:
+        return
+    stmt = dialect_insert(db, VendorScore).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[VendorScore.vendor_id],
+        set_={"score": VendorScore.score + stmt.excluded.score},
+    )
+    db.execute(stmt)
+
+def rescore_fruit(db: Session, fruit_id: int, rarity_delta: int) -> None:
+    """Shift the score of every vendor holding ``fruit_id`` after its rarity changed by ``rarity_delta``."""
+    if not rarity_delta:
+        return
+    held = (
+        select(func.sum(VendorInventory.quantity))
+        .where(VendorInventory.vendor_id == VendorScore.vendor_id, VendorInventory.fruit_id == fruit_id)
+        .scalar_subquery()
+    )
+    holders = select(VendorInventory.vendor_id).where(VendorInventory.fruit_id == fruit_id)
+    db.execute(
+        update(VendorScore)
+        .where(VendorScore.vendor_id.in_(holders))
+        .values(score=VendorScore.score + rarity_delta * func.coalesce(held, 0))
+        .execution_options(synchronize_session=False)
     )
-    return vendors 
\ No newline at end of file
+
+def rebuild_vendor_scores(db: Session) -> None:
+    """Recompute every vendor's score from vendor_inventory, replacing whatever drifted."""
+    totals = (
+        select(VendorInventory.vendor_id, func.sum(VendorInventory.quantity * func.coalesce(Fruit.rarity_level, 0)))
+        .join(Fruit, VendorInventory.fruit_id == Fruit.id)
+        .group_by(VendorInventory.vendor_id)
+    )
+    db.execute(delete(VendorScore))
+    db.execute(insert(VendorScore).from_select(["vendor_id", "score"], totals))
+    db.commit()
+    response_cache.bump("vendors")
+
+def credit_inventory(db: Session, rows: List[dict]) -> None:
+    """Add each row's quantity to its (vendor_id, fruit_id) stock in one INSERT ... ON CONFLICT DO UPDATE."""
+    stmt = dialect_insert(db, VendorInventory).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[VendorInventory.vendor_id, VendorInventory.fruit_id],
+        set_={"quantity": VendorInventory.quantity + stmt.excluded.quantity},
+    )
+    db.execute(stmt)
+
+def upsert_inventory(db: Session, vendor_id: int, fruit_id: int, quantity: int) -> None:
+    credit_inventory(db, [{"vendor_id": vendor_id, "fruit_id": fruit_id, "quantity": quantity}])
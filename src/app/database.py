@@ -2,7 +2,8 @@ import os
 
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
 
 load_dotenv()
 
@@ -20,4 +21,59 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Opt-in: serve the routes in routers/aio.py from an AsyncEngine instead of the threadpool
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "").lower() in ("1", "true", "yes")
+
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+def async_database_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto its async driver (aiosqlite or asyncpg)."""
+    scheme, sep, rest = url.partition("://")
+    backend = scheme.split("+", 1)[0]
+    if backend not in _ASYNC_DRIVERS:
+        raise ValueError(f"No async driver known for {scheme}")
+    return f"{_ASYNC_DRIVERS[backend]}{sep}{rest}"
+
+_async_engine = None
+_async_session_local = None
+# Called with the AsyncEngine right after it is created (e.g. to attach metrics listeners)
+async_engine_hooks = []
+
+def get_async_sessionmaker():
+    """Create the AsyncEngine on first use, so sync-only deployments never import its driver."""
+    global _async_engine, _async_session_local
+    if _async_session_local is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        _async_engine = create_async_engine(os.getenv("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL))
+        for hook in async_engine_hooks:
+            hook(_async_engine)
+        # Objects outlive the commit in async handlers; refreshing them lazily would need IO
+        _async_session_local = async_sessionmaker(bind=_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_session_local
+
+async def dispose_async_engine() -> None:
+    """Close the AsyncEngine's pooled connections; the next use creates a fresh engine."""
+    global _async_engine, _async_session_local
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine = _async_session_local = None
+
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+def dialect_insert(db: Session, model):
+    """Return an INSERT for ``model`` supporting ``on_conflict_do_*`` on the session's database."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    raise NotImplementedError(f"Upserts are not supported on {dialect}")
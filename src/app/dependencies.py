@@ -0,0 +1,40 @@
+from dataclasses import dataclass
+from datetime import datetime, UTC
+from typing import Optional
+
+from fastapi import Depends, HTTPException
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.orm import Session
+
+from src.app.auth import decode_token, user_cache
+from src.app.crud.user import get_user_identity
+from src.app.database import get_db
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
+
+@dataclass(frozen=True)
+class AuthenticatedUser:
+    """Plain snapshot of the caller; safe to cache across requests and sessions."""
+    id: int
+    username: str
+    is_active: bool
+    vendor_id: Optional[int]
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> AuthenticatedUser:
+    user = user_cache.get(token)
+    if user is None:
+        token_data = decode_token(token)
+        if not token_data:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        row = get_user_identity(db, token_data.username)
+        if not row:
+            raise HTTPException(status_code=404, detail="User not found")
+        user = AuthenticatedUser(id=row.id, username=row.username, is_active=bool(row.is_active), vendor_id=row.vendor_id)
+        ttl = None
+        if token_data.expires_at is not None:
+            # Never serve a token from cache past its own expiry
+            ttl = min(user_cache.ttl, (token_data.expires_at - datetime.now(UTC)).total_seconds())
+        user_cache.set(token, user, ttl=ttl)
+    if not user.is_active:
+        raise HTTPException(status_code=403, detail="Inactive user")
+    return user
@@ -0,0 +1,131 @@
+"""Scheduled jobs, coordinated across workers and nodes through the job_leases table.
+
+Every process may run the scheduler. Before a job runs, its process takes the
+job's lease with a conditional UPDATE. Only one process gets it, and a lease
+left behind by a crashed process expires after ``JOB_LEASE_SECONDS``. The
+lease row also records the last success. That lets a process skip a job
+another one just ran, and lets the daily price job catch up, one date at a
+time, on the days missed during downtime (at most ``JOB_CATCHUP_DAYS``).
+"""
+import os
+import socket
+from datetime import UTC, date, datetime, timedelta
+from typing import Callable, List, Optional
+
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+
+from src.app.database import dialect_insert, session_local
+from src.app.models.job import JobLease
+
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "600"))
+JOB_CATCHUP_DAYS = int(os.getenv("JOB_CATCHUP_DAYS", "30"))
+# How often each process's scheduler wakes the jobs; all but the first wake-up per period are no-ops
+JOB_INTERVAL_SECONDS = float(os.getenv("JOB_INTERVAL_SECONDS", "3600"))
+
+OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+def _utcnow() -> datetime:
+    return datetime.now(UTC).replace(tzinfo=None)
+
+def acquire_lease(db: Session, name: str, owner: str = OWNER, ttl: float = JOB_LEASE_SECONDS) -> bool:
+    """Take or renew the lease on job ``name``. Returns False while another owner holds it."""
+    db.execute(dialect_insert(db, JobLease).values(name=name).on_conflict_do_nothing(index_elements=[JobLease.name]))
+    now = _utcnow()
+    result = db.execute(
+        update(JobLease)
+        .where(
+            JobLease.name == name,
+            or_(JobLease.owner.is_(None), JobLease.owner == owner, JobLease.lease_expires_at < now),
+        )
+        .values(owner=owner, lease_expires_at=now + timedelta(seconds=ttl))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+def release_lease(db: Session, name: str, owner: str = OWNER) -> None:
+    db.execute(
+        update(JobLease)
+        .where(JobLease.name == name, JobLease.owner == owner)
+        .values(owner=None, lease_expires_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+def record_success(db: Session, name: str, owner: str = OWNER, day: Optional[date] = None, ttl: float = JOB_LEASE_SECONDS) -> None:
+    """Record a successful run (of ``day``, for daily jobs) and extend the lease. Commits."""
+    now = _utcnow()
+    values = {"last_success_at": now, "lease_expires_at": now + timedelta(seconds=ttl)}
+    if day is not None:
+        values["last_success_on"] = day
+    db.execute(
+        update(JobLease)
+        .where(JobLease.name == name, JobLease.owner == owner)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+def ran_within(job: JobLease, seconds: float) -> bool:
+    return job.last_success_at is not None and job.last_success_at > _utcnow() - timedelta(seconds=seconds)
+
+def pending_days(last_success_on: Optional[date], today: date, limit: int = JOB_CATCHUP_DAYS) -> List[date]:
+    """Days after ``last_success_on`` through ``today``, oldest first; only today on a first run."""
+    if last_success_on is None:
+        return [today]
+    start = max(last_success_on + timedelta(days=1), today - timedelta(days=limit - 1))
+    return [start + timedelta(days=i) for i in range((today - start).days + 1)]
+
+def run_exclusive(name: str, work: Callable[[Session, JobLease], None], owner: str = OWNER) -> bool:
+    """Run ``work(db, lease_row)`` if this process gets the lease on ``name``. Returns whether it ran."""
+    from src.app.metrics import time_job
+
+    db = session_local()
+    try:
+        if not acquire_lease(db, name, owner):
+            return False
+        try:
+            with time_job(name):
+                work(db, db.get(JobLease, name))
+        finally:
+            db.rollback()
+            release_lease(db, name, owner)
+        return True
+    finally:
+        db.close()
+
+def simulate_and_store_daily_prices(today: Optional[date] = None, owner: str = OWNER) -> bool:
+    """Store prices for each day after the last successful one, through ``today``. Returns whether this process ran it."""
+    from src.app.utils.simulate import store_simulated_prices
+
+    today = today or date.today()
+
+    def work(db: Session, job: JobLease) -> None:
+        for day in pending_days(job.last_success_on, today):
+            store_simulated_prices(db, day)
+            record_success(db, job.name, owner, day)
+
+    return run_exclusive("simulate_daily_prices", work, owner)
+
+def rebuild_vendor_leaderboard(owner: str = OWNER) -> bool:
+    from src.app.crud.vendor import rebuild_vendor_scores
+
+    def work(db: Session, job: JobLease) -> None:
+        if ran_within(job, JOB_INTERVAL_SECONDS * 0.9):
+            return
+        rebuild_vendor_scores(db)
+        record_success(db, job.name, owner)
+
+    return run_exclusive("rebuild_vendor_leaderboard", work, owner)
+
+def start_scheduler():
+    from apscheduler.schedulers.background import BackgroundScheduler
+
+    scheduler = BackgroundScheduler()
+    # First runs at startup: a node back from downtime catches up on prices, and a database
+    # filled outside the tracked write paths gets a leaderboard. Leases keep each to one run per interval
+    scheduler.add_job(simulate_and_store_daily_prices, 'interval', seconds=JOB_INTERVAL_SECONDS, next_run_time=datetime.now())
+    scheduler.add_job(rebuild_vendor_leaderboard, 'interval', seconds=JOB_INTERVAL_SECONDS, next_run_time=datetime.now())
+    scheduler.start()
+    return scheduler
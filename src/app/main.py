@@ -1,20 +1,15 @@
 import os
-import random
 import sys
 import unittest
-from datetime import datetime
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import Optional
 
-from apscheduler.schedulers.background import BackgroundScheduler
 from dotenv import load_dotenv
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import Response
 
-from src.app.database import Base, engine, session_local
-from src.app.models.fruit import Fruit, FruitPrice
-from src.app.routers import auth, fruit, trade, vendor
+from src.app.database import DATABASE_ASYNC, async_engine_hooks, dispose_async_engine, engine
 
 load_dotenv()
 
@@ -22,53 +17,135 @@ FRONTEND_URL = os.getenv("FRONTEND_URL")
 if FRONTEND_URL is None:
     FRONTEND_URL = ""
 
+# Run the periodic jobs' scheduler in this process. Leases (see jobs.py) already keep each
+# run to one process, so turning it off on extra workers only saves an idle thread
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1").lower() in ("1", "true", "yes")
+
 BASE_DIR = Path(__file__).resolve().parent
 
-app = FastAPI()
-
-app.mount("/static", StaticFiles(directory=BASE_DIR / "static"), name="static")
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[FRONTEND_URL],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-Base.metadata.create_all(bind=engine)
-
-app.include_router(fruit.router)
-app.include_router(vendor.router)
-app.include_router(trade.router)
-app.include_router(auth.router)
-
-@app.get("/")
-def read_root():
-    return {"message": "Welcome to WideApple Interdimensional API"}
-
-def simulate_and_store_daily_prices():
-    db: Session = session_local()
-    today = datetime.today().strftime("%Y-%m-%d")
-    fruits = db.query(Fruit).all()
-    for fruit in fruits:
-        base = fruit.base_value
-        fluctuation = random.uniform(-0.2, 0.2)  # ±20%
-        price = round(base + base * fluctuation, 2)
-        fruit_price = FruitPrice(fruit_id=fruit.id, date=today, price=price)
-        db.add(fruit_price)
-    db.commit()
-    db.close()
-
-scheduler = BackgroundScheduler()
-scheduler.add_job(simulate_and_store_daily_prices, 'interval', days=1)
-scheduler.start()
+# Importing this module has no side effects: tables come from Alembic, and routers,
+# the scheduler and NumPy load in create_app() or when a job first runs
+
+def include_routers(app: FastAPI, *routers: APIRouter) -> None:
+    # Earlier routers win: a route whose path and methods are already served is skipped,
+    # so async twins replace their sync routes instead of shadowing them in the docs
+    served = set()
+    for router in routers:
+        kept = APIRouter()
+        for route in router.routes:
+            keys = {(route.path, method) for method in getattr(route, "methods", None) or ()}
+            if keys and keys <= served:
+                continue
+            served |= keys
+            kept.routes.append(route)
+        app.include_router(kept)
+
+_engines_instrumented = False
+
+def _instrument_engines() -> None:
+    global _engines_instrumented
+    if _engines_instrumented:
+        return
+    from src.app.metrics import instrument_engine
+    from src.app.profiling import trace_engine
+
+    instrument_engine(engine, "sync")
+    trace_engine(engine)
+    async_engine_hooks.append(lambda async_engine: instrument_engine(async_engine.sync_engine, "async"))
+    async_engine_hooks.append(lambda async_engine: trace_engine(async_engine.sync_engine))
+    _engines_instrumented = True
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from src.app.jobs import start_scheduler
+    from src.app.metrics import registry
+    from src.app.utils.ledger import ledger
+
+    app.state.scheduler = start_scheduler() if app.state.run_scheduler else None
+    ledger.start()
+    registry.start()
+    try:
+        yield
+    finally:
+        if app.state.scheduler is not None:
+            app.state.scheduler.shutdown(wait=False)
+        ledger.stop()
+        registry.stop()
+        await dispose_async_engine()
+        engine.dispose()
+
+def create_app(scheduler: Optional[bool] = None) -> FastAPI:
+    """Build the API. The scheduler starts with the app's lifespan; ``scheduler`` overrides SCHEDULER_ENABLED."""
+    from fastapi.middleware.cors import CORSMiddleware
+
+    from src.app.metrics import CONTENT_TYPE, MetricsMiddleware, registry
+    from src.app.profiling import ProfilingMiddleware
+    from src.app.routers import auth, fruit, trade, vendor
+    from src.app.utils.response_cache import ResponseCacheMiddleware
+    from src.app.utils.static import CachedStaticFiles
+
+    app = FastAPI(lifespan=lifespan)
+    app.state.run_scheduler = SCHEDULER_ENABLED if scheduler is None else scheduler
+
+    app.mount("/static", CachedStaticFiles(directory=BASE_DIR / "static"), name="static")
+
+    # Inside CORS, so cached responses never carry another origin's CORS headers
+    app.add_middleware(ResponseCacheMiddleware, routes={
+        "/fruits": ("fruits",),
+        "/vendors": ("vendors", "fruits"),
+        "/vendors/popular": ("vendors", "fruits"),
+    })
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=[FRONTEND_URL],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "X-Profile-Id", "ETag"],
+    )
+    app.add_middleware(ProfilingMiddleware)
+    app.add_middleware(MetricsMiddleware)
+
+    _instrument_engines()
+
+    async_routers = []
+    if DATABASE_ASYNC:
+        from src.app.routers import aio
+
+        async_routers.append(aio.router)
+    include_routers(
+        app,
+        *async_routers,
+        fruit.router,
+        vendor.router,
+        trade.router,
+        auth.router,
+    )
+
+    @app.get("/")
+    def read_root():
+        return {"message": "Welcome to WideApple Interdimensional API"}
+
+    @app.get("/metrics", include_in_schema=False)
+    def read_metrics():
+        return Response(registry.render(), media_type=CONTENT_TYPE)
+
+    return app
+
+def __getattr__(name: str):
+    # Keeps ``uvicorn src.app.main:app`` and ``from src.app.main import app`` working,
+    # building the app on first access instead of at import
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == "__main__":
     # Run Alembic migrations
     os.system("uv run alembic upgrade head")
     # Optionally seed the database
-    # os.system("uv run python src/app/utils/seed.py")
+    # os.system("uv run python -m src.app.utils.seed")
     # Run unittests before starting the server
     print("Running Tests!")
     test_loader = unittest.TestLoader()
@@ -79,4 +156,4 @@ if __name__ == "__main__":
         print("Tests failed. Server will not start.")
         sys.exit(1)
     import uvicorn
-    uvicorn.run("src.app.main:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run("src.app.main:create_app", factory=True, host="127.0.0.1", port=8000, reload=True)
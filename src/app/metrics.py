@@ -0,0 +1,426 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+``MetricsMiddleware`` records per-route latency, status codes and requests
+in flight; ``instrument_engine`` adds per-request query counts and times
+plus connection pool checkout waits; ``time_job`` times background jobs.
+Everything is scraped from ``GET /metrics``. Each worker process keeps
+its own registry; see ``Registry`` for aggregating them across workers.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from copy import copy
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], Any] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Any]:
+        """This process's state, by label values."""
+        with self._lock:
+            return {key: copy(state) for key, state in self._values.items()}
+
+    def merge(self, snapshots: Sequence[Tuple[Dict[Tuple[str, ...], Any], bool]]) -> Dict[Tuple[str, ...], Any]:
+        """Combine (snapshot, process_alive) pairs from every worker; counts add up."""
+        merged: Dict[Tuple[str, ...], Any] = {}
+        for values, _ in snapshots:
+            for key, state in values.items():
+                merged[key] = _add(merged[key], state) if key in merged else copy(state)
+        return merged
+
+    def samples(self, values: Optional[Dict[Tuple[str, ...], Any]] = None) -> Iterable[str]:
+        items = sorted((self.snapshot() if values is None else values).items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+    def render(self, values: Optional[Dict[Tuple[str, ...], Any]] = None) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self.samples(values)]
+
+def _add(a, b):
+    if isinstance(a, list):
+        return [x + y for x, y in zip(a, b)]
+    return a + b
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+class Gauge(_Metric):
+    """A settable gauge, or one read at scrape time when ``collect`` is given.
+
+    ``collect`` returns ``{label_values_tuple: value}``. Across workers,
+    ``multiprocess="sum"`` adds up the live processes' values and
+    ``"max"`` keeps the largest value any process has reported.
+    """
+    kind = "gauge"
+
+    def __init__(self, *args, collect: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None, multiprocess: str = "sum", **kwargs):
+        super().__init__(*args, **kwargs)
+        self._collect = collect
+        self.multiprocess = multiprocess
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Any]:
+        if self._collect is not None:
+            return self._collect()
+        return super().snapshot()
+
+    def merge(self, snapshots: Sequence[Tuple[Dict[Tuple[str, ...], Any], bool]]) -> Dict[Tuple[str, ...], Any]:
+        if self.multiprocess == "max":
+            merged: Dict[Tuple[str, ...], Any] = {}
+            for values, _ in snapshots:
+                for key, value in values.items():
+                    merged[key] = max(merged.get(key, value), value)
+            return merged
+        # A dead worker holds no connections and serves no requests
+        return super().merge([(values, alive) for values, alive in snapshots if alive])
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = LATENCY_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Per label values, _values holds [per-bucket counts..., sum, count]
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def samples(self, values: Optional[Dict[Tuple[str, ...], Any]] = None) -> Iterable[str]:
+        items = sorted((self.snapshot() if values is None else values).items())
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {_format_value(cumulative)}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(state[-2])}"
+            yield f"{self.name}_count{labels} {_format_value(state[-1])}"
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class Registry:
+    """The process's metrics.
+
+    With ``multiprocess_dir`` set (``METRICS_MULTIPROC_DIR``), every worker
+    writes a snapshot of its metrics to ``metrics-<pid>.json`` there, at
+    least every ``METRICS_SNAPSHOT_SECONDS`` and on shutdown. A scrape of
+    any worker then renders the totals across all of them: counters and
+    histograms include workers that have exited, so they never go
+    backwards, while gauges only count live workers. Other workers' numbers
+    can be up to one snapshot interval old. Empty the directory when the
+    server (re)starts.
+    """
+
+    def __init__(self, multiprocess_dir: Optional[str] = None, snapshot_seconds: float = 5.0):
+        self._metrics: List[_Metric] = []
+        self.multiprocess_dir = Path(multiprocess_dir) if multiprocess_dir else None
+        self.snapshot_seconds = snapshot_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        if self.multiprocess_dir is None:
+            for metric in self._metrics:
+                lines.extend(metric.render())
+        else:
+            others = self._read_snapshots()
+            for metric in self._metrics:
+                snapshots = [(metric.snapshot(), True)]
+                snapshots.extend((values.get(metric.name, {}), alive) for values, alive in others)
+                lines.extend(metric.render(metric.merge(snapshots)))
+        return "\n".join(lines) + "\n"
+
+    @property
+    def snapshot_path(self) -> Path:
+        return self.multiprocess_dir / f"metrics-{os.getpid()}.json"
+
+    def write_snapshot(self) -> None:
+        data = {
+            metric.name: [[list(key), state] for key, state in metric.snapshot().items()]
+            for metric in self._metrics
+        }
+        self.multiprocess_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.snapshot_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data))
+        os.replace(tmp, self.snapshot_path)
+
+    def _read_snapshots(self) -> List[Tuple[Dict[str, Dict[Tuple[str, ...], Any]], bool]]:
+        snapshots = []
+        for path in self.multiprocess_dir.glob("metrics-*.json"):
+            pid = int(path.stem.split("-", 1)[1])
+            if pid == os.getpid():
+                continue
+            try:
+                data = json.loads(path.read_text())
+            except (FileNotFoundError, json.JSONDecodeError):
+                continue
+            values = {name: {tuple(key): state for key, state in items} for name, items in data.items()}
+            snapshots.append((values, _pid_alive(pid)))
+        return snapshots
+
+    def start(self) -> None:
+        """Write snapshots in the background while the app runs; a no-op without ``multiprocess_dir``."""
+        if self.multiprocess_dir is None or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-snapshot", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.snapshot_seconds):
+            try:
+                self.write_snapshot()
+            except OSError:
+                logger.exception("Could not write the metrics snapshot")
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.write_snapshot()
+
+registry = Registry(os.getenv("METRICS_MULTIPROC_DIR"), float(os.getenv("METRICS_SNAPSHOT_SECONDS", "5")))
+
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "HTTP requests by method, route and status code.", ("method", "route", "status"),
+))
+http_request_duration_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "Time from request start to the last response byte.", ("method", "route"),
+))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "Requests currently being served.",
+))
+db_queries_per_request = registry.register(Histogram(
+    "db_queries_per_request", "SQL statements executed while serving one request.", ("method", "route"),
+    buckets=COUNT_BUCKETS,
+))
+db_query_seconds_per_request = registry.register(Histogram(
+    "db_query_seconds_per_request", "Total SQL execution time while serving one request.", ("method", "route"),
+))
+db_query_duration_seconds = registry.register(Histogram(
+    "db_query_duration_seconds", "Execution time of individual SQL statements.", ("engine",),
+))
+db_pool_checkout_wait_seconds = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection.", ("engine",),
+))
+job_duration_seconds = registry.register(Histogram(
+    "job_duration_seconds", "Background job run time.", ("job",),
+    buckets=(0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0),
+))
+job_failures_total = registry.register(Counter(
+    "job_failures_total", "Background job runs that raised.", ("job",),
+))
+job_last_success_timestamp_seconds = registry.register(Gauge(
+    "job_last_success_timestamp_seconds", "Unix time the job last finished without error.", ("job",),
+    multiprocess="max",
+))
+ledger_entries_written_total = registry.register(Counter(
+    "ledger_entries_written_total", "Trade ledger entries written to the database.",
+))
+ledger_entries_spooled_total = registry.register(Counter(
+    "ledger_entries_spooled_total", "Trade ledger entries spooled to disk because a write failed.",
+))
+ledger_entries_dead_lettered_total = registry.register(Counter(
+    "ledger_entries_dead_lettered_total", "Spooled trade ledger entries the database rejected, moved to the dead-letter directory.",
+))
+
+# Query count and time accumulated for the request being served; sync routes
+# run in a threadpool but inherit the context, so they add to the same list
+_request_queries: ContextVar[Optional[List[float]]] = ContextVar("request_queries", default=None)
+
+_pools: Dict[str, object] = {}
+
+def _collect_pools(stat: str) -> Callable[[], Dict[Tuple[str, ...], float]]:
+    def collect():
+        values = {}
+        for name, pool in list(_pools.items()):
+            reader = getattr(pool, stat, None)
+            if callable(reader):
+                values[(name,)] = float(reader())
+        return values
+    return collect
+
+registry.register(Gauge(
+    "db_pool_size", "Configured size of the connection pool.", ("engine",), collect=_collect_pools("size"),
+))
+registry.register(Gauge(
+    "db_pool_checked_out", "Connections currently checked out of the pool.", ("engine",), collect=_collect_pools("checkedout"),
+))
+registry.register(Gauge(
+    "db_pool_overflow", "Connections open beyond the pool size (negative while below it).", ("engine",), collect=_collect_pools("overflow"),
+))
+
+def instrument_engine(engine: Engine, name: str = "default") -> None:
+    """Record statement timings and pool checkout waits for a (sync) Engine.
+
+    For an ``AsyncEngine`` pass its ``sync_engine``.
+    """
+    if name in _pools:
+        return
+    _pools[name] = engine.pool
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        db_query_duration_seconds.observe(elapsed, engine=name)
+        queries = _request_queries.get()
+        if queries is not None:
+            queries.append(elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(context):
+        # A failed statement never reaches after_cursor_execute; drop its start time
+        # so the next statement on this connection is not timed from it
+        if context.connection is not None:
+            started = context.connection.info.pop("query_start", None)
+            if started:
+                db_query_duration_seconds.observe(time.perf_counter() - started[-1], engine=name)
+
+    # The pool has no "before checkout" event, so time its connect() directly
+    pool = engine.pool
+    connect = pool.connect
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            db_pool_checkout_wait_seconds.observe(time.perf_counter() - started, engine=name)
+
+    pool.connect = timed_connect
+
+@contextmanager
+def time_job(job: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        job_failures_total.inc(job=job)
+        raise
+    else:
+        job_last_success_timestamp_seconds.set(time.time(), job=job)
+    finally:
+        job_duration_seconds.observe(time.perf_counter() - started, job=job)
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    # The route template, not the raw path, keeps label cardinality bounded
+    return getattr(route, "path", None) or "<unmatched>"
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency, status, concurrency and per-request SQL cost."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        queries: List[float] = []
+        token = _request_queries.set(queries)
+        started = time.perf_counter()
+        http_requests_in_flight.inc()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_flight.dec()
+            _request_queries.reset(token)
+            method, route = scope["method"], _route_label(scope)
+            http_requests_total.inc(method=method, route=route, status=str(status))
+            http_request_duration_seconds.observe(elapsed, method=method, route=route)
+            db_queries_per_request.observe(len(queries), method=method, route=route)
+            db_query_seconds_per_request.observe(sum(queries), method=method, route=route)
@@ -1,2 +1,5 @@
-from .fruit import Fruit, VendorInventory
-from .vendor import Vendor 
\ No newline at end of file
+from .fruit import Fruit, FruitPrice, FruitPriceRollup, VendorInventory
+from .job import JobLease
+from .trade import Trade
+from .user import User
+from .vendor import Vendor, VendorScore
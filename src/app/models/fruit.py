@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Float, ForeignKey, Integer, String
+from sqlalchemy import Column, Date, Float, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import backref, relationship
 
 from src.app.database import Base
 
 class VendorInventory(Base):
     __tablename__ = "vendor_inventory"
+    __table_args__ = (
+        # One row per vendor and fruit; also the conflict target for inventory upserts
+        Index("uq_vendor_inventory_vendor_fruit", "vendor_id", "fruit_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True)
     vendor_id = Column(Integer, ForeignKey("vendors.id"))
@@ -16,6 +20,10 @@ class VendorInventory(Base):
 
 class Fruit(Base):
     __tablename__ = "fruits"
+    __table_args__ = (
+        # Keyset pages filtered by rarity
+        Index("ix_fruits_rarity_level_id", "rarity_level", "id"),
+    )
     id = Column(Integer, primary_key=True)
     name = Column(String, unique=True, index=True)
     flavor_profile = Column(String)
@@ -26,9 +34,39 @@ class Fruit(Base):
 
 class FruitPrice(Base):
     __tablename__ = "fruit_prices"
+    __table_args__ = (
+        # One price per fruit per day; covers per-fruit date-range scans (index-only on Postgres)
+        Index("uq_fruit_prices_fruit_date", "fruit_id", "date", unique=True, postgresql_include=["id", "price"]),
+        # Date-range scans and keyset pages across all fruits
+        Index("ix_fruit_prices_date_id", "date", "id"),
+    )
     id = Column(Integer, primary_key=True)
     fruit_id = Column(Integer, ForeignKey("fruits.id"), nullable=False)
-    date = Column(String, nullable=False)  # ISO date string (YYYY-MM-DD)
+    date = Column(Date, nullable=False)
     price = Column(Float, nullable=False)
 
-    fruit = relationship("Fruit", backref=backref("historical_prices", cascade="all, delete-orphan")) 
\ No newline at end of file
+    fruit = relationship("Fruit", backref=backref("historical_prices", cascade="all, delete-orphan")) 
+
+class FruitPriceRollup(Base):
+    """Open/high/low/close candle of daily prices per fruit, per week or month."""
+    __tablename__ = "fruit_price_rollups"
+    __table_args__ = (
+        Index("uq_fruit_price_rollups_bucket_fruit_period", "bucket", "fruit_id", "period_start", unique=True),
+        Index("ix_fruit_price_rollups_bucket_period", "bucket", "period_start"),
+    )
+    id = Column(Integer, primary_key=True)
+    fruit_id = Column(Integer, ForeignKey("fruits.id"), nullable=False)
+    bucket = Column(String, nullable=False)  # 'week' (starting Monday) or 'month'
+    period_start = Column(Date, nullable=False)
+    open_date = Column(Date, nullable=False)
+    open = Column(Float, nullable=False)
+    close_date = Column(Date, nullable=False)
+    close = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    price_sum = Column(Float, nullable=False)
+    price_count = Column(Integer, nullable=False)
+
+    @property
+    def avg(self) -> float:
+        return self.price_sum / self.price_count
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Date, DateTime, String
+
+from src.app.database import Base
+
+class JobLease(Base):
+    """One row per scheduled job: which process may run it now, and its last successful run.
+
+    Times are naive UTC.
+    """
+    __tablename__ = "job_leases"
+
+    name = Column(String, primary_key=True)
+    owner = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    last_success_at = Column(DateTime, nullable=True)
+    # Daily jobs: the last date fully processed, where catch-up resumes
+    last_success_on = Column(Date, nullable=True)
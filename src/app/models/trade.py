@@ -0,0 +1,35 @@
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, String
+
+from src.app.database import Base
+
+# Returned by the history endpoint; carried in the vendor indexes so pages are index-only on Postgres
+LEDGER_PAYLOAD = ["created_at", "trade_type", "from_vendor_id", "to_vendor_id", "fruit_id", "quantity", "base_value", "tax", "total_cost", "alien_currency"]
+
+class Trade(Base):
+    """Append-only ledger of completed trades, written in batches by utils/ledger.py.
+
+    ``created_at`` is naive UTC, taken when the trade committed. Rows can
+    reach the table out of that order (a batch replayed from the spool gets
+    later ids than trades made after it), so history is ordered by
+    (created_at, id), not by id alone.
+    """
+    __tablename__ = "trades"
+    __table_args__ = (
+        # Per-vendor history in (created_at desc, id desc) keyset pages, one index per side of the trade
+        Index("ix_trades_from_vendor_created_at", "from_vendor_id", "created_at", "id", postgresql_include=LEDGER_PAYLOAD),
+        Index("ix_trades_to_vendor_created_at", "to_vendor_id", "created_at", "id", postgresql_include=LEDGER_PAYLOAD),
+    )
+
+    id = Column(Integer, primary_key=True)
+    # Makes replaying a spooled batch a no-op for entries that already reached the table
+    entry_id = Column(String(32), unique=True, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    trade_type = Column(String, nullable=False)
+    from_vendor_id = Column(Integer, ForeignKey("vendors.id"), nullable=False)
+    to_vendor_id = Column(Integer, ForeignKey("vendors.id"), nullable=False)
+    fruit_id = Column(Integer, ForeignKey("fruits.id"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    base_value = Column(Float, nullable=False)
+    tax = Column(Float, nullable=False)
+    total_cost = Column(Float, nullable=False)
+    alien_currency = Column(Boolean, nullable=False)
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, ForeignKey, Integer, String
+from sqlalchemy import BigInteger, Column, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import relationship
 
 from src.app.database import Base
 
 class Vendor(Base):
     __tablename__ = "vendors"
+    __table_args__ = (
+        # Keyset pages filtered by species
+        Index("ix_vendors_species_id", "species", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True)
@@ -13,3 +17,20 @@ class Vendor(Base):
     user_id = Column(Integer, ForeignKey("users.id"), unique=True)
 
     user = relationship("User", back_populates="vendor")
+
+class VendorScore(Base):
+    """Popularity score per vendor: the sum of quantity * rarity_level over its inventory.
+
+    Kept current by delta updates from inventory and rarity changes and
+    periodically rebuilt from vendor_inventory to repair drift.
+    """
+    __tablename__ = "vendor_scores"
+    __table_args__ = (
+        # Top-k leaderboard reads walk this index from the high end
+        Index("ix_vendor_scores_score_vendor", "score", "vendor_id"),
+    )
+
+    vendor_id = Column(Integer, ForeignKey("vendors.id"), primary_key=True)
+    score = Column(BigInteger, nullable=False, default=0)
+
+    vendor = relationship("Vendor")
@@ -0,0 +1,220 @@
+"""Opt-in per-request profiling and the slow-query log.
+
+A request is profiled when it wins the ``PROFILE_SAMPLE_RATE`` draw, or
+sends ``X-Profile: 1`` while ``PROFILE_HEADER_ENABLED`` is set. Profiling
+writes two files to ``PROFILE_DIR``, and the response carries the file
+prefix in ``X-Profile-Id``:
+
+- ``<id>.folded``: stack samples taken every ``PROFILE_INTERVAL_MS``, in
+  the folded format read by flamegraph.pl and speedscope.
+- ``<id>.sql.json``: every statement the request ran, with timings. Any
+  statement text repeated ``N_PLUS_ONE_THRESHOLD`` or more times is
+  flagged as a likely N+1.
+
+The sampler records every busy thread, because sync routes run in a
+threadpool. Under concurrent load, other requests' stacks appear too.
+
+Independently of profiling, any statement slower than ``SLOW_QUERY_MS`` is
+logged with its parameters and the route that ran it.
+"""
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+import anyio
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "profiles"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_HEADER_ENABLED = os.getenv("PROFILE_HEADER_ENABLED", "").lower() in ("1", "true", "yes")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))  # 0 disables the slow-query log
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+MAX_LOGGED_PARAMS = 500
+
+# Innermost frames of threads that are parked rather than doing work
+_IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+}
+
+class StackSampler:
+    """Collects folded stacks of busy threads on a background thread until stopped."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(names))] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+class RequestTrace:
+    """What is known about the request being served, for the SQL listeners."""
+
+    def __init__(self, scope, profiled: bool):
+        self.scope = scope
+        self.profiled = profiled
+        self.queries: List[dict] = []
+        self._lock = threading.Lock()
+
+    @property
+    def route(self) -> str:
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or self.scope.get("path", "?")
+
+    def record(self, statement: str, parameters, duration: float) -> None:
+        with self._lock:
+            self.queries.append({
+                "statement": statement,
+                "parameters": _truncate(parameters),
+                "duration_ms": round(duration * 1000, 3),
+                "thread": threading.current_thread().name,
+            })
+
+_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+def _truncate(parameters) -> str:
+    text = repr(parameters)
+    if len(text) > MAX_LOGGED_PARAMS:
+        text = text[:MAX_LOGGED_PARAMS] + "..."
+    return text
+
+def find_n_plus_one(queries: List[dict], threshold: int = None) -> List[dict]:
+    """Statements whose text repeats ``threshold`` or more times, most repeated first."""
+    threshold = N_PLUS_ONE_THRESHOLD if threshold is None else threshold
+    counts = Counter(q["statement"] for q in queries)
+    totals: Dict[str, float] = {}
+    for q in queries:
+        totals[q["statement"]] = totals.get(q["statement"], 0.0) + q["duration_ms"]
+    return [
+        {"statement": statement, "count": count, "total_ms": round(totals[statement], 3)}
+        for statement, count in counts.most_common()
+        if count >= threshold
+    ]
+
+def trace_engine(engine: Engine) -> None:
+    """Feed the slow-query log and per-request SQL traces from ``engine``'s cursor events."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["profile_query_start"].pop()
+        trace = _trace.get()
+        if trace is not None and trace.profiled:
+            trace.record(statement, parameters, elapsed)
+        if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+            logger.warning(
+                "Slow query (%.1f ms) on %s: %s; parameters=%s",
+                elapsed * 1000, trace.route if trace is not None else "<no request>", statement, _truncate(parameters),
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(context):
+        # A failed statement never reaches after_cursor_execute; drop its start time
+        if context.connection is not None:
+            context.connection.info.pop("profile_query_start", None)
+
+def _wants_profile(scope) -> bool:
+    if PROFILE_HEADER_ENABLED:
+        for name, value in scope.get("headers", ()):
+            if name == b"x-profile" and value == b"1":
+                return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+def _write_profile(profile_id: str, trace: RequestTrace, sampler: StackSampler, elapsed: float) -> None:
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    (PROFILE_DIR / f"{profile_id}.folded").write_text(sampler.folded())
+    report = {
+        "method": trace.scope["method"],
+        "route": trace.route,
+        "path": trace.scope["path"],
+        "duration_ms": round(elapsed * 1000, 3),
+        "query_count": len(trace.queries),
+        "query_ms": round(sum(q["duration_ms"] for q in trace.queries), 3),
+        "n_plus_one": find_n_plus_one(trace.queries),
+        "queries": trace.queries,
+    }
+    (PROFILE_DIR / f"{profile_id}.sql.json").write_text(json.dumps(report, indent=2))
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles selected requests and tags SQL with the route for the slow-query log."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        profiled = _wants_profile(scope)
+        trace = RequestTrace(scope, profiled)
+        token = _trace.set(trace)
+        if not profiled:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                _trace.reset(token)
+            return
+
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{scope['method'].lower()}-{uuid4().hex[:8]}"
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = [*message["headers"], (b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        sampler = StackSampler(PROFILE_INTERVAL_MS / 1000)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _trace.reset(token)
+            # Joining the sampler and writing the files block; keep them off the event loop
+            await anyio.to_thread.run_sync(sampler.stop)
+            await anyio.to_thread.run_sync(_write_profile, profile_id, trace, sampler, elapsed)
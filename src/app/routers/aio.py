@@ -0,0 +1,61 @@
+"""Async versions of the hot routes, mounted in place of their sync twins when DATABASE_ASYNC is set.
+
+They run on the event loop against an AsyncSession, so a worker holds no
+thread per in-flight request. Parameters, route metadata and response
+shapes come from routers/fruit.py and routers/vendor.py, so both modes
+serve the same API; only the session calls differ. Routes not listed here
+keep using the sync engine.
+"""
+from typing import Optional
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.app.crud import aio as crud
+from src.app.database import get_async_db
+from src.app.dependencies import AuthenticatedUser, get_current_user
+from src.app.routers import fruit, vendor
+from src.app.utils.pagination import IdPage, id_page, id_page_response
+from src.app.utils.serialization import FastJSONResponse, rows_as_dicts
+
+router = APIRouter()
+
+@router.get("/fruits", **fruit.FRUITS_ROUTE)
+async def read_fruits(
+    db: AsyncSession = Depends(get_async_db),
+    page: IdPage = Depends(id_page),
+    rarity: Optional[int] = fruit.RARITY
+):
+    return id_page_response(rows_as_dicts(await crud.get_all_fruits(db, rarity_level=rarity, **page.fetch_args())), page)
+
+@router.get("/fruits/{fruit_name}/trend", **fruit.TREND_ROUTE)
+async def read_price_trend(fruit_name: str, days: int = fruit.TREND_DAYS, db: AsyncSession = Depends(get_async_db)):
+    return fruit.trend_response(await crud.get_price_trend(db, fruit_name, days=days))
+
+@router.post("/fruits")
+async def create_fruit(fields: dict = Depends(fruit.fruit_fields), db: AsyncSession = Depends(get_async_db)):
+    return {"id": (await crud.create_fruit(db, **fields)).id}
+
+@router.get("/prices", **fruit.PRICES_ROUTE)
+async def get_prices(query: fruit.PriceQuery = Depends(fruit.price_query), db: AsyncSession = Depends(get_async_db)):
+    return fruit.prices_response(await crud.get_historical_prices(db, **query.fetch_args()), query)
+
+@router.get("/prices/aggregate", **fruit.PRICE_AGGREGATE_ROUTE)
+async def get_price_aggregate(query: dict = Depends(fruit.price_aggregate_query), db: AsyncSession = Depends(get_async_db)):
+    return fruit.price_aggregate_response(query["bucket"], await crud.get_price_aggregates(db, **query))
+
+@router.get("/vendors", **vendor.VENDORS_ROUTE)
+async def read_vendors(
+    db: AsyncSession = Depends(get_async_db),
+    page: IdPage = Depends(id_page),
+    species: Optional[str] = vendor.SPECIES
+):
+    return id_page_response(await crud.get_all_vendors(db, species=species, **page.fetch_args()), page)
+
+@router.get("/vendors/me", **vendor.MY_VENDOR_ROUTE)
+async def read_my_vendor(db: AsyncSession = Depends(get_async_db), current_user: AuthenticatedUser = Depends(get_current_user)):
+    return vendor.vendor_or_404(await crud.get_vendor_by_user_id(db, current_user.id))
+
+@router.get("/vendors/popular", **vendor.POPULAR_VENDORS_ROUTE)
+async def read_popular_vendors(db: AsyncSession = Depends(get_async_db), limit: int = vendor.POPULAR_LIMIT):
+    return FastJSONResponse(await crud.get_popular_vendors(db, limit=limit))
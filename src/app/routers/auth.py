@@ -1,23 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from starlette.concurrency import run_in_threadpool
+from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
 from src.app.auth import (
     create_access_token,
     create_refresh_token,
     decode_refresh_token,
-    decode_token,
+    hash_password_async,
     validate_password,
-    verify_password,
+    verify_password_async,
 )
-from src.app.crud.user import create_user, get_user_by_username
+from src.app.crud.user import create_user_with_vendor, get_user_by_username, update_password_hash
 from src.app.database import get_db
-from src.app.models.vendor import Vendor
+from src.app.dependencies import AuthenticatedUser, get_current_user
 from src.app.schemas.auth import Token
 from src.app.schemas.user import UserCreate, UserOut
+from src.app.utils import response_cache
+from src.app.utils.executor import ExecutorOverloaded
 
 router = APIRouter()
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
+
+def _overloaded() -> HTTPException:
+    return HTTPException(status_code=503, detail="Too many authentication requests, try again shortly", headers={"Retry-After": "1"})
 
 @router.post(
     "/auth/register",
@@ -27,28 +32,26 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
     tags=["Auth"],
     responses={
         200: {"description": "User registered successfully."},
-        400: {"description": "Username already exists."}
+        400: {"description": "Username already exists."},
+        503: {"description": "Password hashing is overloaded."}
     },
     response_description="User registered successfully."
 )
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    if get_user_by_username(db, user.username):
-        raise HTTPException(status_code=400, detail="Username already exists")
+async def register(user: UserCreate, db: Session = Depends(get_db)):
+    # Database calls go to the threadpool so they never block the event loop.
+    # The password is checked first so a rejected request never takes a bcrypt slot.
     try:
         validate_password(user.password)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    # Create user
-    db_user = create_user(db, user.username, user.password)
-    # Auto-create vendor for the user
-    new_vendor = Vendor(
-        name=f"Vendor {user.username}",
-        species="Human",
-        home_dimension="Earth-1",
-        user_id=db_user.id
-    )
-    db.add(new_vendor)
-    db.commit()
+    if await run_in_threadpool(get_user_by_username, db, user.username):
+        raise HTTPException(status_code=400, detail="Username already exists")
+    try:
+        hashed_password = await hash_password_async(user.password)
+    except ExecutorOverloaded:
+        raise _overloaded()
+    db_user = await run_in_threadpool(create_user_with_vendor, db, user.username, user.password, hashed_password)
+    response_cache.bump("vendors")
     return db_user
 
 @router.post(
@@ -59,16 +62,30 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     tags=["Auth"],
     responses={
         200: {"description": "Tokens returned successfully."},
-        401: {"description": "Invalid credentials."}
+        401: {"description": "Invalid credentials."},
+        403: {"description": "User is inactive."},
+        503: {"description": "Password hashing is overloaded."}
     },
     response_description="Tokens returned successfully."
 )
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = get_user_by_username(db, form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    user = await run_in_threadpool(get_user_by_username, db, form_data.username)
+    if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    access_token = create_access_token(data={"sub": user.username})
-    refresh_token = create_refresh_token(data={"sub": user.username})
+    user_id, username, is_active = user.id, user.username, user.is_active
+    try:
+        valid, new_hash = await verify_password_async(form_data.password, user.hashed_password)
+    except ExecutorOverloaded:
+        raise _overloaded()
+    if not valid:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    if not is_active:
+        raise HTTPException(status_code=403, detail="Inactive user")
+    if new_hash:
+        # Stored at a different BCRYPT_ROUNDS cost; upgrade while we have the plaintext
+        await run_in_threadpool(update_password_hash, db, user_id, new_hash)
+    access_token = create_access_token(data={"sub": username})
+    refresh_token = create_refresh_token(data={"sub": username})
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 @router.post(
@@ -99,15 +116,10 @@ def refresh_token_endpoint(refresh_token: str):
     responses={
         200: {"description": "Current user profile returned successfully."},
         401: {"description": "Invalid token."},
+        403: {"description": "User is inactive."},
         404: {"description": "User not found."}
     },
     response_description="Current user profile returned successfully."
 )
-def read_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    token_data = decode_token(token)
-    if not token_data:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    user = get_user_by_username(db, token_data.username)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
+def read_current_user(current_user: AuthenticatedUser = Depends(get_current_user)):
+    return current_user
@@ -1,77 +1,62 @@
-import os
-from pathlib import Path
-from typing import List, Optional
-from uuid import uuid4
+import csv
+import io
+import json
+from dataclasses import dataclass
+from datetime import date
+from typing import List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, File, Form, Query, UploadFile
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import Row
 from sqlalchemy.orm import Session
 
-from src.app.database import get_db
-from src.app.crud.fruit import get_all_fruits, get_historical_prices, get_price_trend
-from src.app.models.fruit import Fruit
-from src.app.schemas.fruit import FruitPriceListSchema, FruitPriceSchema, FruitSchema
-
-FRUITS_DIR = Path(__file__).resolve().parent.parent / "static" / "fruits"
+from src.app.database import get_db, session_local
+from src.app.crud.fruit import create_fruit as insert_fruit
+from src.app.crud.fruit import get_all_fruits, get_historical_prices, get_price_aggregates, get_price_trend, iter_historical_prices
+from src.app.schemas.fruit import FruitPriceAggregateListSchema, FruitPriceListSchema, FruitPriceSchema, FruitSchema
+from src.app.utils.pagination import IdPage, cursor_or_400, encode_cursor, id_page, id_page_response
+from src.app.utils.photos import PhotoTooLarge, schedule_derivatives, store_photo
+from src.app.utils.serialization import FastJSONResponse, rows_as_dicts
 
 router = APIRouter()
 
-@router.get(
-    "/fruits",
+async def save_photo(photo: Optional[UploadFile]) -> Optional[str]:
+    if not photo:
+        return None
+    try:
+        stored = await store_photo(photo)
+    except PhotoTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    schedule_derivatives(stored)
+    return stored.url
+
+# Parameters, route metadata and response shapes shared with the async twins in routers/aio.py
+
+FRUITS_ROUTE = dict(
     response_model=List[FruitSchema],
     summary="List Fruits",
-    description="Get a paginated list of fruits. Supports filtering by rarity level.",
+    description="Get a paginated list of fruits. Supports filtering by rarity level. Pass the X-Next-Cursor response header back as `after` to fetch the next page.",
     tags=["Fruit"],
     responses={
         200: {"description": "A list of fruits."}
     },
     response_description="A list of fruits."
 )
-def read_fruits(
-    db: Session = Depends(get_db),
-    page: int = Query(1, ge=1, description="Page number", example=1),
-    limit: int = Query(10, ge=1, le=100, description="Items per page", example=10),
-    rarity: Optional[int] = Query(None, description="Filter by rarity level", example=3)
-):
-    offset = (page - 1) * limit
-    return get_all_fruits(db, rarity_level=rarity, offset=offset, limit=limit)
 
-@router.post("/fruits")
-async def create_fruit(
-    name: str = Form(...),
-    flavor_profile: str = Form(...),
-    dimension_origin: str = Form(...),
-    rarity_level: int = Form(...),
-    base_value: float = Form(...),
-    photo: UploadFile = File(...),
-    db: Session = Depends(get_db)
-):
-    photo_url = None
-    if photo:
-        ext = os.path.splitext(photo.filename)[1]
-        filename = f"{uuid4().hex}{ext}"
-        save_path = os.path.join("static/fruits", filename)
-        os.makedirs(os.path.dirname(save_path), exist_ok=True)
-        with open(save_path, "wb") as f:
-            f.write(await photo.read())
-        photo_url = f"/static/fruits/{filename}"
-    fruit = Fruit(
-        name=name,
-        flavor_profile=flavor_profile,
-        dimension_origin=dimension_origin,
-        rarity_level=rarity_level,
-        base_value=base_value,
-        photo_url=photo_url
-    )
-    db.add(fruit)
-    db.commit()
-    db.refresh(fruit)
-    return {"id": fruit.id}
+TREND_ROUTE = dict(
+    summary="Get Fruit Price Trend",
+    description="Get the stored daily prices of a fruit over the last N days.",
+    tags=["Fruit"],
+    responses={
+        200: {"description": "The fruit's recent price trend."},
+        404: {"description": "Fruit not found."}
+    },
+    response_description="The fruit's recent price trend."
+)
 
-@router.get(
-    "/prices",
+PRICES_ROUTE = dict(
     summary="Get Historical Fruit Prices",
-    description="Get historical prices for fruits, with optional filtering by fruit_id, date range, and limit.",
+    description="Get historical prices for fruits, with optional filtering by fruit_id, date range, and limit. When limit is set and more rows exist, pass next_cursor back as `after` to fetch the next page.",
     tags=["Fruit"],
     response_model=FruitPriceListSchema,
     responses={
@@ -80,14 +65,157 @@ async def create_fruit(
     },
     response_description="Historical prices for fruits."
 )
-def get_prices(
+
+PRICE_AGGREGATE_ROUTE = dict(
+    summary="Get Aggregated Fruit Prices",
+    description="Get weekly or monthly open/high/low/close/average price candles, with optional filtering by fruit_id, date range, and limit.",
+    tags=["Fruit"],
+    response_model=FruitPriceAggregateListSchema,
+    responses={
+        200: {"description": "Price candles for fruits."},
+        404: {"description": "No prices found."}
+    },
+    response_description="Price candles for fruits."
+)
+
+RARITY = Query(None, description="Filter by rarity level", example=3)
+TREND_DAYS = Query(7, ge=1, le=365, description="Number of days to include", example=7)
+
+async def fruit_fields(
+    name: str = Form(...),
+    flavor_profile: str = Form(...),
+    dimension_origin: str = Form(...),
+    rarity_level: int = Form(...),
+    base_value: float = Form(...),
+    photo: UploadFile = File(...)
+) -> dict:
+    return {
+        "name": name,
+        "flavor_profile": flavor_profile,
+        "dimension_origin": dimension_origin,
+        "rarity_level": rarity_level,
+        "base_value": base_value,
+        "photo_url": await save_photo(photo),
+    }
+
+@dataclass(frozen=True)
+class PriceQuery:
+    fruit_id: Optional[int]
+    start_date: Optional[date]
+    end_date: Optional[date]
+    limit: Optional[int]
+    after: Optional[Tuple[date, int]]
+
+    def fetch_args(self) -> dict:
+        # One row more than the page, to tell whether a next page exists
+        limit = None if self.limit is None else self.limit + 1
+        return {"fruit_id": self.fruit_id, "start_date": self.start_date, "end_date": self.end_date, "limit": limit, "after": self.after}
+
+def price_query(
     fruit_id: int = Query(None, description="ID of the fruit", example=1),
-    start_date: str = Query(None, description="Start date (YYYY-MM-DD)", example="2025-07-01"),
-    end_date: str = Query(None, description="End date (YYYY-MM-DD)", example="2025-07-10"),
+    start_date: date = Query(None, description="Start date (YYYY-MM-DD)", example="2025-07-01"),
+    end_date: date = Query(None, description="End date (YYYY-MM-DD)", example="2025-07-10"),
     limit: int = Query(None, description="Limit number of results", example=30),
-    db: Session = Depends(get_db)
-):
-    prices = get_historical_prices(db, fruit_id=fruit_id, start_date=start_date, end_date=end_date, limit=limit)
+    after: Optional[str] = Query(None, description="Cursor from the previous page's next_cursor")
+) -> PriceQuery:
+    after_key = None if after is None else cursor_or_400(after, (date.fromisoformat, int))
+    return PriceQuery(fruit_id, start_date, end_date, limit, after_key)
+
+def price_aggregate_query(
+    bucket: str = Query(..., pattern="^(week|month)$", description="Candle size: week or month", example="week"),
+    fruit_id: int = Query(None, description="ID of the fruit", example=1),
+    start_date: date = Query(None, description="Start date (YYYY-MM-DD)", example="2025-07-01"),
+    end_date: date = Query(None, description="End date (YYYY-MM-DD)", example="2025-09-30"),
+    limit: int = Query(None, description="Limit number of candles", example=12)
+) -> dict:
+    return {"bucket": bucket, "fruit_id": fruit_id, "start_date": start_date, "end_date": end_date, "limit": limit}
+
+def trend_response(trend: Optional[dict]):
+    if trend is None:
+        return JSONResponse(status_code=404, content={"error": "Fruit not found"})
+    return trend
+
+def prices_response(prices: List[Row], query: PriceQuery):
     if not prices:
         return JSONResponse(status_code=404, content={"error": "No prices found"})
-    return {"prices": prices}
\ No newline at end of file
+    next_cursor = None
+    if query.limit is not None and len(prices) > query.limit:
+        prices = prices[:query.limit]
+        next_cursor = encode_cursor(prices[-1].date.isoformat(), prices[-1].id)
+    return FastJSONResponse({"prices": rows_as_dicts(prices), "next_cursor": next_cursor})
+
+def price_aggregate_response(bucket: str, candles: list):
+    if not candles:
+        return JSONResponse(status_code=404, content={"error": "No prices found"})
+    return {"bucket": bucket, "candles": candles}
+
+@router.get("/fruits", **FRUITS_ROUTE)
+def read_fruits(
+    db: Session = Depends(get_db),
+    page: IdPage = Depends(id_page),
+    rarity: Optional[int] = RARITY
+):
+    return id_page_response(rows_as_dicts(get_all_fruits(db, rarity_level=rarity, **page.fetch_args())), page)
+
+@router.get("/fruits/{fruit_name}/trend", **TREND_ROUTE)
+def read_price_trend(fruit_name: str, days: int = TREND_DAYS, db: Session = Depends(get_db)):
+    return trend_response(get_price_trend(db, fruit_name, days=days))
+
+@router.post("/fruits")
+def create_fruit(fields: dict = Depends(fruit_fields), db: Session = Depends(get_db)):
+    return {"id": insert_fruit(db, **fields).id}
+
+@router.get("/prices", **PRICES_ROUTE)
+def get_prices(query: PriceQuery = Depends(price_query), db: Session = Depends(get_db)):
+    return prices_response(get_historical_prices(db, **query.fetch_args()), query)
+
+def _stream_prices(export_format: str, **filters):
+    # The response outlives the request's dependencies, so the stream owns its session
+    db = session_local()
+    try:
+        if export_format == "csv":
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            writer.writerow(["id", "fruit_id", "date", "price"])
+            yield buf.getvalue()
+        for batch in iter_historical_prices(db, **filters):
+            if export_format == "csv":
+                buf.seek(0)
+                buf.truncate()
+                writer.writerows((row.id, row.fruit_id, row.date.isoformat(), row.price) for row in batch)
+                yield buf.getvalue()
+            else:
+                yield "".join(
+                    json.dumps({"id": row.id, "fruit_id": row.fruit_id, "date": row.date.isoformat(), "price": row.price}) + "\n"
+                    for row in batch
+                )
+    finally:
+        db.close()
+
+@router.get(
+    "/prices/export",
+    summary="Export Historical Fruit Prices",
+    description="Stream historical prices as NDJSON or CSV, with optional filtering by fruit_id and date range. Rows are written as they are read, so memory use does not grow with the size of the export.",
+    tags=["Fruit"],
+    responses={
+        200: {
+            "description": "A stream of historical prices.",
+            "content": {"application/x-ndjson": {}, "text/csv": {}}
+        }
+    },
+    response_description="A stream of historical prices."
+)
+def export_prices(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Export format: ndjson or csv", example="csv"),
+    fruit_id: int = Query(None, description="ID of the fruit", example=1),
+    start_date: date = Query(None, description="Start date (YYYY-MM-DD)", example="2025-07-01"),
+    end_date: date = Query(None, description="End date (YYYY-MM-DD)", example="2025-07-10")
+):
+    stream = _stream_prices(format, fruit_id=fruit_id, start_date=start_date, end_date=end_date)
+    if format == "csv":
+        return StreamingResponse(stream, media_type="text/csv", headers={"Content-Disposition": 'attachment; filename="prices.csv"'})
+    return StreamingResponse(stream, media_type="application/x-ndjson")
+
+@router.get("/prices/aggregate", **PRICE_AGGREGATE_ROUTE)
+def get_price_aggregate(query: dict = Depends(price_aggregate_query), db: Session = Depends(get_db)):
+    return price_aggregate_response(query["bucket"], get_price_aggregates(db, **query))
@@ -1,25 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
-from src.app.auth import decode_token
-from src.app.crud.trade import perform_trade
+from src.app.crud.trade import get_trade_history, perform_trade, perform_trades
 from src.app.database import get_db
-from src.app.models.user import User
-from src.app.models.vendor import Vendor
-from src.app.schemas.trade import TradeRequest, TradeResponse
+from src.app.dependencies import AuthenticatedUser, get_current_user
+from src.app.schemas.trade import (
+    TradeBatchItemResult,
+    TradeBatchRequest,
+    TradeBatchResponse,
+    TradeHistorySchema,
+    TradeRequest,
+    TradeResponse,
+)
+from src.app.utils.pagination import cursor_or_400, encode_cursor
+from src.app.utils.serialization import FastJSONResponse, rows_as_dicts
 
 router = APIRouter()
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    token_data = decode_token(token)
-    if not token_data:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    user = db.query(User).filter_by(username=token_data.username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
+def _trade_response(request: TradeRequest, result: dict) -> TradeResponse:
+    return TradeResponse(
+        status="success",
+        trade_type=request.trade_type,
+        from_vendor_id=request.from_vendor_id,
+        to_vendor_id=request.to_vendor_id,
+        fruit_id=request.fruit_id,
+        quantity=request.quantity,
+        currency_amount=result.get("currency_amount"),
+        alien_currency=request.alien_currency,
+        details=result
+    )
 
 @router.post(
     "/trade",
@@ -34,12 +46,10 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     },
     response_description="Trade completed successfully."
 )
-def trade_route(request: TradeRequest, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    # Get the vendor for the current user
-    vendor = db.query(Vendor).filter_by(user_id=current_user.id).first()
-    if not vendor:
+def trade_route(request: TradeRequest, db: Session = Depends(get_db), current_user: AuthenticatedUser = Depends(get_current_user)):
+    if current_user.vendor_id is None:
         raise HTTPException(status_code=403, detail="User does not have a vendor profile")
-    if request.from_vendor_id != vendor.id:
+    if request.from_vendor_id != current_user.vendor_id:
         raise HTTPException(status_code=403, detail="You can only initiate trades from your own vendor")
     try:
         result = perform_trade(
@@ -52,16 +62,71 @@ def trade_route(request: TradeRequest, db: Session = Depends(get_db), current_us
             currency_amount=request.currency_amount,
             alien_currency=request.alien_currency
         )
-        return TradeResponse(
-            status="success",
-            trade_type=request.trade_type,
-            from_vendor_id=request.from_vendor_id,
-            to_vendor_id=request.to_vendor_id,
-            fruit_id=request.fruit_id,
-            quantity=request.quantity,
-            currency_amount=result.get("currency_amount"),
-            alien_currency=request.alien_currency,
-            details=result
-        )
+        return _trade_response(request, result)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post(
+    "/trades/batch",
+    summary="Execute a batch of trades",
+    description="Execute many trades from your own vendor in one transaction. With atomic=true (default) any failing trade rolls back the whole batch; otherwise each trade reports its own result.",
+    tags=["Trade"],
+    response_model=TradeBatchResponse,
+    responses={
+        200: {"description": "Batch processed."},
+        400: {"description": "Atomic batch rejected because a trade failed."},
+        403: {"description": "Forbidden: You can only trade from your own vendor."}
+    },
+    response_description="Batch processed."
+)
+def trade_batch_route(batch: TradeBatchRequest, db: Session = Depends(get_db), current_user: AuthenticatedUser = Depends(get_current_user)):
+    if current_user.vendor_id is None:
+        raise HTTPException(status_code=403, detail="User does not have a vendor profile")
+    if any(t.from_vendor_id != current_user.vendor_id for t in batch.trades):
+        raise HTTPException(status_code=403, detail="You can only initiate trades from your own vendor")
+    try:
+        outcomes = perform_trades(db, batch.trades, atomic=batch.atomic)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    results = []
+    for index, (request, (result, error)) in enumerate(zip(batch.trades, outcomes)):
+        if error is None:
+            results.append(TradeBatchItemResult(index=index, status="success", trade=_trade_response(request, result)))
+        else:
+            results.append(TradeBatchItemResult(index=index, status="error", error=error))
+    failed = sum(1 for r in results if r.status == "error")
+    return TradeBatchResponse(
+        status="success" if failed == 0 else "partial",
+        succeeded=len(results) - failed,
+        failed=failed,
+        results=results
+    )
+
+@router.get(
+    "/trades",
+    summary="Trade history",
+    description="Trades your vendor sent or received, newest first by trade time, from the append-only ledger. Trades are recorded in batches, so a new one can take up to LEDGER_FLUSH_SECONDS to appear. When more trades exist, pass next_cursor back as `after` to fetch the next page.",
+    tags=["Trade"],
+    response_model=TradeHistorySchema,
+    responses={
+        200: {"description": "A page of trades."},
+        400: {"description": "Invalid cursor."},
+        403: {"description": "User does not have a vendor profile."}
+    },
+    response_description="A page of trades."
+)
+def trade_history_route(
+    limit: int = Query(50, ge=1, le=200, description="Trades per page", example=50),
+    after: Optional[str] = Query(None, description="Cursor from the previous page's next_cursor"),
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    if current_user.vendor_id is None:
+        raise HTTPException(status_code=403, detail="User does not have a vendor profile")
+    after_key = None if after is None else cursor_or_400(after, (datetime.fromisoformat, int))
+    trades = get_trade_history(db, current_user.vendor_id, limit=limit + 1, after=after_key)
+    next_cursor = None
+    if len(trades) > limit:
+        trades = trades[:limit]
+        next_cursor = encode_cursor(trades[-1].created_at.isoformat(), trades[-1].id)
+    return FastJSONResponse({"trades": rows_as_dicts(trades), "next_cursor": next_cursor})
@@ -1,51 +1,34 @@
 from typing import List, Optional
 
 from fastapi import APIRouter, Body, Depends, HTTPException, Query
-from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 
-from src.app.auth import decode_token
-from src.app.crud.vendor import get_all_vendors, get_popular_vendors
+from src.app.crud.vendor import adjust_vendor_scores, get_all_vendors, get_popular_vendors, get_vendor_by_user_id, upsert_inventory
 from src.app.database import get_db
-from src.app.models.fruit import VendorInventory
-from src.app.models.user import User
+from src.app.dependencies import AuthenticatedUser, get_current_user
+from src.app.models.fruit import Fruit
 from src.app.models.vendor import Vendor
 from src.app.schemas.vendor import VendorSchema
+from src.app.utils import response_cache
+from src.app.utils.pagination import IdPage, id_page, id_page_response
+from src.app.utils.serialization import FastJSONResponse
 
 router = APIRouter()
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    token_data = decode_token(token)
-    if not token_data:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    user = db.query(User).filter_by(username=token_data.username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
+# Parameters, route metadata and response shapes shared with the async twins in routers/aio.py
 
-@router.get(
-    "/vendors",
+VENDORS_ROUTE = dict(
     response_model=List[VendorSchema],
     summary="List Vendors",
-    description="Get a paginated list of vendors. Supports filtering by species.",
+    description="Get a paginated list of vendors. Supports filtering by species. Pass the X-Next-Cursor response header back as `after` to fetch the next page.",
     tags=["Vendor"],
     responses={
         200: {"description": "A list of vendors."}
     },
     response_description="A list of vendors."
 )
-def read_vendors(
-    db: Session = Depends(get_db),
-    page: int = Query(1, ge=1, description="Page number", example=1),
-    limit: int = Query(10, ge=1, le=100, description="Items per page", example=10),
-    species: Optional[str] = Query(None, description="Filter by species", example="Human")
-):
-    offset = (page - 1) * limit
-    return get_all_vendors(db, species=species, offset=offset, limit=limit)
 
-@router.get(
-    "/vendors/me",
+MY_VENDOR_ROUTE = dict(
     response_model=VendorSchema,
     summary="Get My Vendor Profile",
     description="Get the vendor profile associated with the current authenticated user.",
@@ -56,14 +39,8 @@ def read_vendors(
     },
     response_description="The current user's vendor profile."
 )
-def read_my_vendor(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    vendor = db.query(Vendor).filter_by(user_id=current_user.id).first()
-    if not vendor:
-        raise HTTPException(status_code=404, detail="Vendor profile not found")
-    return vendor
 
-@router.get(
-    "/vendors/popular",
+POPULAR_VENDORS_ROUTE = dict(
     response_model=List[VendorSchema],
     summary="List Popular Vendors",
     description="Get a list of the most popular vendors, ranked by the sum of (quantity * rarity_level) of all their fruits.",
@@ -73,28 +50,46 @@ def read_my_vendor(db: Session = Depends(get_db), current_user: User = Depends(g
     },
     response_description="A list of popular vendors."
 )
-def read_popular_vendors(
+
+SPECIES = Query(None, description="Filter by species", example="Human")
+POPULAR_LIMIT = Query(5, ge=1, le=20, description="Number of popular vendors to return", example=5)
+
+def vendor_or_404(vendor: Optional[Vendor]) -> Vendor:
+    if not vendor:
+        raise HTTPException(status_code=404, detail="Vendor profile not found")
+    return vendor
+
+@router.get("/vendors", **VENDORS_ROUTE)
+def read_vendors(
     db: Session = Depends(get_db),
-    limit: int = Query(5, ge=1, le=20, description="Number of popular vendors to return", example=5)
+    page: IdPage = Depends(id_page),
+    species: Optional[str] = SPECIES
 ):
-    return get_popular_vendors(db, limit=limit)
+    return id_page_response(get_all_vendors(db, species=species, **page.fetch_args()), page)
+
+@router.get("/vendors/me", **MY_VENDOR_ROUTE)
+def read_my_vendor(db: Session = Depends(get_db), current_user: AuthenticatedUser = Depends(get_current_user)):
+    return vendor_or_404(get_vendor_by_user_id(db, current_user.id))
+
+@router.get("/vendors/popular", **POPULAR_VENDORS_ROUTE)
+def read_popular_vendors(db: Session = Depends(get_db), limit: int = POPULAR_LIMIT):
+    return FastJSONResponse(get_popular_vendors(db, limit=limit))
 
 @router.post("/vendors/me/add-fruit")
 def add_fruit_to_inventory(
     data: dict = Body(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthenticatedUser = Depends(get_current_user)
 ):
     fruit_id = data["fruit_id"]
     quantity = data["quantity"]
-    vendor = db.query(Vendor).filter_by(user_id=current_user.id).first()
-    if not vendor:
+    if current_user.vendor_id is None:
         raise HTTPException(status_code=404, detail="Vendor not found")
-    inv = db.query(VendorInventory).filter_by(vendor_id=vendor.id, fruit_id=fruit_id).first()
-    if inv:
-        inv.quantity += int(quantity)
-    else:
-        inv = VendorInventory(vendor_id=vendor.id, fruit_id=fruit_id, quantity=quantity)
-        db.add(inv)
+    fruit = db.get(Fruit, fruit_id)
+    if not fruit:
+        raise HTTPException(status_code=404, detail="Fruit not found")
+    upsert_inventory(db, current_user.vendor_id, fruit_id, int(quantity))
+    adjust_vendor_scores(db, {current_user.vendor_id: int(quantity) * (fruit.rarity_level or 0)})
     db.commit()
+    response_cache.bump("vendors")
     return {"success": True}
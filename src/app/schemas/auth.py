@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Optional
 
 from pydantic import BaseModel
@@ -9,3 +10,4 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     username: str | None = None
+    expires_at: datetime | None = None
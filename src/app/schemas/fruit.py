@@ -1,3 +1,4 @@
+from datetime import date
 from typing import List, Optional
 
 from pydantic import BaseModel
@@ -25,11 +26,29 @@ class VendorInventorySchema(BaseModel):
 class FruitPriceSchema(BaseModel):
     id: int
     fruit_id: int
-    date: str  # ISO date string (YYYY-MM-DD)
+    date: date
     price: float
 
     class Config:
         from_attributes = True
 
 class FruitPriceListSchema(BaseModel):
-    prices: List[FruitPriceSchema] 
\ No newline at end of file
+    prices: List[FruitPriceSchema]
+    next_cursor: Optional[str] = None 
+
+class FruitPriceAggregateSchema(BaseModel):
+    fruit_id: int
+    period_start: date
+    open: float
+    high: float
+    low: float
+    close: float
+    avg: float
+    price_count: int
+
+    class Config:
+        from_attributes = True
+
+class FruitPriceAggregateListSchema(BaseModel):
+    bucket: str
+    candles: List[FruitPriceAggregateSchema]
@@ -1,12 +1,13 @@
-from typing import Optional
+from datetime import datetime
+from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 class TradeRequest(BaseModel):
     from_vendor_id: int
     to_vendor_id: int
     fruit_id: int
-    quantity: int
+    quantity: int = Field(..., gt=0)
     trade_type: str  # 'send', 'request', 'buy', 'sell'
     currency_amount: Optional[float] = None  # For buy/sell
     alien_currency: bool = True
@@ -17,7 +18,43 @@ class TradeResponse(BaseModel):
     from_vendor_id: int
     to_vendor_id: int
     fruit_id: int
-    quantity: int
+    quantity: int = Field(..., gt=0)
     currency_amount: Optional[float] = None
     alien_currency: bool
-    details: dict 
\ No newline at end of file
+    details: dict
+
+class TradeBatchRequest(BaseModel):
+    trades: List[TradeRequest] = Field(..., min_length=1, max_length=1000)
+    atomic: bool = True  # Roll back the whole batch if any trade fails
+
+class TradeBatchItemResult(BaseModel):
+    index: int
+    status: str  # 'success' or 'error'
+    trade: Optional[TradeResponse] = None
+    error: Optional[str] = None
+
+class TradeBatchResponse(BaseModel):
+    status: str
+    succeeded: int
+    failed: int
+    results: List[TradeBatchItemResult]
+
+class TradeLedgerEntrySchema(BaseModel):
+    id: int
+    created_at: datetime
+    trade_type: str
+    from_vendor_id: int
+    to_vendor_id: int
+    fruit_id: int
+    quantity: int = Field(..., gt=0)
+    base_value: float
+    tax: float
+    total_cost: float
+    alien_currency: bool
+
+    class Config:
+        from_attributes = True
+
+class TradeHistorySchema(BaseModel):
+    trades: List[TradeLedgerEntrySchema]
+    next_cursor: Optional[str] = None
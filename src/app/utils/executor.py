@@ -0,0 +1,39 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+class ExecutorOverloaded(RuntimeError):
+    """Raised by ``BoundedExecutor.submit`` when its queue is full."""
+
+class BoundedExecutor:
+    """Thread pool that refuses work instead of queueing it without limit.
+
+    At most ``max_workers`` calls run at once and ``max_pending`` more may
+    wait; anything beyond that fails immediately with ``ExecutorOverloaded``
+    so callers can shed load rather than pile up behind slow work.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, thread_name_prefix: str = ""):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        if not self._slots.acquire(blocking=False):
+            raise ExecutorOverloaded("Executor queue is full")
+        try:
+            future = self._pool.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Submit ``fn`` and await its result without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,243 @@
+"""Write-behind buffer for the trade ledger.
+
+``perform_trade`` and ``perform_trades`` hand each committed trade to
+``ledger.record``. It only appends to an in-memory buffer, so a trade's
+transaction does not wait on the audit row. A background thread, started
+with the app's lifespan, writes the buffer as one multi-row INSERT. It
+does so every ``LEDGER_FLUSH_SECONDS``, or as soon as ``LEDGER_BATCH_SIZE``
+entries are waiting. Without the thread, a full buffer is written by the
+request that filled it.
+
+When a write fails, for example while the database is down, the batch is
+appended to a JSON-lines spool file in ``LEDGER_SPOOL_DIR`` (relative to
+the project root) and fsynced.
+The next flush by any process replays spooled files first. Every entry
+carries a unique ``entry_id``, so replaying a batch whose write did commit
+inserts nothing twice. A file that still fails after
+``LEDGER_MAX_REPLAYS`` attempts is split to find the entries the database
+rejects (a foreign key that no longer exists, say). Those move to
+``dead-letter/`` in the spool directory, and the rest are written, so one bad
+entry cannot hold back every later file.
+
+Shutdown flushes the buffer. Entries still buffered when a process is
+killed are lost, which is the price of keeping the write off the trade's
+path.
+
+Entries go through ``session_local`` unless the ledger is given another
+``session_factory``; code that trades against a different database, like
+the benchmark suite, points the ledger at it with ``redirect``.
+"""
+import fcntl
+import json
+import logging
+import os
+import socket
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Session
+
+from src.app.database import dialect_insert, session_local
+from src.app.metrics import ledger_entries_dead_lettered_total, ledger_entries_spooled_total, ledger_entries_written_total
+from src.app.models.trade import Trade
+
+logger = logging.getLogger(__name__)
+
+LEDGER_BATCH_SIZE = int(os.getenv("LEDGER_BATCH_SIZE", "500"))
+LEDGER_FLUSH_SECONDS = float(os.getenv("LEDGER_FLUSH_SECONDS", "1.0"))
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+LEDGER_SPOOL_DIR = PROJECT_ROOT / os.getenv("LEDGER_SPOOL_DIR", "spool/ledger")
+LEDGER_MAX_REPLAYS = int(os.getenv("LEDGER_MAX_REPLAYS", "5"))
+
+def _dump(entry: dict) -> str:
+    return json.dumps({**entry, "created_at": entry["created_at"].isoformat()}) + "\n"
+
+def _load(line: str) -> dict:
+    entry = json.loads(line)
+    entry["created_at"] = datetime.fromisoformat(entry["created_at"])
+    return entry
+
+def _append(path: Path, entries: List[dict]) -> None:
+    """Append entries to a JSON-lines file under an exclusive lock, and fsync."""
+    while True:
+        with open(path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            # Another process may have replayed and removed the file while we waited for the lock
+            if not os.path.exists(path) or os.stat(path).st_ino != os.fstat(f.fileno()).st_ino:
+                continue
+            f.writelines(_dump(entry) for entry in entries)
+            f.flush()
+            os.fsync(f.fileno())
+            return
+
+class TradeLedger:
+    def __init__(self, spool_dir: Path = LEDGER_SPOOL_DIR, batch_size: int = LEDGER_BATCH_SIZE, flush_seconds: float = LEDGER_FLUSH_SECONDS, max_replays: int = LEDGER_MAX_REPLAYS, session_factory: Callable[[], Session] = session_local):
+        self.spool_dir = spool_dir
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_replays = max_replays
+        self._replay_failures: Dict[str, int] = {}  # spool file name -> failed replays in this process
+        self._buffer: List[dict] = []
+        self._lock = threading.Lock()  # guards _buffer
+        self._flush_lock = threading.Lock()  # one flush at a time per process
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def spool_path(self) -> Path:
+        return self.spool_dir / f"ledger-{socket.gethostname()}-{os.getpid()}.jsonl"
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._buffer)
+
+    def record(self, entries: Iterable[dict]) -> None:
+        with self._lock:
+            self._buffer.extend(entries)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            if self._thread is not None:
+                self._wake.set()
+            else:
+                self.flush()
+
+    def flush(self) -> int:
+        """Replay spooled entries, then write the buffer. Returns the number of entries sent to the table."""
+        with self._flush_lock:
+            written = self._replay_spool()
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return written
+            try:
+                self._write(batch)
+            except Exception as e:
+                logger.warning("Could not write %d ledger entries, spooling them: %s", len(batch), e)
+                try:
+                    self._spool(batch)
+                except OSError:
+                    with self._lock:
+                        self._buffer[:0] = batch
+                    raise
+                return written
+            return written + len(batch)
+
+    def _write(self, entries: List[dict]) -> None:
+        db = self.session_factory()
+        try:
+            stmt = dialect_insert(db, Trade).on_conflict_do_nothing(index_elements=[Trade.entry_id])
+            for i in range(0, len(entries), self.batch_size):
+                db.execute(stmt, entries[i:i + self.batch_size])
+            db.commit()
+        finally:
+            db.close()
+        ledger_entries_written_total.inc(len(entries))
+
+    def _spool(self, entries: List[dict]) -> None:
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        _append(self.spool_path, entries)
+        ledger_entries_spooled_total.inc(len(entries))
+
+    def _write_rejecting(self, entries: List[dict]) -> List[dict]:
+        """Write ``entries``, halving failing batches down to the single entries the database rejects; returns those.
+
+        Any other error (the database being down) propagates.
+        """
+        try:
+            self._write(entries)
+            return []
+        except (IntegrityError, DataError):
+            if len(entries) == 1:
+                return entries
+        middle = len(entries) // 2
+        return self._write_rejecting(entries[:middle]) + self._write_rejecting(entries[middle:])
+
+    def _replay_spool(self) -> int:
+        if not self.spool_dir.is_dir():
+            return 0
+        written = 0
+        for path in sorted(self.spool_dir.glob("ledger-*.jsonl")):
+            try:
+                f = open(path)
+            except FileNotFoundError:
+                continue
+            with f:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # being replayed or appended to by another process
+                if not os.path.exists(path) or os.stat(path).st_ino != os.fstat(f.fileno()).st_ino:
+                    continue  # replayed by another process before we got the lock
+                entries = [_load(line) for line in f if line.strip()]
+                rejected = []
+                try:
+                    if self._replay_failures.get(path.name, 0) < self.max_replays:
+                        if entries:
+                            self._write(entries)
+                    else:
+                        rejected = self._write_rejecting(entries)
+                except Exception as e:
+                    self._replay_failures[path.name] = self._replay_failures.get(path.name, 0) + 1
+                    logger.warning("Could not replay %s (attempt %d): %s", path.name, self._replay_failures[path.name], e)
+                    break
+                if rejected:
+                    dead_letter = self.spool_dir / "dead-letter"
+                    dead_letter.mkdir(exist_ok=True)
+                    _append(dead_letter / path.name, rejected)
+                    ledger_entries_dead_lettered_total.inc(len(rejected))
+                    logger.error("Moved %d ledger entries the database rejects from %s to %s", len(rejected), path.name, dead_letter)
+                path.unlink()
+                self._replay_failures.pop(path.name, None)
+                written += len(entries) - len(rejected)
+        return written
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="trade-ledger", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Trade ledger flush failed")
+
+    def stop(self) -> None:
+        """Stop the flush thread and write what is left."""
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    @contextmanager
+    def redirect(self, session_factory: Callable[[], Session], spool_dir: Path) -> Iterator["TradeLedger"]:
+        """Send entries recorded inside the block to another database and spool directory.
+
+        The buffer is flushed on the way in and on the way out, so entries
+        recorded before the block still reach the previous target.
+        """
+        self.flush()
+        previous = self.session_factory, self.spool_dir
+        self.session_factory, self.spool_dir = session_factory, spool_dir
+        try:
+            yield self
+        finally:
+            try:
+                self.flush()
+            finally:
+                self.session_factory, self.spool_dir = previous
+
+ledger = TradeLedger()
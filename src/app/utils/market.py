@@ -0,0 +1,187 @@
+"""Synthetic market generator for capacity testing.
+
+Builds fruits, vendors, vendor inventory and a price history of any size
+from a seed. Rows are generated as NumPy arrays and written in blocks of
+``CHUNK_ROWS``: with COPY on Postgres, and a bulk INSERT elsewhere.
+
+- Fruit rarity follows ``RARITY_WEIGHTS``, and base values grow with rarity.
+- Each vendor stocks a Poisson-distributed number of distinct fruits.
+  Common fruits are picked more often than rare ones.
+- Prices are backfilled with ``simulate.backfill_prices``. Days that already
+  have prices are skipped.
+
+The same seed and sizes on an empty database give the same market. Name
+collisions with existing rows are avoided with ``--prefix``.
+
+    python -m src.app.utils.market --fruits 100000 --vendors 50000 --inventory 10000000 --days 730 --seed 42
+"""
+import argparse
+import csv
+import io
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import Table, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from src.app.crud.vendor import rebuild_vendor_scores
+from src.app.database import session_local
+from src.app.models import Fruit, Vendor, VendorInventory
+from src.app.utils import response_cache
+from src.app.utils.simulate import backfill_prices
+
+CHUNK_ROWS = 500_000
+
+RARITY_WEIGHTS = np.array([0.40, 0.27, 0.18, 0.10, 0.05])  # rarity levels 1..5
+FLAVORS = ["sweet", "sour", "bitter", "tangy", "umami", "spicy", "crunchy", "juicy", "voidlike", "fizzy", "smoky", "floral"]
+DIMENSIONS = ["Earth-1", "Zeta-9", "Nullverse", "Kepler-22b", "Mirrorworld", "Sector-7", "Andromeda-3", "Echo Prime"]
+SPECIES = ["Human", "Kleeb", "Zorg", "Glorp", "Vexian", "Mycelid", "Quillon", "Synth"]
+PREFIXES = ["Grapple", "Void", "Star", "Quantum", "Nebula", "Shadow", "Ember", "Frost", "Lumen", "Echo"]
+SUFFIXES = ["berry", "melon", "fig", "plum", "pear", "nut", "mango", "lime", "apple", "peach"]
+
+@dataclass(frozen=True)
+class MarketSpec:
+    fruits: int
+    vendors: int
+    inventory: int  # target rows; duplicate picks are dropped, so slightly fewer are written
+    days: int = 0
+    prefix: str = ""
+
+def _next_id(db: Session, model) -> int:
+    return (db.scalar(select(func.max(model.id))) or 0) + 1
+
+def _write_rows(db: Session, table: Table, columns: Sequence[str], rows: List[tuple]) -> None:
+    if not rows:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        buf = io.StringIO()
+        csv.writer(buf).writerows(rows)
+        buf.seek(0)
+        with db.connection().connection.cursor() as cursor:
+            cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+        return
+    db.execute(insert(table), [dict(zip(columns, row)) for row in rows])
+
+def _sync_sequence(db: Session, table: Table) -> None:
+    # Rows were written with explicit ids, so move the serial past them
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text(f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), (SELECT max(id) FROM {table.name}))"))
+
+def fruit_rows(rng: np.random.Generator, count: int, first_id: int, prefix: str = "") -> Tuple[List[tuple], np.ndarray]:
+    """Return (id, name, flavor_profile, dimension_origin, rarity_level, base_value) rows and the rarity array."""
+    rarity = rng.choice(np.arange(1, 6), size=count, p=RARITY_WEIGHTS)
+    base_value = np.round(rng.lognormal(mean=1.0, sigma=0.5, size=count) * rarity * 2, 2)
+    flavors = rng.integers(0, len(FLAVORS), size=(count, 2))
+    dimension = rng.integers(0, len(DIMENSIONS), size=count)
+    name_parts = rng.integers(0, len(PREFIXES), size=(count, 2))
+    rows = [
+        (
+            first_id + i,
+            f"{prefix}{PREFIXES[p]}{SUFFIXES[s]}-{first_id + i}",
+            FLAVORS[f1] if f1 == f2 else f"{FLAVORS[f1]},{FLAVORS[f2]}",
+            DIMENSIONS[d],
+            int(r),
+            float(v),
+        )
+        for i, ((p, s), (f1, f2), d, r, v) in enumerate(zip(name_parts.tolist(), flavors.tolist(), dimension.tolist(), rarity, base_value))
+    ]
+    return rows, rarity
+
+def vendor_rows(rng: np.random.Generator, count: int, first_id: int, prefix: str = "") -> List[tuple]:
+    """Return (id, name, species, home_dimension) rows."""
+    species = rng.integers(0, len(SPECIES), size=count).tolist()
+    dimension = rng.integers(0, len(DIMENSIONS), size=count).tolist()
+    return [
+        (first_id + i, f"{prefix}Vendor {first_id + i}", SPECIES[sp], DIMENSIONS[d])
+        for i, (sp, d) in enumerate(zip(species, dimension))
+    ]
+
+def inventory_rows(rng: np.random.Generator, vendor_ids: np.ndarray, fruit_ids: np.ndarray, rarity: np.ndarray, total: int) -> Iterator[np.ndarray]:
+    """Yield (vendor_id, fruit_id, quantity) arrays of about ``CHUNK_ROWS`` rows, distinct per (vendor, fruit)."""
+    if vendor_ids.size == 0 or fruit_ids.size == 0 or total <= 0:
+        return
+    popularity = 1.0 / rarity
+    popularity /= popularity.sum()
+    mean = total / vendor_ids.size
+    vendors_per_chunk = max(1, int(CHUNK_ROWS // max(mean, 1)))
+    span = int(fruit_ids.size)
+    for start in range(0, vendor_ids.size, vendors_per_chunk):
+        vendors = vendor_ids[start:start + vendors_per_chunk]
+        counts = np.minimum(rng.poisson(mean, size=vendors.size), span)
+        owners = np.repeat(np.arange(vendors.size), counts)
+        picks = rng.choice(span, size=owners.size, p=popularity)
+        keys = np.unique(owners.astype(np.int64) * span + picks)
+        quantity = rng.geometric(1 / 50, size=keys.size)
+        yield np.column_stack((vendors[keys // span], fruit_ids[keys % span], quantity))
+
+def generate_market(db: Session, spec: MarketSpec, rng: np.random.Generator) -> Dict[str, float]:
+    """Write a synthetic market described by ``spec``. Returns row counts and seconds per stage."""
+    stats: Dict[str, float] = {}
+
+    started = time.perf_counter()
+    first_fruit = _next_id(db, Fruit)
+    fruits, rarity = fruit_rows(rng, spec.fruits, first_fruit, spec.prefix)
+    fruit_columns = ("id", "name", "flavor_profile", "dimension_origin", "rarity_level", "base_value")
+    for i in range(0, len(fruits), CHUNK_ROWS):
+        _write_rows(db, Fruit.__table__, fruit_columns, fruits[i:i + CHUNK_ROWS])
+    _sync_sequence(db, Fruit.__table__)
+    db.commit()
+    stats["fruits"], stats["fruits_s"] = len(fruits), time.perf_counter() - started
+
+    started = time.perf_counter()
+    first_vendor = _next_id(db, Vendor)
+    vendors = vendor_rows(rng, spec.vendors, first_vendor, spec.prefix)
+    for i in range(0, len(vendors), CHUNK_ROWS):
+        _write_rows(db, Vendor.__table__, ("id", "name", "species", "home_dimension"), vendors[i:i + CHUNK_ROWS])
+    _sync_sequence(db, Vendor.__table__)
+    db.commit()
+    stats["vendors"], stats["vendors_s"] = len(vendors), time.perf_counter() - started
+
+    started = time.perf_counter()
+    written = 0
+    chunks = inventory_rows(
+        rng,
+        np.arange(first_vendor, first_vendor + spec.vendors, dtype=np.int64),
+        np.arange(first_fruit, first_fruit + spec.fruits, dtype=np.int64),
+        rarity,
+        spec.inventory,
+    )
+    for chunk in chunks:
+        _write_rows(db, VendorInventory.__table__, ("vendor_id", "fruit_id", "quantity"), [tuple(row) for row in chunk.tolist()])
+        db.commit()
+        written += len(chunk)
+    stats["inventory"], stats["inventory_s"] = written, time.perf_counter() - started
+
+    started = time.perf_counter()
+    stats["prices"] = backfill_prices(db, spec.days, rng=rng) if spec.days > 0 else 0
+    stats["prices_s"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    rebuild_vendor_scores(db)
+    response_cache.bump("fruits")
+    stats["scores_s"] = time.perf_counter() - started
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a reproducible synthetic market for capacity testing.")
+    parser.add_argument("--fruits", type=int, default=1_000)
+    parser.add_argument("--vendors", type=int, default=500)
+    parser.add_argument("--inventory", type=int, default=20_000, help="Target vendor inventory rows")
+    parser.add_argument("--days", type=int, default=30, help="Days of price history to backfill")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--prefix", default="", help="Prepended to generated names, to add a second market beside the first")
+    args = parser.parse_args(argv)
+    spec = MarketSpec(args.fruits, args.vendors, args.inventory, args.days, args.prefix)
+    db = session_local()
+    try:
+        stats = generate_market(db, spec, np.random.default_rng(args.seed))
+    finally:
+        db.close()
+    for stage in ("fruits", "vendors", "inventory", "prices"):
+        print(f"{stage:>10}: {int(stats[stage]):>12,} rows in {stats[stage + '_s']:8.2f}s")
+    print(f"{'scores':>10}: {'':>12} rebuilt in {stats['scores_s']:5.2f}s")
+
+if __name__ == "__main__":
+    main()
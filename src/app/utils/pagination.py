@@ -0,0 +1,67 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Query
+
+from src.app.utils.serialization import FastJSONResponse
+
+def encode_cursor(*values: Any) -> str:
+    """Pack the sort key of the last row on a page into an opaque URL-safe token."""
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def decode_cursor(cursor: str, types: Sequence[Callable[[Any], Any]]) -> Tuple[Any, ...]:
+    """Unpack a token from ``encode_cursor``, converting each value with ``types``.
+
+    Raises ``ValueError`` if the token is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(types):
+        raise ValueError("Invalid cursor")
+    try:
+        return tuple(convert(value) for convert, value in zip(types, values))
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+def cursor_or_400(cursor: str, types: Sequence[Callable[[Any], Any]]) -> Tuple[Any, ...]:
+    """``decode_cursor`` for route handlers: a malformed token is the client's error."""
+    try:
+        return decode_cursor(cursor, types)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@dataclass(frozen=True)
+class IdPage:
+    """A page of rows ordered by id, addressed by page number or by the last id seen."""
+    offset: int
+    limit: int
+    after: Optional[int]
+
+    def fetch_args(self) -> dict:
+        # One row more than the page, to tell whether a next page exists
+        return {"offset": self.offset, "limit": self.limit + 1, "after": self.after}
+
+def id_page(
+    page: int = Query(1, ge=1, description="Page number (ignored when `after` is given)", example=1),
+    limit: int = Query(10, ge=1, le=100, description="Items per page", example=10),
+    after: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header")
+) -> IdPage:
+    if after is None:
+        return IdPage(offset=(page - 1) * limit, limit=limit, after=None)
+    (after_id,) = cursor_or_400(after, (int,))
+    return IdPage(offset=0, limit=limit, after=after_id)
+
+def id_page_response(items: List[dict], page: IdPage) -> FastJSONResponse:
+    """Serve the items fetched with ``page.fetch_args()``, with X-Next-Cursor when there are more."""
+    headers = {}
+    if len(items) > page.limit:
+        items = items[:page.limit]
+        headers["X-Next-Cursor"] = encode_cursor(items[-1]["id"])
+    return FastJSONResponse(items, headers=headers)
@@ -0,0 +1,146 @@
+"""Content-addressed storage for uploaded fruit photos.
+
+An upload is copied in chunks on a worker thread, hashed as it goes and
+renamed to ``<sha256><ext>``, so identical images are stored once and a
+stored file never changes. Uploads over ``PHOTO_MAX_BYTES`` are rejected
+and their partial copy is removed.
+
+Derived files are generated on ``derivative_executor`` after the request
+has returned: a gzip variant of compressible formats such as SVG (see
+utils/static.py), and resized copies (``<sha256>_<width><ext>`` for each
+of ``PHOTO_SIZES``). Resizing needs Pillow (``pip install .[images]``);
+without it no resized copies are made.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, List, Optional
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from src.app.utils.executor import BoundedExecutor, ExecutorOverloaded
+from src.app.utils.static import GZIP_SUFFIX, is_compressible, precompress
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - exercised when the extra is not installed
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Served by the /static mount in main.py
+PHOTO_DIR = Path(__file__).resolve().parent.parent / "static" / "fruits"
+PHOTO_URL_PREFIX = "/static/fruits"
+PHOTO_MAX_BYTES = int(os.getenv("PHOTO_MAX_BYTES", str(5 * 1024 * 1024)))
+PHOTO_SIZES = tuple(int(size) for size in os.getenv("PHOTO_SIZES", "128,512").split(",") if size)
+CHUNK_SIZE = 64 * 1024
+
+derivative_executor = BoundedExecutor(
+    max_workers=int(os.getenv("PHOTO_WORKERS", "1")),
+    max_pending=int(os.getenv("PHOTO_MAX_PENDING", "64")),
+    thread_name_prefix="photo-derivatives",
+)
+
+class PhotoTooLarge(ValueError):
+    """Raised by ``store_photo`` when an upload exceeds ``PHOTO_MAX_BYTES``."""
+
+@dataclass(frozen=True)
+class StoredPhoto:
+    digest: str
+    path: Path
+    url: str
+    created: bool  # False when an identical file was already stored
+
+def _extension(filename: Optional[str]) -> str:
+    ext = os.path.splitext(filename or "")[1].lower()
+    # Only short alphanumeric extensions reach the file name
+    return ext if 1 < len(ext) <= 6 and ext[1:].isalnum() else ""
+
+def _copy(source: BinaryIO, ext: str, directory: Path, max_bytes: int) -> StoredPhoto:
+    directory.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_name = tempfile.mkstemp(dir=directory, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := source.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise PhotoTooLarge(f"Photo exceeds the {max_bytes} byte limit")
+                digest.update(chunk)
+                out.write(chunk)
+        name = digest.hexdigest() + ext
+        path = directory / name
+        created = not path.exists()
+        if created:
+            os.replace(tmp_name, path)
+        else:
+            os.unlink(tmp_name)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+    return StoredPhoto(digest.hexdigest(), path, f"{PHOTO_URL_PREFIX}/{name}", created)
+
+async def store_photo(photo: UploadFile, directory: Path = None, max_bytes: int = None) -> StoredPhoto:
+    """Stream ``photo`` into content-addressed storage without blocking the event loop.
+
+    Raises ``PhotoTooLarge`` when it exceeds ``max_bytes``.
+    """
+    directory = PHOTO_DIR if directory is None else directory
+    max_bytes = PHOTO_MAX_BYTES if max_bytes is None else max_bytes
+    await photo.seek(0)
+    return await run_in_threadpool(_copy, photo.file, _extension(photo.filename), directory, max_bytes)
+
+def derivative_path(path: Path, width: int) -> Path:
+    return path.with_name(f"{path.stem}_{width}{path.suffix}")
+
+def make_derivatives(path: Path, sizes=PHOTO_SIZES) -> List[Path]:
+    """Write a resized copy of ``path`` for every width in ``sizes`` that is not already on disk."""
+    if Image is None:
+        return []
+    written = []
+    with Image.open(path) as image:
+        for width in sizes:
+            target = derivative_path(path, width)
+            if target.exists() or image.width <= width:
+                continue
+            resized = image.copy()
+            resized.thumbnail((width, image.height))
+            # Write then rename, so a reader never sees a partial file
+            tmp = target.with_name(f".{target.name}.tmp")
+            resized.save(tmp, format=image.format)
+            os.replace(tmp, target)
+            written.append(target)
+    return written
+
+def _missing_derivatives(path: Path) -> bool:
+    # Compressible formats (SVG and other text) get a gzip variant; raster images get resized copies
+    if is_compressible(path.name):
+        return not path.with_name(path.name + GZIP_SUFFIX).exists()
+    return Image is not None and not all(derivative_path(path, width).exists() for width in PHOTO_SIZES)
+
+def _make_derivatives_logged(path: Path) -> None:
+    try:
+        if is_compressible(path.name):
+            precompress(path)
+        else:
+            make_derivatives(path)
+    except OSError as e:
+        # Includes uploads Pillow cannot decode; the original is still served
+        logger.warning("Could not generate derived files of %s: %s", path.name, e)
+    except Exception:
+        logger.exception("Could not generate derived files of %s", path)
+
+def schedule_derivatives(photo: StoredPhoto) -> None:
+    """Queue any missing derived files of ``photo``; dropped with a warning when the queue is full."""
+    if not _missing_derivatives(photo.path):
+        return
+    try:
+        derivative_executor.submit(_make_derivatives_logged, photo.path)
+    except ExecutorOverloaded:
+        logger.warning("Photo derivative queue is full; skipped %s", photo.path.name)
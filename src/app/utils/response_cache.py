@@ -0,0 +1,170 @@
+"""Conditional-GET response cache for read-mostly routes.
+
+``ResponseCacheMiddleware`` stores the full 200 response of registered GET
+routes, keyed on path, canonical query string and the current version of
+every namespace the route depends on. Writers call ``bump`` after
+committing, which makes older entries unreachable; nothing is deleted
+eagerly. Every cached response carries a strong ETag, so a client that
+sends a matching ``If-None-Match`` gets a bodiless 304.
+
+The default ``InProcessBackend`` keeps entries and versions in one worker's
+memory. With several workers, a write only invalidates the worker that
+served it, and other workers serve stale pages until ``RESPONSE_CACHE_TTL``
+runs out. Implement ``ResponseCacheBackend`` over a shared store and pass it
+to ``set_backend`` to share both.
+"""
+import hashlib
+import os
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from src.app.utils.cache import TTLCache
+
+@dataclass(frozen=True)
+class CachedResponse:
+    status: int
+    headers: Tuple[Tuple[bytes, bytes], ...]
+    body: bytes
+    etag: str
+
+class ResponseCacheBackend(ABC):
+    """Storage for cached responses and per-namespace version counters."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[CachedResponse]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, response: CachedResponse) -> None:
+        ...
+
+    @abstractmethod
+    def version(self, namespace: str) -> int:
+        ...
+
+    @abstractmethod
+    def bump(self, namespace: str) -> int:
+        """Increment and return ``namespace``'s version."""
+
+class InProcessBackend(ResponseCacheBackend):
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        return self._entries.get(key)
+
+    def set(self, key: str, response: CachedResponse) -> None:
+        self._entries.set(key, response)
+
+    def version(self, namespace: str) -> int:
+        return self._versions.get(namespace, 0)
+
+    def bump(self, namespace: str) -> int:
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            return self._versions[namespace]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+_backend: ResponseCacheBackend = InProcessBackend(
+    maxsize=int(os.getenv("RESPONSE_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "60")),
+)
+
+def get_backend() -> ResponseCacheBackend:
+    return _backend
+
+def set_backend(backend: ResponseCacheBackend) -> None:
+    global _backend
+    _backend = backend
+
+def bump(*namespaces: str) -> None:
+    """Invalidate every cached response depending on any of ``namespaces``. Call after commit."""
+    for namespace in namespaces:
+        _backend.bump(namespace)
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+def _cache_key(path: str, query_string: bytes, versions: Sequence[int]) -> str:
+    query = urlencode(sorted(parse_qsl(query_string.decode("latin-1"), keep_blank_values=True)))
+    return f"{path}?{query}#" + ".".join(map(str, versions))
+
+class ResponseCacheMiddleware:
+    """Serve registered GET routes from the response cache, answering If-None-Match with 304.
+
+    ``routes`` maps an exact request path to the namespaces its response depends on.
+    """
+
+    def __init__(self, app, routes: Dict[str, Sequence[str]]):
+        self.app = app
+        self.routes = routes
+        # Matched route per path, so cache hits keep their route for metrics and logs
+        self._matched: Dict[str, object] = {}
+
+    async def __call__(self, scope, receive, send):
+        namespaces = self.routes.get(scope.get("path")) if scope["type"] == "http" and scope["method"] == "GET" else None
+        if namespaces is None:
+            await self.app(scope, receive, send)
+            return
+        backend = _backend
+        key = _cache_key(scope["path"], scope.get("query_string", b""), [backend.version(ns) for ns in namespaces])
+        if_none_match = next((v.decode("latin-1") for k, v in scope.get("headers", ()) if k == b"if-none-match"), None)
+
+        cached = backend.get(key)
+        if cached is None:
+            cached = await self._render(scope, receive)
+            if cached.status != 200:
+                await self._send(send, cached, include_body=True)
+                return
+            backend.set(key, cached)
+            if "route" in scope:
+                self._matched[scope["path"]] = scope["route"]
+        elif scope["path"] in self._matched:
+            scope["route"] = self._matched[scope["path"]]
+        if if_none_match is not None and etag_matches(if_none_match, cached.etag):
+            await self._send(send, CachedResponse(304, cached.headers, b"", cached.etag), include_body=False)
+            return
+        await self._send(send, cached, include_body=True)
+
+    async def _render(self, scope, receive) -> CachedResponse:
+        start = {}
+        chunks: List[bytes] = []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        body = b"".join(chunks)
+        headers = tuple(
+            (name, value) for name, value in start.get("headers", ())
+            if name.lower() not in (b"content-length", b"etag")
+        )
+        return CachedResponse(start.get("status", 500), headers, body, make_etag(body))
+
+    @staticmethod
+    async def _send(send, response: CachedResponse, include_body: bool) -> None:
+        headers = list(response.headers)
+        if response.status in (200, 304):
+            headers += [(b"etag", response.etag.encode()), (b"cache-control", b"no-cache")]
+        if include_body:
+            headers.append((b"content-length", str(len(response.body)).encode()))
+        await send({"type": "http.response.start", "status": response.status, "headers": headers})
+        await send({"type": "http.response.body", "body": response.body if include_body else b""})
@@ -1,53 +1,95 @@
+"""Seed fruits and vendors from JSON files.
+
+Each table is written with one bulk INSERT ... ON CONFLICT DO NOTHING, and
+fruit names are resolved to ids through one lookup instead of a query per
+inventory item. Re-running is safe: rows that already exist are kept as they
+are.
+
+    python -m src.app.utils.seed                      # reads ./data
+    python -m src.app.utils.seed --data-dir fixtures
+"""
+import argparse
 import json
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+
+from src.app.crud.vendor import rebuild_vendor_scores
+from src.app.database import dialect_insert, session_local
 from src.app.models import Fruit, Vendor, VendorInventory
-from src.app.database import session_local, engine, Base
-
-# Ensure all tables exist
-Base.metadata.create_all(bind=engine)
-
-def seed_fruits(db: Session):
-    with open("data/fruits.json", "r") as f:
-        fruits = json.load(f)
-        for fruit in fruits:
-            f_obj = Fruit(
-                name=fruit["name"],
-                flavor_profile=",".join(fruit["flavor_profile"]),
-                dimension_origin=fruit["dimension_origin"],
-                rarity_level=fruit["rarity_level"],
-                base_value=fruit["base_value"]
-            )
-            db.add(f_obj)
-    db.commit()
-
-def seed_vendors(db: Session):
-    with open("data/vendors.json", "r") as f:
-        vendors = json.load(f)
-        for vendor in vendors:
-            v_obj = Vendor(
-                name=vendor["name"],
-                species=vendor["species"],
-                home_dimension=vendor["home_dimension"]
-            )
-            db.add(v_obj)
-            db.flush()  # Needed to get v_obj.id before inserting inventory
-
-            for item in vendor["inventory"]:
-                fruit = db.query(Fruit).filter_by(name=item["fruit"]).first()
-                if fruit:
-                    inventory = VendorInventory(
-                        vendor_id=v_obj.id,
-                        fruit_id=fruit.id,
-                        quantity=item["quantity"]
-                    )
-                    db.add(inventory)
-    db.commit()
-
-def run_seed():
+from src.app.utils import response_cache
+
+DATA_DIR = Path(__file__).resolve().parents[3] / "data"
+
+def _ids_by_name(db: Session, model, names: Iterable[str]) -> Dict[str, int]:
+    return dict(db.execute(select(model.name, model.id).where(model.name.in_(list(names)))).all())
+
+def seed_fruits(db: Session, fruits: List[dict]) -> Dict[str, int]:
+    """Insert ``fruits`` that are not there yet. Returns name -> id for all of them."""
+    if not fruits:
+        return {}
+    db.execute(
+        dialect_insert(db, Fruit).on_conflict_do_nothing(index_elements=[Fruit.name]),
+        [
+            {
+                "name": fruit["name"],
+                "flavor_profile": ",".join(fruit["flavor_profile"]),
+                "dimension_origin": fruit["dimension_origin"],
+                "rarity_level": fruit["rarity_level"],
+                "base_value": fruit["base_value"],
+            }
+            for fruit in fruits
+        ],
+    )
+    return _ids_by_name(db, Fruit, (fruit["name"] for fruit in fruits))
+
+def seed_vendors(db: Session, vendors: List[dict], fruit_ids: Dict[str, int]) -> Dict[str, int]:
+    """Insert ``vendors`` and their inventory; items naming unknown fruits are skipped. Returns name -> id."""
+    if not vendors:
+        return {}
+    db.execute(
+        dialect_insert(db, Vendor).on_conflict_do_nothing(index_elements=[Vendor.name]),
+        [{"name": v["name"], "species": v["species"], "home_dimension": v["home_dimension"]} for v in vendors],
+    )
+    vendor_ids = _ids_by_name(db, Vendor, (v["name"] for v in vendors))
+    inventory = [
+        {"vendor_id": vendor_ids[vendor["name"]], "fruit_id": fruit_ids[item["fruit"]], "quantity": item["quantity"]}
+        for vendor in vendors
+        for item in vendor.get("inventory", ())
+        if item["fruit"] in fruit_ids
+    ]
+    if inventory:
+        db.execute(
+            dialect_insert(db, VendorInventory).on_conflict_do_nothing(
+                index_elements=[VendorInventory.vendor_id, VendorInventory.fruit_id],
+            ),
+            inventory,
+        )
+    return vendor_ids
+
+def seed(db: Session, fruits: List[dict], vendors: List[dict]) -> None:
+    fruit_ids = seed_fruits(db, fruits)
+    seed_vendors(db, vendors, fruit_ids)
+    # Also commits, and brings the popularity leaderboard in line with the new inventory
+    rebuild_vendor_scores(db)
+    response_cache.bump("fruits")
+
+def run_seed(data_dir: Path = DATA_DIR) -> None:
+    fruits = json.loads((data_dir / "fruits.json").read_text())
+    vendors = json.loads((data_dir / "vendors.json").read_text())
     db = session_local()
-    seed_fruits(db)
-    seed_vendors(db)
-    db.close()
+    try:
+        seed(db, fruits, vendors)
+    finally:
+        db.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed fruits and vendors from fruits.json and vendors.json.")
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    args = parser.parse_args(argv)
+    run_seed(args.data_dir)
 
 if __name__ == "__main__":
-    run_seed()
+    main()
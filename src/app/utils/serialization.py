@@ -0,0 +1,44 @@
+"""Fast JSON path for large list responses.
+
+Routes that can return thousands of rows select plain column tuples
+(``columns_for``) instead of ORM entities, turn them into dicts and return
+a ``FastJSONResponse``. Returning a ``Response`` bypasses FastAPI's
+per-object ``response_model`` validation, while the model still documents
+the shape in OpenAPI. The JSON is encoded with orjson when it is installed
+(``pip install .[fast-json]``), and with the stdlib encoder otherwise.
+"""
+import json
+from datetime import date, datetime
+from typing import Any, Iterable, List, Tuple, Type
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+from sqlalchemy import Row
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised when the extra is not installed
+    orjson = None
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def columns_for(model: type, schema: Type[BaseModel]) -> Tuple:
+    """The mapped columns of ``model`` named by ``schema``'s fields, in field order."""
+    return tuple(getattr(model, name) for name in schema.model_fields)
+
+def rows_as_dicts(rows: Iterable[Row]) -> List[dict]:
+    return [row._asdict() for row in rows]
@@ -0,0 +1,185 @@
+"""Fruit price simulation.
+
+Each fruit's daily price is its base value with a uniform ±20% fluctuation.
+Prices for every fruit (and, when backfilling, for a whole block of days)
+are generated as one NumPy array and written in bulk.
+
+    python -m src.app.utils.simulate                        # today's prices
+    python -m src.app.utils.simulate --days 730 --seed 42   # backfill two years
+"""
+import argparse
+import io
+import time
+from datetime import date, timedelta
+from itertools import groupby
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from src.app.crud.fruit import ROLLUP_BUCKETS, invalidate_price_trends, store_daily_prices, upsert_price_candles
+from src.app.database import session_local
+from src.app.models.fruit import Fruit, FruitPrice
+
+FLUCTUATION = 0.2  # ±20%
+BACKFILL_CHUNK_ROWS = 1_000_000
+
+def load_base_values(db: Session) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (fruit_ids, base_values) arrays ordered by fruit id."""
+    rows = db.execute(
+        select(Fruit.id, Fruit.base_value).where(Fruit.base_value.isnot(None)).order_by(Fruit.id)
+    ).all()
+    ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    base_values = np.fromiter((r[1] for r in rows), dtype=np.float64, count=len(rows))
+    return ids, base_values
+
+def simulate_prices(base_values: np.ndarray, rng: np.random.Generator, days: int = 1) -> np.ndarray:
+    """Return a (days, fruits) array of simulated prices rounded to cents."""
+    fluctuation = rng.uniform(-FLUCTUATION, FLUCTUATION, size=(days, base_values.size))
+    return np.round(base_values * (1.0 + fluctuation), 2)
+
+def store_simulated_prices(db: Session, day: Optional[date] = None, rng: Optional[np.random.Generator] = None) -> int:
+    """Simulate and store one day's prices for every fruit. Returns the number of rows inserted."""
+    day = day or date.today()
+    rng = rng or np.random.default_rng()
+    ids, base_values = load_base_values(db)
+    if ids.size == 0:
+        return 0
+    prices = simulate_prices(base_values, rng)[0]
+    rows = [
+        {"fruit_id": fruit_id, "date": day, "price": price}
+        for fruit_id, price in zip(ids.tolist(), prices.tolist())
+    ]
+    inserted = store_daily_prices(db, rows)
+    db.commit()
+    invalidate_price_trends()
+    return len(inserted)
+
+def backfill_prices(db: Session, days: int, end: Optional[date] = None, rng: Optional[np.random.Generator] = None) -> int:
+    """Simulate ``days`` days of history ending at ``end`` (default today).
+
+    Fruit/day pairs that already have a price are skipped, so fruits added
+    since an earlier backfill get their history and re-running writes
+    nothing. The rest are generated in blocks of about
+    ``BACKFILL_CHUNK_ROWS`` prices, written with COPY on Postgres (a bulk
+    INSERT elsewhere) and folded into the OHLC rollups straight from the
+    arrays. Returns the number of rows written.
+    """
+    end = end or date.today()
+    start = end - timedelta(days=days - 1)
+    rng = rng or np.random.default_rng()
+    ids, base_values = load_base_values(db)
+    if ids.size == 0:
+        return 0
+    priced = _priced(db, ids, start, end)
+    todo = [day for day in (start + timedelta(days=i) for i in range(days)) if day not in priced or not priced[day].all()]
+    chunk_days = max(1, BACKFILL_CHUNK_ROWS // ids.size)
+    written = 0
+    for i in range(0, len(todo), chunk_days):
+        chunk = todo[i:i + chunk_days]
+        prices = simulate_prices(base_values, rng, days=len(chunk))
+        missing = np.ones(prices.shape, dtype=bool)
+        for row, day in enumerate(chunk):
+            if day in priced:
+                missing[row] = ~priced[day]
+        _write_prices(db, ids, chunk, prices, missing)
+        upsert_price_candles(db, _candles(ids, chunk, prices, missing))
+        db.commit()
+        written += int(missing.sum())
+    invalidate_price_trends()
+    return written
+
+def _priced(db: Session, ids: np.ndarray, start: date, end: date) -> Dict[date, np.ndarray]:
+    """Map each day in [start, end] that has prices to a mask over ``ids`` of the fruits priced that day."""
+    counts = db.execute(
+        select(FruitPrice.date, func.count())
+        .join(Fruit, Fruit.id == FruitPrice.fruit_id)
+        .where(FruitPrice.date.between(start, end), Fruit.base_value.isnot(None))
+        .group_by(FruitPrice.date)
+    ).all()
+    priced = {}
+    for day, count in counts:
+        if count == ids.size:
+            priced[day] = np.ones(ids.size, dtype=bool)
+            continue
+        # Only partly priced days (fruits added since) are read pair by pair
+        fruit_ids = np.fromiter(db.scalars(select(FruitPrice.fruit_id).where(FruitPrice.date == day)), dtype=np.int64)
+        pos = np.searchsorted(ids, fruit_ids)
+        known = pos < ids.size
+        known[known] = ids[pos[known]] == fruit_ids[known]
+        mask = np.zeros(ids.size, dtype=bool)
+        mask[pos[known]] = True
+        priced[day] = mask
+    return priced
+
+def _write_prices(db: Session, ids: np.ndarray, days: List[date], prices: np.ndarray, missing: np.ndarray) -> None:
+    """Write the prices where ``missing`` is set."""
+    if db.get_bind().dialect.name == "postgresql":
+        buf = io.StringIO()
+        for day, row, mask in zip(days, prices, missing):
+            np.savetxt(buf, np.column_stack((ids[mask], row[mask])), fmt=f"%d,{day.isoformat()},%.2f")
+        buf.seek(0)
+        with db.connection().connection.cursor() as cursor:
+            cursor.copy_expert("COPY fruit_prices (fruit_id, date, price) FROM STDIN WITH (FORMAT csv)", buf)
+        return
+    id_list = ids.tolist()
+    db.execute(insert(FruitPrice.__table__), [
+        {"fruit_id": fruit_id, "date": day, "price": price}
+        for day, row, mask in zip(days, prices.tolist(), missing.tolist())
+        for fruit_id, price, keep in zip(id_list, row, mask)
+        if keep
+    ])
+
+def _candles(ids: np.ndarray, days: List[date], prices: np.ndarray, missing: np.ndarray) -> List[dict]:
+    """Reduce the written cells of a (days, fruits) price block to one candle per fruit per bucket period."""
+    id_list = ids.tolist()
+    cols = np.arange(ids.size)
+    candles = []
+    for bucket, period_of in ROLLUP_BUCKETS.items():
+        for period_start, group in groupby(range(len(days)), key=lambda i: period_of(days[i])):
+            idx = list(group)
+            block, written = prices[idx[0]:idx[-1] + 1], missing[idx[0]:idx[-1] + 1]
+            first = written.argmax(axis=0)
+            last = len(idx) - 1 - written[::-1].argmax(axis=0)
+            columns = zip(
+                id_list,
+                written.sum(axis=0).tolist(),
+                first.tolist(),
+                last.tolist(),
+                block[first, cols].tolist(),
+                block[last, cols].tolist(),
+                np.where(written, block, -np.inf).max(axis=0).tolist(),
+                np.where(written, block, np.inf).min(axis=0).tolist(),
+                np.where(written, block, 0.0).sum(axis=0).tolist(),
+            )
+            candles.extend(
+                {
+                    "bucket": bucket, "fruit_id": fruit_id, "period_start": period_start,
+                    "open_date": days[idx[first_]], "open": open_, "close_date": days[idx[last_]], "close": close,
+                    "high": high, "low": low, "price_sum": price_sum, "price_count": count,
+                }
+                for fruit_id, count, first_, last_, open_, close, high, low, price_sum in columns
+                if count
+            )
+    return candles
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate and store daily fruit prices.")
+    parser.add_argument("--days", type=int, default=None, help="Backfill this many days of history ending today")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible prices")
+    args = parser.parse_args(argv)
+    rng = np.random.default_rng(args.seed)
+    db = session_local()
+    try:
+        started = time.perf_counter()
+        if args.days:
+            written = backfill_prices(db, args.days, rng=rng)
+        else:
+            written = store_simulated_prices(db, rng=rng)
+        print(f"Stored {written} prices in {time.perf_counter() - started:.2f}s")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Static file serving tuned for browser and proxy caches.
+
+``CachedStaticFiles`` serves content-addressed files (``<sha256>[_<width>].<ext>``,
+see utils/photos.py) with a year-long ``immutable`` Cache-Control, so a
+browser that has one never asks again. Every other file gets ``no-cache``
+and is revalidated against the ETag / Last-Modified that ``FileResponse``
+already sends, which costs a bodiless 304.
+
+For compressible types, a ``<file>.gz`` written beside the original by
+``precompress`` is served to clients that accept gzip, instead of
+compressing on every request. Precompress a deployed tree with:
+
+    python -m src.app.utils.static src/app/static
+"""
+import argparse
+import gzip
+import mimetypes
+import os
+import re
+import stat
+from pathlib import Path
+from typing import List, Optional
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+HASHED_NAME = re.compile(r"^[0-9a-f]{64}(_\d+)?(\.[a-z0-9]+)?$")
+COMPRESSIBLE_TYPES = {"image/svg+xml", "application/javascript", "text/javascript", "application/json", "application/xml", "application/wasm"}
+GZIP_SUFFIX = ".gz"
+
+def is_hashed(name: str) -> bool:
+    return HASHED_NAME.match(name) is not None
+
+def is_compressible(name: str) -> bool:
+    media_type, encoding = mimetypes.guess_type(name)
+    if media_type is None or encoding is not None:
+        return False
+    return media_type.startswith("text/") or media_type in COMPRESSIBLE_TYPES
+
+def precompress(path: Path) -> Optional[Path]:
+    """Write ``<path>.gz`` for a compressible file. Returns None when gzip would not make it smaller."""
+    if not is_compressible(path.name):
+        return None
+    target = path.with_name(path.name + GZIP_SUFFIX)
+    source_stat = path.stat()
+    if target.exists() and target.stat().st_mtime >= source_stat.st_mtime:
+        return target
+    data = gzip.compress(path.read_bytes(), compresslevel=9, mtime=0)
+    if len(data) >= source_stat.st_size:
+        return None
+    tmp = target.with_name(f".{target.name}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, target)
+    return target
+
+def precompress_tree(directory: Path) -> List[Path]:
+    written = []
+    for path in sorted(directory.rglob("*")):
+        if path.is_file() and not path.name.startswith("."):
+            target = precompress(path)
+            if target is not None:
+                written.append(target)
+    return written
+
+def _accepts_gzip(scope: Scope) -> bool:
+    for coding in Headers(scope=scope).get("accept-encoding", "").split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() not in ("gzip", "*"):
+            continue
+        q = params.strip().removeprefix("q=")
+        try:
+            return float(q) > 0 if q else True
+        except ValueError:
+            return False
+    return False
+
+class CachedStaticFiles(StaticFiles):
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] in ("GET", "HEAD") and is_compressible(path) and _accepts_gzip(scope):
+            try:
+                full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + GZIP_SUFFIX)
+            except (OSError, ValueError):
+                stat_result = None
+            if stat_result is not None and stat.S_ISREG(stat_result.st_mode):
+                return self.file_response(full_path, stat_result, scope, encoded_as=path)
+        return await super().get_response(path, scope)
+
+    def file_response(self, full_path, stat_result, scope: Scope, status_code: int = 200, encoded_as: Optional[str] = None) -> Response:
+        name = os.path.basename(encoded_as or full_path)
+        headers = {"Cache-Control": IMMUTABLE if is_hashed(name) else REVALIDATE}
+        if is_compressible(name):
+            headers["Vary"] = "Accept-Encoding"
+        if encoded_as is not None:
+            headers["Content-Encoding"] = "gzip"
+        media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, headers=headers, media_type=media_type)
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write .gz variants of compressible static files.")
+    parser.add_argument("directory", type=Path)
+    args = parser.parse_args(argv)
+    for path in precompress_tree(args.directory):
+        print(path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+# The app no longer creates tables on import (migrations do); the test database gets them here
+import src.app.models  # noqa: F401
+from src.app.database import Base, engine
+
+Base.metadata.create_all(bind=engine)
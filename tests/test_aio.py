@@ -0,0 +1,66 @@
+import unittest
+from uuid import uuid4
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.app.main import app
+from src.app.database import dispose_async_engine
+from src.app.routers import aio
+
+try:
+    import aiosqlite  # noqa: F401
+    HAS_ASYNC_DRIVER = True
+except ImportError:
+    HAS_ASYNC_DRIVER = False
+
+sync_client = TestClient(app)
+
+@unittest.skipUnless(HAS_ASYNC_DRIVER, "async extra (aiosqlite) not installed")
+class TestAsyncRoutes(unittest.TestCase):
+    """The async routes must answer exactly like the sync routes they replace."""
+
+    @classmethod
+    def setUpClass(cls):
+        async_app = FastAPI()
+        async_app.include_router(aio.router)
+        # One event loop for the whole class; pooled async connections are bound to it
+        cls.client = TestClient(async_app)
+        cls.client.__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.portal.call(dispose_async_engine)
+        cls.client.__exit__(None, None, None)
+
+    def assertSameResponse(self, url):
+        expected = sync_client.get(url)
+        actual = self.client.get(url)
+        self.assertEqual(actual.status_code, expected.status_code, url)
+        self.assertEqual(actual.json(), expected.json(), url)
+        self.assertEqual(actual.headers.get("X-Next-Cursor"), expected.headers.get("X-Next-Cursor"), url)
+
+    def test_create_and_list_fruits(self):
+        name = f"AsyncFruit-{uuid4().hex[:8]}"
+        response = self.client.post(
+            "/fruits",
+            data={"name": name, "flavor_profile": "Tart", "dimension_origin": "Earth", "rarity_level": 2, "base_value": 3.5},
+            files={"photo": ("async.png", b"\x89PNG", "image/png")},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.json()["id"], int)
+        self.assertSameResponse("/fruits?limit=2")
+        self.assertSameResponse("/fruits?rarity=2&limit=100")
+
+    def test_vendors_match_sync(self):
+        self.assertSameResponse("/vendors?limit=3")
+        self.assertSameResponse("/vendors/popular?limit=5")
+
+    def test_prices_match_sync(self):
+        self.assertSameResponse("/prices?limit=5")
+        self.assertSameResponse("/prices/aggregate?bucket=month&limit=5")
+        self.assertSameResponse("/fruits/NoSuchFruit/trend")
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get("/fruits?after=***").status_code, 400)
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
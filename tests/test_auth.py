@@ -1,6 +1,16 @@
+import asyncio
 import unittest
+from uuid import uuid4
 from fastapi.testclient import TestClient
 from src.app.main import app
+import threading
+from unittest import mock
+from passlib.context import CryptContext
+from src.app.auth import BCRYPT_ROUNDS, user_cache
+from src.app.crud.user import create_user, create_user_with_vendor, deactivate_user, get_user_by_username, update_password_hash
+from src.app.utils.executor import BoundedExecutor
+from src.app.database import session_local
+from tests.utils import count_queries
 
 client = TestClient(app)
 
@@ -30,5 +40,118 @@ class TestAuthEndpoints(unittest.TestCase):
         self.assertEqual(refresh_response.status_code, 200)
         self.assertIn("access_token", refresh_response.json())
 
+class TestCachedCurrentUser(unittest.TestCase):
+    def setUp(self):
+        self.username = f"cacheuser-{uuid4().hex[:8]}"
+        self.password = "Cachepass1!"
+        self.user_id = client.post("/auth/register", json={"username": self.username, "password": self.password}).json()["id"]
+        token = client.post("/auth/token", data={"username": self.username, "password": self.password}).json()["access_token"]
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    def test_cached_user_skips_database(self):
+        self.assertEqual(client.get("/auth/me", headers=self.headers).status_code, 200)
+        with count_queries() as counter:
+            response = client.get("/auth/me", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["username"], self.username)
+        self.assertEqual(counter.count, 0, counter.statements)
+
+    def test_deactivated_user_rejected(self):
+        self.assertEqual(client.get("/auth/me", headers=self.headers).status_code, 200)
+        db = session_local()
+        try:
+            self.assertTrue(deactivate_user(db, self.user_id))
+        finally:
+            db.close()
+        self.assertIsNone(user_cache.get(self.headers["Authorization"].split()[1]))
+        self.assertEqual(client.get("/auth/me", headers=self.headers).status_code, 403)
+        login = client.post("/auth/token", data={"username": self.username, "password": self.password})
+        self.assertEqual(login.status_code, 403)
+
+class TestPasswordHashing(unittest.TestCase):
+    def setUp(self):
+        self.username = f"hashuser-{uuid4().hex[:8]}"
+        self.password = "Hashpass1!"
+
+    def test_login_rehashes_at_configured_cost(self):
+        cheap = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=4).hash(self.password)
+        db = session_local()
+        try:
+            create_user(db, self.username, self.password, hashed_password=cheap)
+            response = client.post("/auth/token", data={"username": self.username, "password": self.password})
+            self.assertEqual(response.status_code, 200)
+            db.expire_all()
+            stored = get_user_by_username(db, self.username).hashed_password
+        finally:
+            db.close()
+        self.assertTrue(stored.startswith(f"$2b${BCRYPT_ROUNDS:02d}$"), stored)
+
+    def test_inactive_user_is_not_rehashed(self):
+        cheap = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=4).hash(self.password)
+        db = session_local()
+        try:
+            user = create_user(db, self.username, self.password, hashed_password=cheap)
+            deactivate_user(db, user.id)
+            response = client.post("/auth/token", data={"username": self.username, "password": self.password})
+            self.assertEqual(response.status_code, 403)
+            db.expire_all()
+            self.assertEqual(get_user_by_username(db, self.username).hashed_password, cheap)
+        finally:
+            db.close()
+
+    def test_overloaded_hashing_returns_503(self):
+        db = session_local()
+        try:
+            create_user(db, self.username, self.password)
+        finally:
+            db.close()
+        busy = BoundedExecutor(max_workers=1, max_pending=0)
+        release = threading.Event()
+        busy.submit(release.wait)
+        try:
+            with mock.patch("src.app.auth.password_executor", busy):
+                register = client.post("/auth/register", json={"username": f"{self.username}-2", "password": self.password})
+                login = client.post("/auth/token", data={"username": self.username, "password": self.password})
+        finally:
+            release.set()
+            busy.shutdown()
+        self.assertEqual(register.status_code, 503)
+        self.assertEqual(register.headers["Retry-After"], "1")
+        self.assertEqual(login.status_code, 503)
+
+    def test_invalid_password_takes_no_hashing_slot(self):
+        busy = BoundedExecutor(max_workers=1, max_pending=0)
+        release = threading.Event()
+        busy.submit(release.wait)
+        try:
+            with mock.patch("src.app.auth.password_executor", busy):
+                response = client.post("/auth/register", json={"username": self.username, "password": "weak"})
+        finally:
+            release.set()
+            busy.shutdown()
+        self.assertEqual(response.status_code, 400)
+
+    def test_database_calls_run_off_the_event_loop(self):
+        on_loop = []
+
+        def recording(fn):
+            def wrapper(*args, **kwargs):
+                try:
+                    asyncio.get_running_loop()
+                    on_loop.append(fn.__name__)
+                except RuntimeError:
+                    pass
+                return fn(*args, **kwargs)
+            return wrapper
+
+        cheap = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=4).hash(self.password)
+        with mock.patch("src.app.routers.auth.get_user_by_username", recording(get_user_by_username)), \
+                mock.patch("src.app.routers.auth.create_user_with_vendor", recording(create_user_with_vendor)), \
+                mock.patch("src.app.routers.auth.update_password_hash", recording(update_password_hash)), \
+                mock.patch("src.app.routers.auth.hash_password_async", mock.AsyncMock(return_value=cheap)):
+            self.assertEqual(client.post("/auth/register", json={"username": self.username, "password": self.password}).status_code, 200)
+            self.assertEqual(client.post("/auth/token", data={"username": self.username, "password": self.password}).status_code, 200)
+        self.assertEqual(on_loop, [])
+
 if __name__ == "__main__":
     unittest.main(verbosity=2)
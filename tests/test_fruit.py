@@ -1,8 +1,20 @@
+import csv
+import io
+import json
 import unittest
+from datetime import date, timedelta
+from uuid import uuid4
+import numpy as np
 from fastapi.testclient import TestClient
-from src.app.main import app, simulate_and_store_daily_prices
+from sqlalchemy import delete
+from src.app.main import app
+from src.app.jobs import simulate_and_store_daily_prices
 from src.app.database import session_local
-from src.app.models.fruit import Fruit, FruitPrice
+from src.app.crud.fruit import invalidate_price_trends, rebuild_price_rollups, store_daily_prices
+from src.app.models.fruit import Fruit, FruitPrice, FruitPriceRollup
+from src.app.schemas.fruit import FruitPriceListSchema, FruitSchema
+from src.app.utils import serialization
+from src.app.utils.simulate import backfill_prices, simulate_prices
 
 client = TestClient(app)
 
@@ -16,6 +28,28 @@ class TestFruitEndpoints(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIsInstance(response.json(), list)
 
+    def test_fruits_keyset_pagination(self):
+        db = session_local()
+        for _ in range(3):
+            db.add(Fruit(name=f"PageFruit-{uuid4().hex}", flavor_profile="Sweet", dimension_origin="Earth", rarity_level=7, base_value=1.0))
+        db.commit()
+        db.close()
+        seen, after = [], None
+        while True:
+            url = "/fruits?rarity=7&limit=2" + (f"&after={after}" if after else "")
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(f["id"] for f in response.json())
+            after = response.headers.get("X-Next-Cursor")
+            if after is None:
+                break
+        self.assertEqual(seen, sorted(set(seen)))
+        self.assertGreaterEqual(len(seen), 3)
+
+    def test_fruits_invalid_cursor(self):
+        response = client.get("/fruits?after=not-a-cursor")
+        self.assertEqual(response.status_code, 400)
+
     def test_fruits_filtering(self):
         # This will pass if at least one fruit with rarity=1 exists, otherwise should return an empty list
         response = client.get("/fruits?rarity=1")
@@ -40,6 +74,28 @@ class TestFruitEndpoints(unittest.TestCase):
             for price in data["prices"]:
                 self.assertEqual(price["fruit_id"], 1)
 
+    def test_fast_path_matches_schema_serialization(self):
+        db = session_local()
+        try:
+            fruits = db.query(Fruit).order_by(Fruit.id).limit(20).all()
+            prices = db.query(FruitPrice).order_by(FruitPrice.date.desc(), FruitPrice.id.desc()).limit(50).all()
+            expected_fruits = [FruitSchema.model_validate(f).model_dump(mode="json") for f in fruits]
+            expected_prices = FruitPriceListSchema.model_validate({"prices": prices}, from_attributes=True).model_dump(mode="json")
+        finally:
+            db.close()
+        self.assertEqual(client.get("/fruits?limit=20").json(), expected_fruits)
+        if prices:
+            self.assertEqual(client.get("/prices?limit=50").json()["prices"], expected_prices["prices"])
+
+    def test_stdlib_encoder_fallback(self):
+        original = serialization.orjson
+        serialization.orjson = None
+        try:
+            body = serialization.dumps({"date": date(2025, 7, 1), "price": 1.5, "name": "Kiwi"})
+        finally:
+            serialization.orjson = original
+        self.assertEqual(body, b'{"date":"2025-07-01","price":1.5,"name":"Kiwi"}')
+
     def test_get_prices_not_found(self):
         # Use a likely non-existent fruit_id
         response = client.get("/prices?fruit_id=99999")
@@ -59,5 +115,206 @@ class TestFruitEndpoints(unittest.TestCase):
         db.close()
         self.assertGreaterEqual(len(prices), 1)
 
+    def test_background_job_is_idempotent_per_day(self):
+        simulate_and_store_daily_prices()
+        db = session_local()
+        today = db.query(FruitPrice).filter(FruitPrice.date == date.today())
+        count = today.count()
+        simulate_and_store_daily_prices()
+        self.assertEqual(today.count(), count)
+        self.assertEqual(today.with_entities(FruitPrice.fruit_id).distinct().count(), count)
+        db.close()
+
+    def test_get_prices_date_range(self):
+        simulate_and_store_daily_prices()
+        today = date.today().isoformat()
+        response = client.get(f"/prices?start_date={today}&end_date={today}")
+        self.assertEqual(response.status_code, 200)
+        for price in response.json()["prices"]:
+            self.assertEqual(price["date"], today)
+
+    def test_get_prices_invalid_date(self):
+        response = client.get("/prices?start_date=not-a-date")
+        self.assertEqual(response.status_code, 422)
+
+class TestPriceAggregates(unittest.TestCase):
+    def setUp(self):
+        db = session_local()
+        fruit = Fruit(name=f"CandleFruit-{uuid4().hex}", flavor_profile="Tart", dimension_origin="Earth", rarity_level=1, base_value=10.0)
+        db.add(fruit)
+        db.commit()
+        self.fruit_id = fruit.id
+        # Two weeks of January 2024 (the 1st is a Monday), stored out of order
+        prices = {date(2024, 1, 3): 12.0, date(2024, 1, 1): 10.0, date(2024, 1, 2): 15.0, date(2024, 1, 7): 8.0, date(2024, 1, 8): 11.0}
+        for day, price in prices.items():
+            store_daily_prices(db, [{"fruit_id": self.fruit_id, "date": day, "price": price}])
+        db.commit()
+        db.close()
+
+    def test_weekly_candles(self):
+        response = client.get(f"/prices/aggregate?bucket=week&fruit_id={self.fruit_id}")
+        self.assertEqual(response.status_code, 200)
+        candles = response.json()["candles"]
+        self.assertEqual([c["period_start"] for c in candles], ["2024-01-08", "2024-01-01"])
+        first_week = candles[1]
+        self.assertEqual((first_week["open"], first_week["high"], first_week["low"], first_week["close"]), (10.0, 15.0, 8.0, 8.0))
+        self.assertAlmostEqual(first_week["avg"], 11.25)
+        self.assertEqual(first_week["price_count"], 4)
+
+    def test_monthly_candles(self):
+        response = client.get(f"/prices/aggregate?bucket=month&fruit_id={self.fruit_id}&start_date=2024-01-15")
+        self.assertEqual(response.status_code, 200)
+        candles = response.json()["candles"]
+        self.assertEqual(len(candles), 1)
+        self.assertEqual((candles[0]["open"], candles[0]["close"], candles[0]["price_count"]), (10.0, 11.0, 5))
+
+    def test_rerunning_a_day_does_not_double_count(self):
+        db = session_local()
+        store_daily_prices(db, [{"fruit_id": self.fruit_id, "date": date(2024, 1, 8), "price": 99.0}])
+        db.commit()
+        candle = db.query(FruitPriceRollup).filter_by(fruit_id=self.fruit_id, bucket="month").one()
+        db.close()
+        self.assertEqual((candle.price_count, candle.high), (5, 15.0))
+
+    def test_rebuild_matches_incremental(self):
+        db = session_local()
+        before = {(c.bucket, c.period_start): (c.open, c.high, c.low, c.close, c.price_count) for c in db.query(FruitPriceRollup).filter_by(fruit_id=self.fruit_id)}
+        rebuild_price_rollups(db)
+        after = {(c.bucket, c.period_start): (c.open, c.high, c.low, c.close, c.price_count) for c in db.query(FruitPriceRollup).filter_by(fruit_id=self.fruit_id)}
+        db.close()
+        self.assertEqual(before, after)
+
+    def test_export_ndjson(self):
+        response = client.get(f"/prices/export?fruit_id={self.fruit_id}&end_date=2024-01-07")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("application/x-ndjson"))
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual([(r["date"], r["price"]) for r in rows], [("2024-01-07", 8.0), ("2024-01-03", 12.0), ("2024-01-02", 15.0), ("2024-01-01", 10.0)])
+
+    def test_export_csv(self):
+        response = client.get(f"/prices/export?format=csv&fruit_id={self.fruit_id}&start_date=2024-01-08")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/csv"))
+        rows = list(csv.reader(io.StringIO(response.text)))
+        self.assertEqual(rows[0], ["id", "fruit_id", "date", "price"])
+        self.assertEqual(rows[1][1:], [str(self.fruit_id), "2024-01-08", "11.0"])
+        self.assertEqual(len(rows), 2)
+
+    def test_export_invalid_format(self):
+        response = client.get("/prices/export?format=xml")
+        self.assertEqual(response.status_code, 422)
+
+    def test_prices_keyset_pagination(self):
+        first = client.get(f"/prices?fruit_id={self.fruit_id}&limit=3").json()
+        self.assertEqual([p["date"] for p in first["prices"]], ["2024-01-08", "2024-01-07", "2024-01-03"])
+        second = client.get(f"/prices?fruit_id={self.fruit_id}&limit=3&after={first['next_cursor']}").json()
+        self.assertEqual([p["date"] for p in second["prices"]], ["2024-01-02", "2024-01-01"])
+        self.assertIsNone(second["next_cursor"])
+
+    def test_invalid_bucket(self):
+        response = client.get("/prices/aggregate?bucket=year")
+        self.assertEqual(response.status_code, 422)
+
+class TestPriceTrend(unittest.TestCase):
+    def setUp(self):
+        self.name = f"TrendFruit-{uuid4().hex}"
+        db = session_local()
+        fruit = Fruit(name=self.name, flavor_profile="Zesty", dimension_origin="Earth", rarity_level=1, base_value=4.0)
+        db.add(fruit)
+        db.commit()
+        self.fruit_id = fruit.id
+        today = date.today()
+        store_daily_prices(db, [{"fruit_id": fruit.id, "date": today - timedelta(days=d), "price": 4.0 + d} for d in (1, 2, 10)])
+        db.commit()
+        db.close()
+
+    def test_trend_uses_stored_prices(self):
+        response = client.get(f"/fruits/{self.name}/trend?days=7")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        today = date.today()
+        expected = [{"date": (today - timedelta(days=d)).isoformat(), "price": 4.0 + d} for d in (2, 1)]
+        self.assertEqual(data["trend"], expected)
+        self.assertEqual(data["base_value"], 4.0)
+
+    def test_trend_is_cached_until_invalidated(self):
+        first = client.get(f"/fruits/{self.name}/trend").json()["trend"]
+        db = session_local()
+        store_daily_prices(db, [{"fruit_id": self.fruit_id, "date": date.today(), "price": 9.0}])
+        db.commit()
+        db.close()
+        self.assertEqual(client.get(f"/fruits/{self.name}/trend").json()["trend"], first)
+        invalidate_price_trends()
+        refreshed = client.get(f"/fruits/{self.name}/trend").json()["trend"]
+        self.assertEqual(refreshed[-1], {"date": date.today().isoformat(), "price": 9.0})
+
+    def test_trend_unknown_fruit(self):
+        response = client.get(f"/fruits/missing-{uuid4().hex}/trend")
+        self.assertEqual(response.status_code, 404)
+
+class TestPriceSimulation(unittest.TestCase):
+    def test_simulated_prices_are_reproducible_and_bounded(self):
+        base = np.array([10.0, 100.0, 2.5])
+        first = simulate_prices(base, np.random.default_rng(7), days=30)
+        second = simulate_prices(base, np.random.default_rng(7), days=30)
+        self.assertEqual(first.shape, (30, 3))
+        np.testing.assert_array_equal(first, second)
+        self.assertTrue(np.all(first >= np.round(base * 0.8, 2)))
+        self.assertTrue(np.all(first <= np.round(base * 1.2, 2)))
+
+class TestBackfill(unittest.TestCase):
+    # A window no other test prices, cleared after each test
+    END = date(2029, 6, 14)
+    START = END - timedelta(days=13)
+
+    def setUp(self):
+        self.db = session_local()
+        self.fruit_ids = []
+
+    def tearDown(self):
+        self.db.execute(delete(FruitPrice).where(FruitPrice.date.between(self.START, self.END)))
+        self.db.execute(delete(FruitPriceRollup).where(FruitPriceRollup.period_start.between(self.START - timedelta(days=6), self.END)))
+        self.db.execute(delete(Fruit).where(Fruit.id.in_(self.fruit_ids)))
+        self.db.commit()
+        self.db.close()
+
+    def _add_fruit(self) -> int:
+        fruit = Fruit(name=f"BackfillFruit-{uuid4().hex}", flavor_profile="Sweet", dimension_origin="Earth", rarity_level=1, base_value=10.0)
+        self.db.add(fruit)
+        self.db.commit()
+        self.fruit_ids.append(fruit.id)
+        return fruit.id
+
+    def _june(self, fruit_id: int) -> FruitPriceRollup:
+        return self.db.query(FruitPriceRollup).filter_by(bucket="month", fruit_id=fruit_id, period_start=date(2029, 6, 1)).one()
+
+    def test_backfill_writes_history_and_rollups(self):
+        fruit_id = self._add_fruit()
+        backfill_prices(self.db, 14, end=self.END, rng=np.random.default_rng(1))
+        # A second run finds every fruit/day already priced
+        self.assertEqual(backfill_prices(self.db, 14, end=self.END, rng=np.random.default_rng(1)), 0)
+        prices = self.db.query(FruitPrice).filter(FruitPrice.fruit_id == fruit_id, FruitPrice.date.between(self.START, self.END)).all()
+        self.assertEqual(len(prices), 14)
+        candle = self._june(fruit_id)
+        self.assertEqual(candle.price_count, 14)
+        self.assertEqual((candle.open_date, candle.close_date), (self.START, self.END))
+        self.assertAlmostEqual(candle.price_sum, sum(p.price for p in prices))
+        self.assertEqual(candle.high, max(p.price for p in prices))
+        self.assertEqual(candle.low, min(p.price for p in prices))
+
+    def test_backfill_fills_fruits_added_since(self):
+        self._add_fruit()
+        backfill_prices(self.db, 14, end=self.END, rng=np.random.default_rng(1))
+        late = self._add_fruit()
+        store_daily_prices(self.db, [{"fruit_id": late, "date": self.START + timedelta(days=3), "price": 99.0}])
+        self.db.commit()
+        self.assertEqual(backfill_prices(self.db, 14, end=self.END, rng=np.random.default_rng(1)), 13)
+        self.assertEqual(self.db.query(FruitPrice).filter(FruitPrice.fruit_id == late, FruitPrice.date.between(self.START, self.END)).count(), 14)
+        candle = self._june(late)
+        self.assertEqual(candle.price_count, 14)
+        self.assertEqual((candle.open_date, candle.close_date), (self.START, self.END))
+        self.assertEqual(candle.high, 99.0)
+        self.assertEqual(backfill_prices(self.db, 14, end=self.END, rng=np.random.default_rng(1)), 0)
+
 if __name__ == "__main__":
     unittest.main(verbosity=2)
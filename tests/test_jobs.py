@@ -0,0 +1,161 @@
+import threading
+import unittest
+from datetime import date, datetime, timedelta
+from sqlalchemy import delete, select, update
+from src.app.database import session_local
+from src.app.jobs import acquire_lease, pending_days, rebuild_vendor_leaderboard, release_lease, simulate_and_store_daily_prices
+from src.app.models.fruit import Fruit, FruitPrice, FruitPriceRollup
+from src.app.models.job import JobLease
+
+# Far enough ahead that no other test stores prices for these days
+TODAY = date(2031, 3, 10)
+
+class TestLeases(unittest.TestCase):
+    def setUp(self):
+        self.db = session_local()
+        self.name = f"test-job-{id(self)}"
+
+    def tearDown(self):
+        self.db.execute(delete(JobLease).where(JobLease.name == self.name))
+        self.db.commit()
+        self.db.close()
+
+    def test_one_owner_at_a_time(self):
+        self.assertTrue(acquire_lease(self.db, self.name, "a"))
+        self.assertFalse(acquire_lease(self.db, self.name, "b"))
+        self.assertTrue(acquire_lease(self.db, self.name, "a"))  # renewal
+        release_lease(self.db, self.name, "a")
+        self.assertTrue(acquire_lease(self.db, self.name, "b"))
+
+    def test_expired_lease_is_taken_over(self):
+        self.assertTrue(acquire_lease(self.db, self.name, "crashed"))
+        self.db.execute(update(JobLease).where(JobLease.name == self.name).values(lease_expires_at=datetime(2000, 1, 1)))
+        self.db.commit()
+        self.assertTrue(acquire_lease(self.db, self.name, "b"))
+
+    def test_concurrent_acquirers_get_one_lease(self):
+        acquire_lease(self.db, self.name, "warmup")
+        release_lease(self.db, self.name, "warmup")
+        results = []
+        barrier = threading.Barrier(4)
+
+        def contend(owner):
+            db = session_local()
+            try:
+                barrier.wait()
+                results.append(acquire_lease(db, self.name, owner))
+            finally:
+                db.close()
+
+        threads = [threading.Thread(target=contend, args=(f"worker-{i}",)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(results), [False, False, False, True])
+
+class TestPendingDays(unittest.TestCase):
+    def test_first_run_is_today_only(self):
+        self.assertEqual(pending_days(None, TODAY), [TODAY])
+
+    def test_catches_up_after_downtime(self):
+        self.assertEqual(pending_days(TODAY - timedelta(days=3), TODAY), [TODAY - timedelta(days=2), TODAY - timedelta(days=1), TODAY])
+        self.assertEqual(pending_days(TODAY, TODAY), [])
+
+    def test_catch_up_is_capped(self):
+        days = pending_days(TODAY - timedelta(days=400), TODAY, limit=30)
+        self.assertEqual(len(days), 30)
+        self.assertEqual(days[-1], TODAY)
+
+class TestDailyPriceJob(unittest.TestCase):
+    def setUp(self):
+        self.db = session_local()
+        if not self.db.scalar(select(Fruit.id).limit(1)):
+            self.db.add(Fruit(name="JobFruit", flavor_profile="Sweet", dimension_origin="Earth", rarity_level=1, base_value=5.0))
+            self.db.commit()
+        self.saved = self.db.execute(
+            select(JobLease.last_success_on, JobLease.last_success_at).where(JobLease.name == "simulate_daily_prices")
+        ).first()
+
+    def tearDown(self):
+        self.db.execute(delete(FruitPrice).where(FruitPrice.date >= TODAY - timedelta(days=40)))
+        self.db.execute(delete(FruitPriceRollup).where(FruitPriceRollup.period_start >= TODAY - timedelta(days=40)))
+        if self.saved is None:
+            self.db.execute(delete(JobLease).where(JobLease.name == "simulate_daily_prices"))
+        else:
+            self.db.execute(
+                update(JobLease).where(JobLease.name == "simulate_daily_prices")
+                .values(last_success_on=self.saved.last_success_on, last_success_at=self.saved.last_success_at, owner=None, lease_expires_at=None)
+            )
+        self.db.commit()
+        self.db.close()
+
+    def _set_last_success(self, day):
+        acquire_lease(self.db, "simulate_daily_prices", "setup")
+        self.db.execute(update(JobLease).where(JobLease.name == "simulate_daily_prices").values(last_success_on=day))
+        self.db.commit()
+        release_lease(self.db, "simulate_daily_prices", "setup")
+
+    def _days_with_prices(self):
+        return set(self.db.scalars(select(FruitPrice.date).where(FruitPrice.date >= TODAY - timedelta(days=40)).distinct()))
+
+    def test_catches_up_missed_days_once(self):
+        self._set_last_success(TODAY - timedelta(days=3))
+        self.assertTrue(simulate_and_store_daily_prices(TODAY))
+        self.assertEqual(self._days_with_prices(), {TODAY - timedelta(days=2), TODAY - timedelta(days=1), TODAY})
+        count = self.db.query(FruitPrice).filter(FruitPrice.date == TODAY).count()
+        self.assertTrue(simulate_and_store_daily_prices(TODAY))
+        self.assertEqual(self.db.query(FruitPrice).filter(FruitPrice.date == TODAY).count(), count)
+        lease = self.db.get(JobLease, "simulate_daily_prices")
+        self.db.refresh(lease)
+        self.assertEqual(lease.last_success_on, TODAY)
+        self.assertIsNone(lease.owner)
+
+    def test_skipped_while_another_process_holds_the_lease(self):
+        self._set_last_success(TODAY - timedelta(days=1))
+        self.assertTrue(acquire_lease(self.db, "simulate_daily_prices", "other-node"))
+        self.assertFalse(simulate_and_store_daily_prices(TODAY))
+        self.assertEqual(self._days_with_prices(), set())
+
+    def test_failed_day_is_retried(self):
+        self._set_last_success(TODAY - timedelta(days=2))
+        from src.app.utils import simulate
+
+        original = simulate.store_simulated_prices
+        calls = []
+
+        def flaky(db, day=None, rng=None):
+            calls.append(day)
+            if day == TODAY:
+                raise RuntimeError("boom")
+            return original(db, day, rng)
+
+        simulate.store_simulated_prices = flaky
+        try:
+            with self.assertRaises(RuntimeError):
+                simulate_and_store_daily_prices(TODAY)
+        finally:
+            simulate.store_simulated_prices = original
+        lease = self.db.get(JobLease, "simulate_daily_prices")
+        self.db.refresh(lease)
+        self.assertEqual(lease.last_success_on, TODAY - timedelta(days=1))
+        self.assertIsNone(lease.owner)
+        simulate_and_store_daily_prices(TODAY)
+        self.assertIn(TODAY, self._days_with_prices())
+
+class TestLeaderboardJob(unittest.TestCase):
+    def test_runs_once_per_interval(self):
+        db = session_local()
+        try:
+            db.execute(update(JobLease).where(JobLease.name == "rebuild_vendor_leaderboard").values(last_success_at=None))
+            db.commit()
+            self.assertTrue(rebuild_vendor_leaderboard())
+            first = db.scalar(select(JobLease.last_success_at).where(JobLease.name == "rebuild_vendor_leaderboard"))
+            self.assertIsNotNone(first)
+            rebuild_vendor_leaderboard(owner="another-worker")
+            self.assertEqual(db.scalar(select(JobLease.last_success_at).where(JobLease.name == "rebuild_vendor_leaderboard")), first)
+        finally:
+            db.close()
+
+if __name__ == "__main__":
+    unittest.main()
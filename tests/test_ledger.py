@@ -0,0 +1,203 @@
+import json
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+from uuid import uuid4
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from src.app.crud.trade import get_trade_history
+from src.app.main import app
+from src.app.database import session_local
+from src.app.models.fruit import Fruit
+from src.app.models.trade import Trade
+from src.app.utils.ledger import TradeLedger, _dump, ledger
+from tests.utils import count_queries
+
+client = TestClient(app)
+
+def _login(username, password="Ledgerpass1!"):
+    client.post("/auth/register", json={"username": username, "password": password})
+    token = client.post("/auth/token", data={"username": username, "password": password}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    return headers, client.get("/vendors/me", headers=headers).json()["id"]
+
+class TestTradeHistory(unittest.TestCase):
+    def setUp(self):
+        suffix = uuid4().hex[:8]
+        self.headers, self.vendor_id = _login(f"ledger{suffix}")
+        self.other_headers, self.other_vendor_id = _login(f"ledgerpeer{suffix}")
+        db = session_local()
+        fruit = Fruit(name=f"LedgerFruit-{suffix}", flavor_profile="Sweet", dimension_origin="Earth", rarity_level=2, base_value=4.0)
+        db.add(fruit)
+        db.commit()
+        self.fruit_id = fruit.id
+        db.close()
+        client.post("/vendors/me/add-fruit", json={"fruit_id": self.fruit_id, "quantity": 20}, headers=self.headers)
+
+    def _send(self, headers, from_id, to_id, quantity, trade_type="send"):
+        trade = {"from_vendor_id": from_id, "to_vendor_id": to_id, "fruit_id": self.fruit_id, "quantity": quantity, "trade_type": trade_type}
+        self.assertEqual(client.post("/trade", json=trade, headers=headers).status_code, 200)
+
+    def test_trades_are_recorded_and_paged_newest_first(self):
+        self._send(self.headers, self.vendor_id, self.other_vendor_id, 1)
+        self._send(self.headers, self.vendor_id, self.other_vendor_id, 2, "sell")
+        batch = {"trades": [
+            {"from_vendor_id": self.vendor_id, "to_vendor_id": self.other_vendor_id, "fruit_id": self.fruit_id, "quantity": 3, "trade_type": "send"},
+            {"from_vendor_id": self.vendor_id, "to_vendor_id": self.other_vendor_id, "fruit_id": self.fruit_id, "quantity": 99, "trade_type": "send"},
+        ], "atomic": False}
+        client.post("/trades/batch", json=batch, headers=self.headers)
+        self._send(self.other_headers, self.other_vendor_id, self.vendor_id, 4)
+        ledger.flush()
+
+        first = client.get("/trades?limit=3", headers=self.headers)
+        self.assertEqual(first.status_code, 200)
+        page = first.json()
+        self.assertEqual([t["quantity"] for t in page["trades"]], [4, 3, 2])
+        self.assertEqual(page["trades"][0]["from_vendor_id"], self.other_vendor_id)
+        sell = page["trades"][2]
+        self.assertEqual(sell["trade_type"], "sell")
+        self.assertAlmostEqual(sell["base_value"], 4.0 * 3.14)
+        self.assertAlmostEqual(sell["total_cost"], sell["base_value"] * 2 + sell["tax"])
+        second = client.get(f"/trades?limit=3&after={page['next_cursor']}", headers=self.headers).json()
+        self.assertEqual([t["quantity"] for t in second["trades"]], [1])
+        self.assertIsNone(second["next_cursor"])
+        # The counterparty sees the same trades
+        peer = client.get("/trades?limit=10", headers=self.other_headers).json()
+        self.assertEqual([t["quantity"] for t in peer["trades"]], [4, 3, 2, 1])
+
+    def test_history_is_one_query(self):
+        self._send(self.headers, self.vendor_id, self.other_vendor_id, 1)
+        ledger.flush()
+        db = session_local()
+        try:
+            with count_queries() as counter:
+                rows = get_trade_history(db, self.vendor_id, limit=10)
+            self.assertEqual(counter.count, 1)
+            self.assertEqual(len(rows), 1)
+        finally:
+            db.close()
+
+    def test_replayed_entries_are_ordered_by_trade_time(self):
+        from src.app.crud.trade import _ledger_entry
+
+        details = {"trade_type": "send", "base_value": 1.0, "tax": 0.1, "total_cost": 1.1, "alien_currency": False}
+        older = _ledger_entry(self.vendor_id, self.other_vendor_id, self.fruit_id, {**details, "quantity": 1}, datetime(2030, 1, 1, 12, 0))
+        newer = _ledger_entry(self.vendor_id, self.other_vendor_id, self.fruit_id, {**details, "quantity": 2}, datetime(2030, 1, 1, 12, 5))
+        # The older trade reaches the table last, as it would when replayed from the spool
+        ledger._write([newer])
+        ledger._write([older])
+        page = client.get("/trades?limit=1", headers=self.headers).json()
+        self.assertEqual([t["quantity"] for t in page["trades"]], [2])
+        rest = client.get(f"/trades?limit=1&after={page['next_cursor']}", headers=self.headers).json()
+        self.assertEqual([t["quantity"] for t in rest["trades"]], [1])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(client.get("/trades?after=not-a-cursor", headers=self.headers).status_code, 400)
+
+    def test_requires_auth(self):
+        self.assertEqual(client.get("/trades").status_code, 401)
+
+class TestWriteBehindBuffer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.ledger = TradeLedger(spool_dir=Path(self.tmp.name), batch_size=3, flush_seconds=60)
+        db = session_local()
+        self.fruit_id = db.scalar(select(Fruit.id).limit(1))
+        self.vendor_id = client.get("/vendors?limit=1").json()[0]["id"]
+        db.close()
+
+    def tearDown(self):
+        self.ledger.stop()
+        self.tmp.cleanup()
+
+    def _entries(self, n):
+        from src.app.crud.trade import _ledger_entry, _utcnow
+
+        details = {"trade_type": "send", "quantity": 1, "base_value": 1.0, "tax": 0.1, "total_cost": 1.1, "alien_currency": True}
+        return [_ledger_entry(self.vendor_id, self.vendor_id, self.fruit_id, details, _utcnow()) for _ in range(n)]
+
+    def _stored(self, entries):
+        db = session_local()
+        try:
+            return db.scalar(select(func.count()).where(Trade.entry_id.in_([e["entry_id"] for e in entries])))
+        finally:
+            db.close()
+
+    def test_buffers_until_batch_size(self):
+        entries = self._entries(3)
+        self.ledger.record(entries[:2])
+        self.assertEqual(self.ledger.pending(), 2)
+        self.assertEqual(self._stored(entries), 0)
+        self.ledger.record(entries[2:])  # fills the batch; no flush thread, so written inline
+        self.assertEqual(self.ledger.pending(), 0)
+        self.assertEqual(self._stored(entries), 3)
+
+    def test_failed_write_is_spooled_and_replayed_once(self):
+        entries = self._entries(2)
+        self.ledger.record(entries)
+        original = self.ledger._write
+
+        def down(batch):
+            raise OSError("database unavailable")
+
+        self.ledger._write = down
+        self.assertEqual(self.ledger.flush(), 0)
+        self.ledger._write = original
+        spooled = self.ledger.spool_path.read_text()
+        self.assertEqual(len(spooled.splitlines()), 2)
+        self.assertEqual(self._stored(entries), 0)
+
+        self.assertEqual(self.ledger.flush(), 2)
+        self.assertFalse(self.ledger.spool_path.exists())
+        self.assertEqual(self._stored(entries), 2)
+        # A batch that did commit but was spooled anyway is not inserted twice
+        self.ledger.spool_path.write_text(spooled)
+        self.ledger.flush()
+        self.assertEqual(self._stored(entries), 2)
+
+    def test_rejected_entries_are_dead_lettered(self):
+        ledger = TradeLedger(spool_dir=Path(self.tmp.name), batch_size=3, flush_seconds=60, max_replays=2)
+        good = self._entries(2)
+        bad = {**self._entries(1)[0], "trade_type": None}  # violates NOT NULL on every attempt
+        ledger._spool([good[0], bad, good[1]])
+        later = self._entries(1)
+        ledger.spool_path.rename(Path(self.tmp.name) / "ledger-a.jsonl")
+        (Path(self.tmp.name) / "ledger-b.jsonl").write_text("".join(_dump(e) for e in later))
+        for _ in range(2):
+            self.assertEqual(ledger.flush(), 0)
+        self.assertEqual(self._stored(later), 0)  # held back by the bad file until it gives up
+        self.assertEqual(ledger.flush(), 3)
+        self.assertEqual(self._stored(good + later), 3)
+        self.assertEqual(list(Path(self.tmp.name).glob("ledger-*.jsonl")), [])
+        dead = (Path(self.tmp.name) / "dead-letter" / "ledger-a.jsonl").read_text().splitlines()
+        self.assertEqual([json.loads(line)["entry_id"] for line in dead], [bad["entry_id"]])
+
+    def test_redirect_writes_to_another_database(self):
+        engine = create_engine(f"sqlite:///{self.tmp.name}/other.db")
+        Trade.__table__.create(engine)
+        other = sessionmaker(engine)
+        spool = Path(self.tmp.name) / "other-spool"
+        entries = self._entries(2)
+        try:
+            with self.ledger.redirect(other, spool):
+                self.ledger.record(entries)
+            self.assertEqual(self.ledger.pending(), 0)
+            with other() as db:
+                self.assertEqual(db.scalar(select(func.count()).select_from(Trade)), 2)
+            self.assertEqual(self._stored(entries), 0)
+            self.assertIs(self.ledger.session_factory, session_local)
+            self.assertEqual(self.ledger.spool_dir, Path(self.tmp.name))
+        finally:
+            engine.dispose()
+
+    def test_stop_flushes_the_buffer(self):
+        self.ledger.start()
+        entries = self._entries(1)
+        self.ledger.record(entries)
+        self.ledger.stop()
+        self.assertEqual(self._stored(entries), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from fastapi.testclient import TestClient
+from src.app.main import create_app
+
+ROOT = Path(__file__).resolve().parents[1]
+
+IMPORT_PROBE = """
+import json, sys, threading
+import src.app.main
+print(json.dumps({
+    "modules": [m for m in ("apscheduler", "numpy", "src.app.routers.fruit", "src.app.routers.aio") if m in sys.modules],
+    "threads": threading.active_count(),
+}))
+"""
+
+class TestAppFactory(unittest.TestCase):
+    def test_import_has_no_side_effects(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = Path(tmp) / "untouched.db"
+            env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}"}
+            out = subprocess.run([sys.executable, "-W", "ignore", "-c", IMPORT_PROBE], cwd=ROOT, env=env, check=True, capture_output=True, text=True).stdout
+            self.assertFalse(db_path.exists())
+        probe = json.loads(out.strip().splitlines()[-1])
+        self.assertEqual(probe["modules"], [])
+        self.assertEqual(probe["threads"], 1)
+
+    def test_lifespan_starts_and_stops_the_scheduler(self):
+        app = create_app(scheduler=True)
+        with TestClient(app) as client:
+            self.assertEqual(client.get("/").status_code, 200)
+            scheduler = app.state.scheduler
+            self.assertTrue(scheduler.running)
+            self.assertEqual(len(scheduler.get_jobs()), 2)
+        self.assertFalse(scheduler.running)
+
+    def test_scheduler_can_be_disabled(self):
+        app = create_app(scheduler=False)
+        with TestClient(app) as client:
+            self.assertEqual(client.get("/").status_code, 200)
+            self.assertIsNone(app.state.scheduler)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+from uuid import uuid4
+import numpy as np
+from sqlalchemy import func, select
+from src.app.database import session_local
+from src.app.models.fruit import Fruit, VendorInventory
+from src.app.models.vendor import Vendor, VendorScore
+from src.app.utils.market import MarketSpec, fruit_rows, generate_market, inventory_rows
+from src.app.utils.seed import seed
+from tests.utils import count_queries
+
+class TestSeed(unittest.TestCase):
+    def setUp(self):
+        self.db = session_local()
+        suffix = uuid4().hex
+        self.fruits = [
+            {"name": f"SeedFruit-{suffix}-{i}", "flavor_profile": ["sweet", "tangy"], "dimension_origin": "Zeta-9", "rarity_level": 2, "base_value": 3.5}
+            for i in range(20)
+        ]
+        self.vendors = [
+            {
+                "name": f"SeedVendor-{suffix}-{i}", "species": "Kleeb", "home_dimension": "Zeta-9",
+                "inventory": [{"fruit": f["name"], "quantity": 5} for f in self.fruits] + [{"fruit": "No such fruit", "quantity": 1}],
+            }
+            for i in range(10)
+        ]
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_query_count_does_not_grow_with_inventory(self):
+        with count_queries() as counter:
+            seed(self.db, self.fruits, self.vendors)
+        # Two inserts and two id lookups, the inventory insert, then the score rebuild
+        self.assertLessEqual(counter.count, 10, counter.statements)
+        names = [v["name"] for v in self.vendors]
+        rows = self.db.execute(
+            select(func.count(), func.sum(VendorInventory.quantity))
+            .join(Vendor, Vendor.id == VendorInventory.vendor_id)
+            .where(Vendor.name.in_(names))
+        ).one()
+        self.assertEqual(tuple(rows), (200, 1000))
+
+    def test_rerun_is_a_no_op(self):
+        seed(self.db, self.fruits, self.vendors)
+        seed(self.db, self.fruits, self.vendors)
+        self.assertEqual(self.db.scalar(select(func.count()).where(Fruit.name.in_([f["name"] for f in self.fruits]))), 20)
+        total = self.db.scalar(
+            select(func.sum(VendorInventory.quantity))
+            .join(Vendor, Vendor.id == VendorInventory.vendor_id)
+            .where(Vendor.name == self.vendors[0]["name"])
+        )
+        self.assertEqual(total, 100)
+
+class TestMarketGenerator(unittest.TestCase):
+    def test_same_seed_same_market(self):
+        first, rarity = fruit_rows(np.random.default_rng(7), 100, 1)
+        second, _ = fruit_rows(np.random.default_rng(7), 100, 1)
+        self.assertEqual(first, second)
+        vendors, fruits = np.arange(1, 51), np.arange(1, 101)
+        a = np.concatenate(list(inventory_rows(np.random.default_rng(7), vendors, fruits, rarity, 1000)))
+        b = np.concatenate(list(inventory_rows(np.random.default_rng(7), vendors, fruits, rarity, 1000)))
+        np.testing.assert_array_equal(a, b)
+        pairs = {(v, f) for v, f, _ in a.tolist()}
+        self.assertEqual(len(pairs), len(a))
+        self.assertGreater(len(a), 900)
+
+    def test_generate_market(self):
+        db = session_local()
+        try:
+            prefix = f"Mk{uuid4().hex[:8]}-"
+            stats = generate_market(db, MarketSpec(fruits=40, vendors=25, inventory=300, prefix=prefix), np.random.default_rng(3))
+            self.assertEqual(stats["fruits"], 40)
+            self.assertEqual(stats["vendors"], 25)
+            vendor_ids = select(Vendor.id).where(Vendor.name.startswith(prefix))
+            inventory = db.scalar(select(func.count()).where(VendorInventory.vendor_id.in_(vendor_ids)))
+            self.assertEqual(inventory, stats["inventory"])
+            scores = dict(db.execute(select(VendorScore.vendor_id, VendorScore.score).where(VendorScore.vendor_id.in_(vendor_ids))).all())
+            expected = dict(db.execute(
+                select(VendorInventory.vendor_id, func.sum(VendorInventory.quantity * Fruit.rarity_level))
+                .join(Fruit, Fruit.id == VendorInventory.fruit_id)
+                .where(VendorInventory.vendor_id.in_(vendor_ids))
+                .group_by(VendorInventory.vendor_id)
+            ).all())
+            self.assertEqual(scores, expected)
+        finally:
+            db.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from src.app.main import app
+from src.app.database import session_local
+from src.app.metrics import Counter, Gauge, Histogram, Registry, job_failures_total, time_job
+
+client = TestClient(app)
+
+def sample(text, line_prefix):
+    for line in text.splitlines():
+        if line.startswith(line_prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+class TestMetricsEndpoint(unittest.TestCase):
+    def test_route_and_query_metrics(self):
+        before = sample(client.get("/metrics").text, 'http_requests_total{method="GET",route="/fruits/{fruit_name}/trend",status="404"}') or 0
+        client.get("/fruits/NoSuchFruit/trend")
+        client.get("/vendors")
+        response = client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain; version=0.0.4"))
+        text = response.text
+        self.assertEqual(sample(text, 'http_requests_total{method="GET",route="/fruits/{fruit_name}/trend",status="404"}'), before + 1)
+        self.assertIn('http_request_duration_seconds_bucket{method="GET",route="/vendors",le="+Inf"}', text)
+        self.assertGreaterEqual(sample(text, 'db_queries_per_request_sum{method="GET",route="/vendors"}'), 1)
+        # The scrape itself is in flight
+        self.assertEqual(sample(text, "http_requests_in_flight"), 1)
+        self.assertIsNotNone(sample(text, 'db_pool_checked_out{engine="sync"}'))
+        self.assertIn('db_pool_checkout_wait_seconds_count{engine="sync"}', text)
+
+class TestMetricTypes(unittest.TestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram("t_seconds", "Test.", ("route",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 5):
+            histogram.observe(value, route="/x")
+        lines = histogram.render()
+        self.assertEqual(lines[:2], ["# HELP t_seconds Test.", "# TYPE t_seconds histogram"])
+        self.assertEqual(lines[2:], [
+            't_seconds_bucket{route="/x",le="0.1"} 1.0',
+            't_seconds_bucket{route="/x",le="1.0"} 3.0',
+            't_seconds_bucket{route="/x",le="+Inf"} 4.0',
+            't_seconds_sum{route="/x"} 6.25',
+            't_seconds_count{route="/x"} 4.0',
+        ])
+
+    def test_label_values_are_escaped(self):
+        counter = Counter("t_total", "Test.", ("path",))
+        counter.inc(path='a"b\\c')
+        self.assertEqual(counter.render()[-1], 't_total{path="a\\"b\\\\c"} 1.0')
+
+    def test_failed_statement_does_not_skew_the_next_timing(self):
+        db = session_local()
+        try:
+            with self.assertRaises(DBAPIError):
+                db.execute(text("SELECT * FROM no_such_table"))
+            db.rollback()
+            self.assertNotIn("query_start", db.connection().info)
+        finally:
+            db.close()
+
+    def test_time_job_counts_failures(self):
+        before = job_failures_total._values.get(("test_job",), 0)
+        with self.assertRaises(RuntimeError):
+            with time_job("test_job"):
+                raise RuntimeError("boom")
+        self.assertEqual(job_failures_total._values[("test_job",)], before + 1)
+
+class TestMultiprocess(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.registry = Registry(self.tmp.name)
+        self.requests = self.registry.register(Counter("t_requests_total", "Test.", ("route",)))
+        self.latency = self.registry.register(Histogram("t_seconds", "Test.", buckets=(1.0,)))
+        self.in_flight = self.registry.register(Gauge("t_in_flight", "Test."))
+        self.last_run = self.registry.register(Gauge("t_last_run", "Test.", multiprocess="max"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _other_worker(self, pid, requests, in_flight, last_run):
+        snapshot = {
+            "t_requests_total": [[["/x"], requests]],
+            "t_seconds": [[[], [requests, 0, 2.0 * requests, requests]]],
+            "t_in_flight": [[[], in_flight]],
+            "t_last_run": [[[], last_run]],
+        }
+        (Path(self.tmp.name) / f"metrics-{pid}.json").write_text(json.dumps(snapshot))
+
+    def test_scrape_aggregates_every_worker(self):
+        self.requests.inc(route="/x")
+        self.latency.observe(0.5)
+        self.in_flight.inc()
+        self.last_run.set(100)
+        dead = subprocess.Popen([sys.executable, "-c", "pass"])
+        dead.wait()
+        self._other_worker(os.getppid(), requests=2, in_flight=3, last_run=50)
+        self._other_worker(dead.pid, requests=4, in_flight=7, last_run=200)
+        text = self.registry.render()
+        # Counters and histograms keep exited workers' counts; gauges only count live workers
+        self.assertEqual(sample(text, 't_requests_total{route="/x"}'), 7)
+        self.assertEqual(sample(text, "t_seconds_count"), 7)
+        self.assertEqual(sample(text, "t_seconds_sum"), 12.5)
+        self.assertEqual(sample(text, 't_seconds_bucket{le="1.0"}'), 7)
+        self.assertEqual(sample(text, "t_in_flight"), 4)
+        self.assertEqual(sample(text, "t_last_run"), 200)
+
+    def test_snapshot_round_trip(self):
+        self.requests.inc(3, route="/y")
+        self.latency.observe(2.0)
+        self.registry.write_snapshot()
+        data = json.loads(self.registry.snapshot_path.read_text())
+        self.assertEqual(data["t_requests_total"], [[["/y"], 3.0]])
+        self.assertEqual(data["t_seconds"], [[[], [0, 1, 2.0, 1]]])
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
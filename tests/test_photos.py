@@ -0,0 +1,80 @@
+import hashlib
+import io
+import tempfile
+import unittest
+from pathlib import Path
+from uuid import uuid4
+from fastapi.testclient import TestClient
+from src.app.main import app
+from src.app.database import session_local
+from src.app.models.fruit import Fruit
+from src.app.utils import photos
+
+client = TestClient(app)
+
+def create_fruit(photo: bytes, filename: str = "photo.png"):
+    data = {"name": f"PhotoFruit-{uuid4().hex}", "flavor_profile": "Sweet", "dimension_origin": "Earth", "rarity_level": 1, "base_value": 1.0}
+    return client.post("/fruits", data=data, files={"photo": (filename, photo, "image/png")})
+
+def photo_url(fruit_id: int) -> str:
+    db = session_local()
+    try:
+        return db.get(Fruit, fruit_id).photo_url
+    finally:
+        db.close()
+
+class TestPhotoStorage(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.original_dir, self.original_limit = photos.PHOTO_DIR, photos.PHOTO_MAX_BYTES
+        photos.PHOTO_DIR = Path(self.tmp.name)
+
+    def tearDown(self):
+        photos.PHOTO_DIR, photos.PHOTO_MAX_BYTES = self.original_dir, self.original_limit
+        self.tmp.cleanup()
+
+    def test_identical_uploads_are_stored_once(self):
+        body = uuid4().bytes * 50_000  # several chunks
+        digest = hashlib.sha256(body).hexdigest()
+        first = create_fruit(body, "a.PNG")
+        second = create_fruit(body, "b.png")
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(photo_url(first.json()["id"]), f"/static/fruits/{digest}.png")
+        self.assertEqual(photo_url(second.json()["id"]), f"/static/fruits/{digest}.png")
+        self.assertEqual([p.name for p in Path(self.tmp.name).iterdir()], [f"{digest}.png"])
+        self.assertEqual((Path(self.tmp.name) / f"{digest}.png").read_bytes(), body)
+
+    def test_oversized_upload_is_rejected(self):
+        photos.PHOTO_MAX_BYTES = 1000
+        response = create_fruit(b"x" * 1001)
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(list(Path(self.tmp.name).iterdir()), [])
+        self.assertEqual(create_fruit(b"x" * 1000).status_code, 200)
+
+    def test_unsafe_extension_is_dropped(self):
+        response = create_fruit(b"\x89PNG" + uuid4().bytes, "evil.ph p")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(".", photo_url(response.json()["id"]).rsplit("/", 1)[1])
+
+    def test_svg_gets_a_gzip_variant_in_the_background(self):
+        svg = b'<svg xmlns="http://www.w3.org/2000/svg">' + uuid4().hex.encode() + b"<g/>" * 500 + b"</svg>"
+        response = create_fruit(svg, "logo.svg")
+        self.assertEqual(response.status_code, 200)
+        photos.derivative_executor.submit(lambda: None).result()  # the single worker runs jobs in order
+        name = photo_url(response.json()["id"]).rsplit("/", 1)[1]
+        self.assertTrue((Path(self.tmp.name) / (name + ".gz")).exists())
+
+    @unittest.skipIf(photos.Image is None, "Pillow is not installed")
+    def test_derivatives(self):
+        buf = io.BytesIO()
+        photos.Image.new("RGB", (1024, 512), "red").save(buf, format="PNG")
+        path = Path(self.tmp.name) / "source.png"
+        path.write_bytes(buf.getvalue())
+        written = photos.make_derivatives(path, sizes=(128, 2048))
+        self.assertEqual(written, [photos.derivative_path(path, 128)])
+        with photos.Image.open(written[0]) as image:
+            self.assertEqual(image.size, (128, 64))
+
+if __name__ == "__main__":
+    unittest.main()
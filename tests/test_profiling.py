@@ -0,0 +1,89 @@
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from src.app.database import session_local
+from src.app.main import app
+from src.app.profiling import _write_profile, find_n_plus_one
+
+client = TestClient(app)
+
+class TestRequestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.profile_dir = Path(tempfile.mkdtemp())
+        patcher = mock.patch.multiple(
+            "src.app.profiling",
+            PROFILE_DIR=self.profile_dir,
+            PROFILE_HEADER_ENABLED=True,
+            PROFILE_INTERVAL_MS=1,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.profile_dir)
+
+    def test_header_triggers_profile(self):
+        response = client.get("/vendors?limit=5", headers={"X-Profile": "1"})
+        self.assertEqual(response.status_code, 200)
+        profile_id = response.headers["X-Profile-Id"]
+        report = json.loads((self.profile_dir / f"{profile_id}.sql.json").read_text())
+        self.assertEqual(report["route"], "/vendors")
+        self.assertEqual(report["query_count"], len(report["queries"]))
+        self.assertGreaterEqual(report["query_count"], 1)
+        self.assertTrue(all("duration_ms" in q and "parameters" in q for q in report["queries"]))
+        folded = (self.profile_dir / f"{profile_id}.folded").read_text()
+        for line in folded.splitlines():
+            stack, count = line.rsplit(" ", 1)
+            self.assertTrue(stack)
+            self.assertGreater(int(count), 0)
+
+    def test_profile_written_off_the_event_loop(self):
+        threads = []
+
+        def write(*args):
+            threads.append(threading.current_thread().name)
+            _write_profile(*args)
+
+        with mock.patch("src.app.profiling._write_profile", write):
+            response = client.get("/vendors?limit=5", headers={"X-Profile": "1"})
+        self.assertTrue((self.profile_dir / f"{response.headers['X-Profile-Id']}.sql.json").exists())
+        self.assertEqual(len(threads), 1)
+        self.assertIn("worker", threads[0])
+
+    def test_unprofiled_request_writes_nothing(self):
+        response = client.get("/vendors?limit=5")
+        self.assertNotIn("X-Profile-Id", response.headers)
+        self.assertEqual(list(self.profile_dir.iterdir()), [])
+
+    def test_slow_query_logged_with_route(self):
+        with mock.patch("src.app.profiling.SLOW_QUERY_MS", 0.000001):
+            with self.assertLogs("src.app.profiling", level="WARNING") as logs:
+                client.get("/fruits?limit=1")
+        self.assertIn("on /fruits:", logs.output[0])
+        self.assertIn("parameters=", logs.output[0])
+
+    def test_failed_statement_does_not_skew_the_next_timing(self):
+        db = session_local()
+        try:
+            with self.assertRaises(DBAPIError):
+                db.execute(text("SELECT * FROM no_such_table"))
+            db.rollback()
+            self.assertNotIn("profile_query_start", db.connection().info)
+        finally:
+            db.close()
+
+class TestNPlusOneDetection(unittest.TestCase):
+    def test_repeated_statements_flagged(self):
+        queries = [{"statement": "SELECT * FROM vendors", "duration_ms": 1.0}]
+        queries += [{"statement": "SELECT * FROM fruits WHERE id = ?", "duration_ms": 0.5} for _ in range(6)]
+        self.assertEqual(find_n_plus_one(queries, threshold=5), [
+            {"statement": "SELECT * FROM fruits WHERE id = ?", "count": 6, "total_ms": 3.0},
+        ])
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
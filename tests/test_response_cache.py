@@ -0,0 +1,78 @@
+import unittest
+from uuid import uuid4
+from fastapi.testclient import TestClient
+from src.app.main import app
+from src.app.utils.response_cache import InProcessBackend, etag_matches, get_backend, set_backend
+from tests.utils import count_queries
+
+client = TestClient(app)
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.previous = get_backend()
+        set_backend(InProcessBackend())
+
+    def tearDown(self):
+        set_backend(self.previous)
+
+    def test_etag_is_stable_and_hits_skip_the_database(self):
+        first = client.get("/fruits?limit=5")
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.headers["cache-control"], "no-cache")
+        with count_queries() as counter:
+            second = client.get("/fruits?limit=5")
+        self.assertEqual(counter.count, 0)
+        self.assertEqual(second.headers["etag"], first.headers["etag"])
+        self.assertEqual(second.content, first.content)
+
+    def test_if_none_match_returns_304(self):
+        etag = client.get("/vendors").headers["etag"]
+        response = client.get("/vendors", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response.headers["etag"], etag)
+        response = client.get("/vendors", headers={"If-None-Match": '"stale"'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_query_parameter_order_shares_an_entry(self):
+        client.get("/vendors?page=1&limit=3")
+        with count_queries() as counter:
+            response = client.get("/vendors?limit=3&page=1")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(counter.count, 0)
+
+    def test_creating_a_fruit_changes_the_etag(self):
+        # Walk to the last page, where the new fruit will appear
+        url = "/fruits?limit=100"
+        while cursor := client.get(url).headers.get("x-next-cursor"):
+            url = f"/fruits?limit=100&after={cursor}"
+        before = client.get(url).headers["etag"]
+        files = {"photo": ("apple.jpg", b"fake-image-bytes", "image/jpeg")}
+        data = {"name": f"Fruit {uuid4().hex[:8]}", "flavor_profile": "Sweet", "dimension_origin": "Earth", "rarity_level": 1, "base_value": 1.0}
+        self.assertEqual(client.post("/fruits", data=data, files=files).status_code, 200)
+        response = client.get(url, headers={"If-None-Match": before})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["etag"], before)
+
+    def test_inventory_change_invalidates_vendor_listings(self):
+        username, password = f"cache{uuid4().hex[:8]}", "Cachepass1!"
+        client.post("/auth/register", json={"username": username, "password": password})
+        token = client.post("/auth/token", data={"username": username, "password": password}).json()["access_token"]
+        fruit_id = client.get("/fruits?limit=1").json()[0]["id"]
+        version = get_backend().version("vendors")
+        response = client.post("/vendors/me/add-fruit", json={"fruit_id": fruit_id, "quantity": 1}, headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(get_backend().version("vendors"), version)
+
+    def test_errors_are_not_cached(self):
+        self.assertEqual(client.get("/fruits?after=bogus").status_code, 400)
+        response = client.get("/fruits?after=bogus")
+        self.assertNotIn("etag", response.headers)
+
+    def test_etag_matching(self):
+        self.assertTrue(etag_matches('"a", W/"b"', '"b"'))
+        self.assertTrue(etag_matches("*", '"b"'))
+        self.assertFalse(etag_matches('"a"', '"b"'))
+
+if __name__ == "__main__":
+    unittest.main()
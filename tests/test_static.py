@@ -0,0 +1,92 @@
+import gzip
+import hashlib
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from uuid import uuid4
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from src.app.main import app
+from src.app.database import session_local
+from src.app.models.fruit import Fruit
+from src.app.utils.static import IMMUTABLE, REVALIDATE, CachedStaticFiles, precompress, precompress_tree
+
+client = TestClient(app)
+
+SVG = b'<svg xmlns="http://www.w3.org/2000/svg">' + b'<rect width="1" height="1"/>' * 200 + b"</svg>"
+
+class TestCachedStaticFiles(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.client = TestClient(Starlette(routes=[Mount("/static", app=CachedStaticFiles(directory=self.dir))]))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_hashed_names_are_immutable(self):
+        name = hashlib.sha256(b"png").hexdigest() + "_128.png"
+        (self.dir / name).write_bytes(b"png")
+        response = self.client.get(f"/static/{name}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["cache-control"], IMMUTABLE)
+        self.assertIn("etag", response.headers)
+        self.assertIn("last-modified", response.headers)
+
+    def test_other_names_revalidate_with_304(self):
+        (self.dir / "logo.png").write_bytes(b"png")
+        first = self.client.get("/static/logo.png")
+        self.assertEqual(first.headers["cache-control"], REVALIDATE)
+        second = self.client.get("/static/logo.png", headers={"If-None-Match": first.headers["etag"]})
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.content, b"")
+        self.assertEqual(second.headers["cache-control"], REVALIDATE)
+        third = self.client.get("/static/logo.png", headers={"If-Modified-Since": first.headers["last-modified"]})
+        self.assertEqual(third.status_code, 304)
+
+    def test_precompressed_variant_served_to_gzip_clients(self):
+        (self.dir / "icon.svg").write_bytes(SVG)
+        self.assertEqual(precompress_tree(self.dir), [self.dir / "icon.svg.gz"])
+        compressed = self.client.get("/static/icon.svg", headers={"Accept-Encoding": "br, gzip"})
+        self.assertEqual(compressed.headers["content-encoding"], "gzip")
+        self.assertEqual(compressed.headers["content-type"], "image/svg+xml")
+        self.assertEqual(compressed.headers["vary"], "Accept-Encoding")
+        self.assertLess(int(compressed.headers["content-length"]), len(SVG))
+        self.assertEqual(compressed.content, SVG)  # decoded by the client
+        plain = self.client.get("/static/icon.svg", headers={"Accept-Encoding": "gzip;q=0"})
+        self.assertNotIn("content-encoding", plain.headers)
+        self.assertEqual(plain.headers["vary"], "Accept-Encoding")
+        self.assertNotEqual(plain.headers["etag"], compressed.headers["etag"])
+
+    def test_incompressible_files_are_left_alone(self):
+        path = self.dir / "photo.jpg"
+        path.write_bytes(b"jpeg")
+        self.assertIsNone(precompress(path))
+        self.assertFalse((self.dir / "photo.jpg.gz").exists())
+
+    def test_stale_variant_is_rewritten(self):
+        path = self.dir / "data.json"
+        path.write_bytes(b'{"a": 1}' * 100)
+        target = precompress(path)
+        path.write_bytes(b'{"b": 2}' * 100)
+        os.utime(target, (0, 0))
+        precompress(path)
+        self.assertEqual(gzip.decompress(target.read_bytes()), path.read_bytes())
+
+class TestUploadedPhotoCaching(unittest.TestCase):
+    def test_uploaded_photo_is_immutable(self):
+        data = {"name": f"StaticFruit-{uuid4().hex}", "flavor_profile": "Sweet", "dimension_origin": "Earth", "rarity_level": 1, "base_value": 1.0}
+        response = client.post("/fruits", data=data, files={"photo": ("p.png", uuid4().bytes, "image/png")})
+        db = session_local()
+        try:
+            url = db.get(Fruit, response.json()["id"]).photo_url
+        finally:
+            db.close()
+        photo = client.get(url)
+        self.assertEqual(photo.status_code, 200)
+        self.assertEqual(photo.headers["cache-control"], IMMUTABLE)
+
+if __name__ == "__main__":
+    unittest.main()
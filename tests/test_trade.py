@@ -1,6 +1,12 @@
+import threading
 import unittest
+from uuid import uuid4
 from fastapi.testclient import TestClient
+from src.app.crud.trade import perform_trade
 from src.app.main import app
+from src.app.database import session_local
+from src.app.models.fruit import Fruit, VendorInventory
+from src.app.models.vendor import Vendor
 
 client = TestClient(app)
 
@@ -31,5 +37,128 @@ class TestTradeEndpoints(unittest.TestCase):
         response = client.post("/trade", json=trade_data, headers=headers)
         self.assertEqual(response.status_code, 403)
 
+    def test_non_positive_quantity_rejected(self):
+        headers = {"Authorization": f"Bearer {self.token}"}
+        for quantity in (0, -5):
+            trade_data = {"from_vendor_id": self.vendor_id, "to_vendor_id": 999, "fruit_id": 999, "quantity": quantity, "trade_type": "send"}
+            response = client.post("/trade", json=trade_data, headers=headers)
+            self.assertEqual(response.status_code, 422)
+
+class TestTradeBatchEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.password = "Tradepass1!"
+        self.headers = self._login("batchuser")
+        self.vendor_id = client.get("/vendors/me", headers=self.headers).json()["id"]
+        other_headers = self._login("batchpartner")
+        self.other_vendor_id = client.get("/vendors/me", headers=other_headers).json()["id"]
+        db = session_local()
+        fruit = Fruit(name=f"BatchFruit-{uuid4().hex}", flavor_profile="Sweet", dimension_origin="Earth", rarity_level=2, base_value=5.0)
+        db.add(fruit)
+        db.commit()
+        self.fruit_id = fruit.id
+        db.close()
+        client.post("/vendors/me/add-fruit", json={"fruit_id": self.fruit_id, "quantity": 10}, headers=self.headers)
+
+    def _login(self, username):
+        client.post("/auth/register", json={"username": username, "password": self.password})
+        token = client.post("/auth/token", data={"username": username, "password": self.password}).json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+
+    def _quantity(self, vendor_id):
+        db = session_local()
+        inv = db.query(VendorInventory).filter_by(vendor_id=vendor_id, fruit_id=self.fruit_id).first()
+        db.close()
+        return inv.quantity if inv else 0
+
+    def _trade(self, quantity, trade_type="send"):
+        return {"from_vendor_id": self.vendor_id, "to_vendor_id": self.other_vendor_id, "fruit_id": self.fruit_id, "quantity": quantity, "trade_type": trade_type}
+
+    def test_batch_applies_all_trades(self):
+        batch = {"trades": [self._trade(3), self._trade(4, "sell"), self._trade(2, "request")]}
+        response = client.post("/trades/batch", json=batch, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["succeeded"], 3)
+        self.assertEqual(data["results"][1]["trade"]["currency_amount"], data["results"][1]["trade"]["details"]["total_cost"])
+        self.assertEqual(self._quantity(self.vendor_id), 5)
+        self.assertEqual(self._quantity(self.other_vendor_id), 5)
+
+    def test_atomic_batch_rolls_back(self):
+        batch = {"trades": [self._trade(5), self._trade(6)]}
+        response = client.post("/trades/batch", json=batch, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Trade 1", response.json()["detail"])
+        self.assertEqual(self._quantity(self.vendor_id), 10)
+        self.assertEqual(self._quantity(self.other_vendor_id), 0)
+
+    def test_non_atomic_batch_reports_per_item(self):
+        batch = {"atomic": False, "trades": [self._trade(5), self._trade(6), self._trade(5)]}
+        response = client.post("/trades/batch", json=batch, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["status"], "partial")
+        self.assertEqual([r["status"] for r in data["results"]], ["success", "error", "success"])
+        self.assertEqual(self._quantity(self.vendor_id), 0)
+        self.assertEqual(self._quantity(self.other_vendor_id), 10)
+
+    def test_batch_from_other_vendor_forbidden(self):
+        trade = {**self._trade(1), "from_vendor_id": self.other_vendor_id}
+        response = client.post("/trades/batch", json={"trades": [self._trade(1), trade]}, headers=self.headers)
+        self.assertEqual(response.status_code, 403)
+
+    def test_batch_non_positive_quantity_rejected(self):
+        batch = {"atomic": False, "trades": [self._trade(1), self._trade(-3)]}
+        response = client.post("/trades/batch", json=batch, headers=self.headers)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self._quantity(self.vendor_id), 10)
+        self.assertEqual(self._quantity(self.other_vendor_id), 0)
+
+class TestConcurrentTrades(unittest.TestCase):
+    def setUp(self):
+        db = session_local()
+        suffix = uuid4().hex
+        fruit = Fruit(name=f"RaceFruit-{suffix}", flavor_profile="Sour", dimension_origin="Earth", rarity_level=1, base_value=1.0)
+        seller = Vendor(name=f"Race Seller {suffix}", species="Human", home_dimension="Earth-1")
+        buyer = Vendor(name=f"Race Buyer {suffix}", species="Human", home_dimension="Earth-1")
+        db.add_all([fruit, seller, buyer])
+        db.flush()
+        db.add(VendorInventory(vendor_id=seller.id, fruit_id=fruit.id, quantity=50))
+        db.commit()
+        self.fruit_id, self.seller_id, self.buyer_id = fruit.id, seller.id, buyer.id
+        db.close()
+
+    def test_concurrent_trades_never_oversell(self):
+        threads, attempts_per_thread = 16, 5
+        successes, failures = [], []
+        lock = threading.Lock()
+
+        def worker():
+            for _ in range(attempts_per_thread):
+                db = session_local()
+                try:
+                    perform_trade(db, from_id=self.seller_id, to_id=self.buyer_id, fruit_id=self.fruit_id, quantity=1, trade_type="send")
+                    outcome = successes
+                except ValueError:
+                    outcome = failures
+                finally:
+                    db.close()
+                with lock:
+                    outcome.append(1)
+
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+
+        db = session_local()
+        seller_qty = db.query(VendorInventory).filter_by(vendor_id=self.seller_id, fruit_id=self.fruit_id).one().quantity
+        buyer_qty = db.query(VendorInventory).filter_by(vendor_id=self.buyer_id, fruit_id=self.fruit_id).one().quantity
+        db.close()
+        self.assertEqual(len(successes), 50)
+        self.assertEqual(len(failures), threads * attempts_per_thread - 50)
+        self.assertEqual(seller_qty, 0)
+        self.assertEqual(buyer_qty, 50)
+
 if __name__ == "__main__":
     unittest.main(verbosity=2)
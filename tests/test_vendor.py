@@ -1,6 +1,16 @@
 import unittest
+from uuid import uuid4
 from fastapi.testclient import TestClient
 from src.app.main import app
+from src.app.crud.fruit import set_fruit_rarity
+from src.app.crud.trade import perform_trade
+from src.app.crud.vendor import popular_vendors_stmt, rebuild_vendor_scores
+from src.app.database import session_local
+from src.app.models.fruit import Fruit, VendorInventory
+from src.app.models.vendor import Vendor, VendorScore
+from src.app.schemas.vendor import VendorSchema
+from src.app.utils import response_cache
+from tests.utils import count_queries
 
 client = TestClient(app)
 
@@ -28,11 +38,121 @@ class TestVendorEndpoints(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIsInstance(response.json(), list)
 
+    def test_vendors_keyset_pagination(self):
+        first = client.get("/vendors?limit=1")
+        self.assertEqual(first.status_code, 200)
+        cursor = first.headers.get("X-Next-Cursor")
+        if cursor is None:
+            self.skipTest("Only one vendor exists")
+        second = client.get(f"/vendors?limit=1&after={cursor}")
+        self.assertEqual(second.status_code, 200)
+        self.assertGreater(second.json()[0]["id"], first.json()[0]["id"])
+
     def test_vendors_filtering(self):
         # This will pass if at least one vendor with species='Human' exists, otherwise should return an empty list
         response = client.get("/vendors?species=Human")
         self.assertEqual(response.status_code, 200)
         self.assertIsInstance(response.json(), list)
 
+class TestVendorQueryCounts(unittest.TestCase):
+    """Serializing vendors must not lazy-load inventory or fruits per row."""
+
+    def setUp(self):
+        self.username = "vendoruser"
+        self.password = "Vendorpass1!"
+        client.post("/auth/register", json={"username": self.username, "password": self.password})
+        login_resp = client.post("/auth/token", data={"username": self.username, "password": self.password})
+        self.headers = {"Authorization": f"Bearer {login_resp.json()['access_token']}"}
+        db = session_local()
+        suffix = uuid4().hex
+        fruits = [Fruit(name=f"CountFruit-{suffix}-{i}", flavor_profile="Sweet", dimension_origin="Earth", rarity_level=9, base_value=1.0) for i in range(3)]
+        vendors = [Vendor(name=f"Count Vendor {suffix} {i}", species="Counter", home_dimension="Earth-1") for i in range(3)]
+        db.add_all(fruits + vendors)
+        db.flush()
+        db.add_all(VendorInventory(vendor_id=v.id, fruit_id=f.id, quantity=1000) for v in vendors for f in fruits)
+        db.commit()
+        db.close()
+        response_cache.bump("vendors")
+
+    def test_list_vendors_query_count(self):
+        with count_queries() as counter:
+            response = client.get("/vendors?species=Counter&limit=100")
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(len(response.json()), 3)
+        self.assertLessEqual(counter.count, 3, counter.statements)
+
+    def test_popular_vendors_query_count(self):
+        with count_queries() as counter:
+            response = client.get("/vendors/popular?limit=20")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(all(v["inventory_items"] for v in response.json()))
+        self.assertLessEqual(counter.count, 3, counter.statements)
+
+    def test_list_matches_schema_serialization(self):
+        db = session_local()
+        try:
+            vendors = db.query(Vendor).filter(Vendor.species == "Counter").order_by(Vendor.id).limit(100).all()
+            expected = [VendorSchema.model_validate(v).model_dump(mode="json") for v in vendors]
+        finally:
+            db.close()
+        for vendor in expected:
+            vendor["inventory_items"].sort(key=lambda item: item["fruit_id"])
+        response = client.get("/vendors?species=Counter&limit=100")
+        actual = response.json()
+        for vendor in actual:
+            vendor["inventory_items"].sort(key=lambda item: item["fruit_id"])
+        self.assertEqual(actual, expected)
+
+    def test_my_vendor_query_count(self):
+        with count_queries() as counter:
+            response = client.get("/vendors/me", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(counter.count, 4, counter.statements)
+
+class TestVendorLeaderboard(unittest.TestCase):
+    """Delta-maintained scores must match a full recompute."""
+
+    def setUp(self):
+        self.db = session_local()
+        suffix = uuid4().hex
+        self.fruit = Fruit(name=f"ScoreFruit-{suffix}", flavor_profile="Sweet", dimension_origin="Earth", rarity_level=3, base_value=1.0)
+        self.vendors = [Vendor(name=f"Score Vendor {suffix} {i}", species="Scorer", home_dimension="Earth-1") for i in range(2)]
+        self.db.add_all([self.fruit] + self.vendors)
+        self.db.flush()
+        self.db.add(VendorInventory(vendor_id=self.vendors[0].id, fruit_id=self.fruit.id, quantity=10_000_000))
+        self.db.commit()
+        rebuild_vendor_scores(self.db)
+
+    def tearDown(self):
+        self.db.close()
+
+    def scores(self):
+        ids = [v.id for v in self.vendors]
+        return dict(self.db.query(VendorScore.vendor_id, VendorScore.score).filter(VendorScore.vendor_id.in_(ids)).all())
+
+    def test_deltas_match_rebuild(self):
+        a, b = (v.id for v in self.vendors)
+        self.assertEqual(self.scores(), {a: 30_000_000})
+        perform_trade(self.db, from_id=a, to_id=b, fruit_id=self.fruit.id, quantity=4, trade_type="send")
+        self.assertEqual(self.scores(), {a: 29_999_988, b: 12})
+        set_fruit_rarity(self.db, self.fruit.id, 5)
+        incremental = self.scores()
+        self.assertEqual(incremental, {a: 49_999_980, b: 20})
+        rebuild_vendor_scores(self.db)
+        self.assertEqual(self.scores(), incremental)
+
+    def test_popular_vendors_ranked_by_score(self):
+        response = client.get("/vendors/popular?limit=20")
+        self.assertEqual(response.status_code, 200)
+        ids = [v["id"] for v in response.json()]
+        scores = dict(self.db.query(VendorScore.vendor_id, VendorScore.score).filter(VendorScore.vendor_id.in_(ids)).all())
+        ranked = [scores[i] for i in ids]
+        self.assertEqual(ranked, sorted(ranked, reverse=True))
+        # Other runs leave high scorers behind, so rank this test's vendors among themselves
+        a, b = (v.id for v in self.vendors)
+        perform_trade(self.db, from_id=a, to_id=b, fruit_id=self.fruit.id, quantity=4, trade_type="send")
+        ranked_ids = self.db.scalars(popular_vendors_stmt(limit=20).with_only_columns(Vendor.id).where(Vendor.id.in_([a, b]))).all()
+        self.assertEqual(ranked_ids, [a, b])
+
 if __name__ == "__main__":
     unittest.main(verbosity=2)
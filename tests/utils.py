@@ -0,0 +1,27 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from src.app.database import engine
+
+class QueryCounter:
+    """Records every SQL statement executed on an engine while active."""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+@contextmanager
+def count_queries(bind=engine):
+    counter = QueryCounter()
+    event.listen(bind, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(bind, "before_cursor_execute", counter)